@@ -0,0 +1,415 @@
+"""
+HTTP benchmark suite: throughput and latency percentiles of every route
+
+Drives src.main:app in-process through httpx.ASGITransport (no network, no
+server). Every scale runs in a fresh interpreter, so the in-memory stores and
+module-level singletons start empty, and is seeded with that many synthetic
+products and users before the routes are measured.
+
+Synthetic users share one precomputed bcrypt hash so that seeding 1M of them
+does not take hours, logins and user creation are measured with real hashing,
+at most LOGIN_MAX_CONCURRENT at a time so that admission does not turn them
+away.
+
+Results are written as JSON, pass a previous file to --compare to print the
+change per route.
+
+Run from the repository root:
+    python -m benchmarks.http_suite
+    python -m benchmarks.http_suite --scales 1000 --requests 200
+    python -m benchmarks.http_suite --backend sqlalchemy --compare old.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_SCALES = "1000,100000,1000000"
+DEFAULT_REQUESTS = 500
+# Routes that hash or verify a password run a few requests only
+HASHING_REQUESTS = 20
+DEFAULT_CONCURRENCY = 8
+SEED_CHUNK = 10_000
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+USERNAME = "benchmark"
+PASSWORD = "Benchmark1!"
+
+BENCHMARK_ENV = {
+    "SECRET_KEY": "benchmark",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "REFRESH_TOKEN_EXPIRE_MINUTES": "120",
+    # Every request comes from the one in-process client, the login buckets
+    # would refuse all but the first few credential requests
+    "LOGIN_USER_BURST": "1000000",
+    "LOGIN_IP_BURST": "1000000",
+}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(latencies),
+        "p50_ms": percentile(latencies, 0.50),
+        "p90_ms": percentile(latencies, 0.90),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": max(latencies),
+    }
+
+
+async def measure(send, requests: int, concurrency: int) -> dict:
+    """
+    send(i) performs request number i and returns the response,
+    `concurrency` workers share the request numbers
+    """
+    latencies = []
+    errors = 0
+    next_request = 0
+
+    async def worker():
+        nonlocal errors, next_request
+        while next_request < requests:
+            i = next_request
+            next_request += 1
+            started = time.perf_counter()
+            response = await send(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def seed(scale: int) -> None:
+    from src.core.product.entities import ProductCreate
+    from src.core.user.entities import RegularUser
+    from src.core.user.hashing import password_hasher
+    from src.products.repositories import product_repository
+    from src.users.repositories import user_repository
+
+    for start in range(0, scale, SEED_CHUNK):
+        products = [
+            ProductCreate(name=f"seed-product-{i}", quantity=i % 1000, price=9.99)
+            for i in range(start, min(start + SEED_CHUNK, scale))
+        ]
+        await product_repository.add_many(products, atomic=False)
+
+    shared_hash = await password_hasher.hash(PASSWORD)
+
+    async def reuse_hash(password: str) -> str:
+        return shared_hash
+
+    password_hasher.hash = reuse_hash
+    try:
+        for i in range(scale):
+            await user_repository.add(
+                RegularUser(
+                    username=f"seed-user-{i}",
+                    email=f"seed-user-{i}@example.com",
+                    password=PASSWORD,
+                    permissions=["view_product"],
+                )
+            )
+    finally:
+        del password_hasher.hash
+
+
+async def run_scale(scale: int, requests: int, concurrency: int) -> dict:
+    # Imported here: the environment of this interpreter selects the backend
+    import httpx
+
+    from src.core.user.admission import login_admission
+    from src.core.user.services import REFRESH_TOKEN_EXPIRE_MINUTES, UserService
+    from src.main import app
+
+    routes = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            login_path = app.url_path_for("login")
+            await client.post(
+                "/v1/api/users/create",
+                json={
+                    "username": USERNAME,
+                    "email": "benchmark@example.com",
+                    "password": PASSWORD,
+                    "is_admin": True,
+                },
+            )
+            login = await client.get(
+                login_path, params={"username": USERNAME, "password": PASSWORD}
+            )
+            login.raise_for_status()
+            headers = {"Authorization": login.json()["access_token"]}
+            # A refresh token is accepted once, each request gets its own
+            user_id, user = await UserService.get_by_username(USERNAME)
+            refresh_tokens = [
+                UserService.create_token(
+                    UserService.refresh_token_data(user_id, user),
+                    timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES),
+                )
+                for _ in range(requests)
+            ]
+
+            started = time.perf_counter()
+            await seed(scale)
+            seed_seconds = time.perf_counter() - started
+
+            listing = await client.get("/v1/api/products/", headers=headers)
+            etag = listing.headers.get("etag", "")
+            # Deletes take the first seeded ids, updates and reads the rest
+            delete_count = min(requests, scale // 2)
+            other_ids = list(range(delete_count + 1, scale + 1))
+            # More credential requests in flight are answered 503 unhashed
+            hashing_concurrency = min(concurrency, login_admission.max_concurrent)
+
+            cases = [
+                ("GET /", lambda i: client.get("/"), requests, concurrency),
+                (
+                    "POST /users/create",
+                    lambda i: client.post(
+                        "/v1/api/users/create",
+                        params={"permissions": "view_product"},
+                        json={
+                            "username": f"bench-user-{i}",
+                            "email": f"bench-user-{i}@example.com",
+                            "password": PASSWORD,
+                        },
+                    ),
+                    HASHING_REQUESTS,
+                    hashing_concurrency,
+                ),
+                (
+                    "GET /userslogin",
+                    lambda i: client.get(
+                        login_path,
+                        params={"username": USERNAME, "password": PASSWORD},
+                    ),
+                    HASHING_REQUESTS,
+                    hashing_concurrency,
+                ),
+                (
+                    "POST /users/refresh",
+                    lambda i: client.post(
+                        "/v1/api/users/refresh", params={"token": refresh_tokens[i]}
+                    ),
+                    requests,
+                    concurrency,
+                ),
+                (
+                    "GET /users/",
+                    lambda i: client.get("/v1/api/users/"),
+                    requests,
+                    concurrency,
+                ),
+                (
+                    "GET /users/{id}",
+                    lambda i: client.get(
+                        f"/v1/api/users/{other_ids[i % len(other_ids)]}"
+                    ),
+                    requests,
+                    concurrency,
+                ),
+                (
+                    "PUT /users/me",
+                    lambda i: client.put("/v1/api/users/me", headers=headers),
+                    requests,
+                    concurrency,
+                ),
+                (
+                    "GET /products/",
+                    lambda i: client.get("/v1/api/products/", headers=headers),
+                    requests,
+                    concurrency,
+                ),
+                (
+                    "GET /products/ (If-None-Match)",
+                    lambda i: client.get(
+                        "/v1/api/products/",
+                        headers={**headers, "If-None-Match": etag},
+                    ),
+                    requests,
+                    concurrency,
+                ),
+                (
+                    "GET /products/{id}",
+                    lambda i: client.get(
+                        f"/v1/api/products/{other_ids[i % len(other_ids)]}",
+                        headers=headers,
+                    ),
+                    requests,
+                    concurrency,
+                ),
+                (
+                    "POST /products/create",
+                    lambda i: client.post(
+                        "/v1/api/products/create",
+                        json={
+                            "name": f"bench-product-{i}",
+                            "quantity": 1,
+                            "price": 1.0,
+                        },
+                        headers=headers,
+                    ),
+                    requests,
+                    concurrency,
+                ),
+                (
+                    "PATCH /products/{id}",
+                    lambda i: client.patch(
+                        f"/v1/api/products/{other_ids[i % len(other_ids)]}",
+                        json={
+                            "name": f"seed-product-{other_ids[i % len(other_ids)] - 1}",
+                            "quantity": i,
+                            "price": 2.5,
+                        },
+                        headers=headers,
+                    ),
+                    requests,
+                    concurrency,
+                ),
+                (
+                    "DELETE /products/{id}",
+                    lambda i: client.delete(
+                        f"/v1/api/products/{i + 1}", headers=headers
+                    ),
+                    delete_count,
+                    concurrency,
+                ),
+            ]
+            for name, send, count, case_concurrency in cases:
+                routes[name] = await measure(send, count, case_concurrency)
+
+    return {"scale": scale, "seed_seconds": seed_seconds, "routes": routes}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_in_subprocess(args, scale: int, database_dir: str) -> dict:
+    env = {**BENCHMARK_ENV, **os.environ, "STORAGE_BACKEND": args.backend}
+    if args.backend == "sqlalchemy" and "DATABASE_URL" not in os.environ:
+        path = os.path.join(database_dir, f"bench-{scale}.db")
+        env["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    if args.backend == "redis" and "REDIS_URL" not in os.environ:
+        env["REDIS_URL"] = "fakeredis://"
+
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.http_suite",
+        "--run-scale",
+        str(scale),
+        "--requests",
+        str(args.requests),
+        "--concurrency",
+        str(args.concurrency),
+    ]
+    completed = subprocess.run(command, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"scale {scale} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def print_results(result: dict, baseline: dict | None) -> None:
+    baseline_routes = {}
+    if baseline is not None:
+        for entry in baseline["scales"]:
+            baseline_routes[entry["scale"]] = entry["routes"]
+
+    for entry in result["scales"]:
+        print(f"\nscale {entry['scale']} (seeded in {entry['seed_seconds']:.1f}s)")
+        header = f"{'route':<32} {'rps':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}"
+        if baseline is not None:
+            header += f" {'p50 change':>10}"
+        print(header)
+        for name, stats in entry["routes"].items():
+            line = (
+                f"{name:<32} {stats['throughput_rps']:>9.1f} {stats['p50_ms']:>8.2f} "
+                f"{stats['p99_ms']:>8.2f} {stats['errors']:>6}"
+            )
+            before = baseline_routes.get(entry["scale"], {}).get(name)
+            if before is not None:
+                change = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"]
+                line += f" {change:>+10.1%}"
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", default=DEFAULT_SCALES)
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument(
+        "--backend", default="memory", choices=["memory", "sqlalchemy", "redis"]
+    )
+    parser.add_argument("--output", help="results file, default benchmarks/results/")
+    parser.add_argument("--compare", help="previous results file to compare with")
+    parser.add_argument("--run-scale", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scale is not None:
+        result = asyncio.run(run_scale(args.run_scale, args.requests, args.concurrency))
+        print(json.dumps(result))
+        return
+
+    started_at = datetime.now(timezone.utc)
+    result = {
+        "started_at": started_at.isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "scales": [],
+    }
+    with tempfile.TemporaryDirectory() as database_dir:
+        for scale in (int(value) for value in args.scales.split(",")):
+            print(f"running scale {scale}...", file=sys.stderr)
+            result["scales"].append(run_in_subprocess(args, scale, database_dir))
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        name = f"http-{args.backend}-{started_at:%Y%m%dT%H%M%S}.json"
+        output = os.path.join(RESULTS_DIR, name)
+    with open(output, "w") as file:
+        json.dump(result, file, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print_results(result, baseline)
+    print(f"\nresults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: size and cost of the negotiated encodings of a product list page
+
+For a full page of products (MAX_PAGE_SIZE) and every representation the
+list endpoint can send, reports the body size, the server time to encode it
+once (a cache miss, later requests reuse the cached bytes), the server time
+of a cache hit and the client time to decode it back into Python objects.
+
+Run from the repository root:
+    python -m benchmarks.list_encodings
+"""
+
+import gzip
+import json
+import statistics
+import time
+
+import msgpack
+
+from src.api.rest.negotiation import (
+    MSGPACK_MEDIA_TYPE,
+    EncodedBodyCache,
+    Representation,
+    encode_body,
+    zstd,
+)
+from src.api.rest.product.serialization import product_list_json
+from src.core.pagination import MAX_PAGE_SIZE
+from src.core.product.entities import ProductCreate
+from src.products.managers import ProductManager
+
+ROUNDS = 200
+REPRESENTATIONS = [
+    Representation(media_type, coding)
+    for media_type in ("application/json", MSGPACK_MEDIA_TYPE)
+    for coding in (None, "gzip", "zstd")
+    if coding != "zstd" or zstd is not None
+]
+
+
+def median_us(function, *args) -> float:
+    latencies = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        function(*args)
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(latencies)
+
+
+def decode(body: bytes, representation: Representation, coding: str | None):
+    if coding == "gzip":
+        body = gzip.decompress(body)
+    elif coding == "zstd":
+        body = zstd.decompress(body)
+    if representation.media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack.unpackb(body)
+    return json.loads(body)
+
+
+def main() -> None:
+    manager = ProductManager()
+    for i in range(MAX_PAGE_SIZE):
+        manager.add(
+            ProductCreate(
+                name=f"product name {i}", quantity=i % 100, price=round(1.5 + i / 7, 2)
+            )
+        )
+    products = manager.get_page(0, MAX_PAGE_SIZE)
+    json_body = product_list_json(products, len(products), None)
+    expected = json.loads(json_body)
+
+    cache = EncodedBodyCache()
+    print(f"page of {len(products)} products")
+    print(
+        f"{'representation':<24} {'bytes':>8} {'encode us':>10} "
+        f"{'cached us':>10} {'decode us':>10}"
+    )
+    for representation in REPRESENTATIONS:
+        body, coding = encode_body(json_body, representation)
+        assert decode(body, representation, coding) == expected
+        cache.set("etag", representation, (body, coding))
+        encode_us = median_us(encode_body, json_body, representation)
+        cached_us = median_us(cache.get, "etag", representation)
+        decode_us = median_us(decode, body, representation, coding)
+        name = representation.media_type.split("/")[1] + (
+            f" + {coding}" if coding else ""
+        )
+        print(
+            f"{name:<24} {len(body):>8} {encode_us:>10.1f} "
+            f"{cached_us:>10.2f} {decode_us:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: product list serialisation at 100k items, before and after the fast path
+
+before: the view returns ProductListResponse and FastAPI validates it again
+        through response_model before encoding
+after:  the view returns JSONBytesResponse built from cached per-product bytes
+        (cold = first request fills the cache, warm = every product cached)
+
+Both variants are served by a minimal FastAPI app so the numbers include the
+framework's response handling but not auth or storage.
+
+Run from the repository root:
+    python -m benchmarks.list_serialization
+"""
+
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.rest.product.serialization import product_json_cache, product_list_json
+from src.api.rest.serialization import JSONBytesResponse
+from src.core.product.entities import ProductCreate, ProductListResponse
+from src.products.managers import ProductManager
+
+PRODUCTS = 100_000
+ROUNDS = 5
+
+
+def build_app(manager: ProductManager) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/before", response_model=ProductListResponse)
+    async def before() -> ProductListResponse:
+        return ProductListResponse(
+            total_products=manager.count(),
+            products=manager.get_page(0, PRODUCTS),
+            next_cursor=None,
+        )
+
+    @app.get("/after")
+    async def after() -> ProductListResponse:
+        body = product_list_json(manager.get_page(0, PRODUCTS), manager.count(), None)
+        return JSONBytesResponse(body)
+
+    return app
+
+
+def measure(client: TestClient, path: str) -> tuple[float, bytes]:
+    started = time.perf_counter()
+    response = client.get(path)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    return elapsed, response.content
+
+
+def main() -> None:
+    manager = ProductManager()
+    for i in range(PRODUCTS):
+        manager.add(ProductCreate(name=f"product-{i}", quantity=i, price=1.5))
+
+    client = TestClient(build_app(manager))
+
+    measure(client, "/before")  # warm up the client and the app
+    product_json_cache.clear()
+    cold, after_body = measure(client, "/after")
+
+    before_times = []
+    after_times = []
+    for _ in range(ROUNDS):
+        elapsed, before_body = measure(client, "/before")
+        before_times.append(elapsed)
+        elapsed, _ = measure(client, "/after")
+        after_times.append(elapsed)
+
+    assert ProductListResponse.model_validate_json(
+        before_body
+    ) == ProductListResponse.model_validate_json(after_body)
+
+    before = min(before_times)
+    warm = min(after_times)
+    print(f"{PRODUCTS} products, {len(after_body) / 1_000_000:.1f} MB body")
+    print(f"{'variant':>12} {'ms':>10} {'speedup':>8}")
+    print(f"{'before':>12} {before * 1000:>10.1f} {1:>8.1f}")
+    print(f"{'after cold':>12} {cold * 1000:>10.1f} {before / cold:>8.1f}")
+    print(f"{'after warm':>12} {warm * 1000:>10.1f} {before / warm:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
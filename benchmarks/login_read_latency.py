@@ -0,0 +1,98 @@
+"""
+Benchmark: p99 latency of GET /v1/api/products/ while logins are running
+
+Everything runs in one event loop through an ASGI transport, so any blocking
+work done by a login (bcrypt) shows up directly as read latency.
+
+Run from the repository root:
+    python -m benchmarks.login_read_latency
+"""
+
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("REFRESH_TOKEN_EXPIRE_MINUTES", "120")
+
+import httpx
+
+from src.main import app
+
+USERNAME = "benchmark"
+PASSWORD = "Benchmark1!"
+READS = 300
+CONCURRENT_LOGINS = 4
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def measure_reads(client: httpx.AsyncClient, headers: dict) -> list[float]:
+    latencies = []
+    for _ in range(READS):
+        started = time.perf_counter()
+        response = await client.get("/v1/api/products/", headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return latencies
+
+
+async def login_forever(client: httpx.AsyncClient, login_path: str) -> None:
+    while True:
+        await client.get(
+            login_path, params={"username": USERNAME, "password": PASSWORD}
+        )
+
+
+async def main() -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        login_path = app.url_path_for("login")
+        await client.post(
+            "/v1/api/users/create",
+            json={
+                "username": USERNAME,
+                "email": "benchmark@example.com",
+                "password": PASSWORD,
+                "is_admin": True,
+            },
+        )
+        response = await client.get(
+            login_path, params={"username": USERNAME, "password": PASSWORD}
+        )
+        headers = {"Authorization": response.json()["access_token"]}
+        for i in range(100):
+            await client.post(
+                "/v1/api/products/create",
+                json={"name": f"product-{i}", "quantity": 1, "price": 1.0},
+                headers=headers,
+            )
+
+        idle = await measure_reads(client, headers)
+
+        logins = [
+            asyncio.create_task(login_forever(client, login_path))
+            for _ in range(CONCURRENT_LOGINS)
+        ]
+        under_load = await measure_reads(client, headers)
+        for task in logins:
+            task.cancel()
+        await asyncio.gather(*logins, return_exceptions=True)
+
+    print(f"{'scenario':>12} {'p50, ms':>9} {'p99, ms':>9}")
+    for name, values in (("idle", idle), ("logins", under_load)):
+        print(
+            f"{name:>12} {statistics.median(values):>9.2f} {percentile(values, 0.99):>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
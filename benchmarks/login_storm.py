@@ -0,0 +1,146 @@
+"""
+Benchmark: GET /v1/api/products/ latency during a credential-stuffing spike
+
+ATTACKERS clients on ATTACKER_IPS addresses each try a random username every
+ATTACK_INTERVAL_SECONDS, ignoring Retry-After, while one client reads
+products every 10 ms. Runs once with login admission control as configured
+and once with it opened wide (the behaviour before it existed), and reports
+read latency, how the logins were answered, how many reached bcrypt and the
+CPU time the process used.
+
+Run from the repository root:
+    python -m benchmarks.login_storm
+"""
+
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("REFRESH_TOKEN_EXPIRE_MINUTES", "120")
+
+import httpx
+
+from src.core.user.admission import TokenBuckets, login_admission
+from src.core.user.hashing import password_hasher
+from src.main import app
+
+USERNAME = "benchmark"
+PASSWORD = "Benchmark1!"
+READS = 300
+# Between reads, the in-process app never yields to the attackers otherwise
+READ_INTERVAL_SECONDS = 0.01
+ATTACKERS = 64
+ATTACKER_IPS = 16
+ATTACK_INTERVAL_SECONDS = 0.25
+UNLIMITED = 10**9
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def client(ip: str) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=app, client=(ip, 50000))
+    return httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+
+async def measure_reads(reader: httpx.AsyncClient, headers: dict) -> list[float]:
+    latencies = []
+    for _ in range(READS):
+        started = time.perf_counter()
+        response = await reader.get("/v1/api/products/", headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+        await asyncio.sleep(READ_INTERVAL_SECONDS)
+    return latencies
+
+
+async def stuff_credentials(attacker: httpx.AsyncClient, n: int, statuses: Counter):
+    attempt = 0
+    while True:
+        attempt += 1
+        response = await attacker.get(
+            "/v1/api/userslogin",
+            params={"username": f"victim-{n}-{attempt}", "password": "hunter2"},
+        )
+        statuses[response.status_code] += 1
+        await asyncio.sleep(ATTACK_INTERVAL_SECONDS)
+
+
+async def run_storm(reader: httpx.AsyncClient, headers: dict) -> tuple:
+    attackers = [client(f"10.0.0.{n % ATTACKER_IPS}") for n in range(ATTACKERS)]
+    statuses = Counter()
+    hashed_before = password_hasher.submitted
+    cpu_before = time.process_time()
+    tasks = [
+        asyncio.create_task(stuff_credentials(attacker, n, statuses))
+        for n, attacker in enumerate(attackers)
+    ]
+    latencies = await measure_reads(reader, headers)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    cpu_seconds = time.process_time() - cpu_before
+    for attacker in attackers:
+        await attacker.aclose()
+    hashed = password_hasher.submitted - hashed_before
+    return latencies, statuses, hashed, cpu_seconds
+
+
+async def main() -> None:
+    async with client("192.168.0.1") as reader:
+        await reader.post(
+            "/v1/api/users/create",
+            json={
+                "username": USERNAME,
+                "email": "benchmark@example.com",
+                "password": PASSWORD,
+                "is_admin": True,
+            },
+        )
+        response = await reader.get(
+            "/v1/api/userslogin", params={"username": USERNAME, "password": PASSWORD}
+        )
+        headers = {"Authorization": response.json()["access_token"]}
+        for i in range(100):
+            await reader.post(
+                "/v1/api/products/create",
+                json={"name": f"product-{i}", "quantity": 1, "price": 1.0},
+                headers=headers,
+            )
+
+        cpu_before = time.process_time()
+        idle = await measure_reads(reader, headers)
+        idle_cpu_seconds = time.process_time() - cpu_before
+        results = [("idle", idle, Counter(), 0, idle_cpu_seconds)]
+        results.append(("admission", *await run_storm(reader, headers)))
+
+        login_admission.max_concurrent = UNLIMITED
+        login_admission.user_buckets = TokenBuckets(UNLIMITED, UNLIMITED, UNLIMITED)
+        login_admission.ip_buckets = TokenBuckets(UNLIMITED, UNLIMITED, UNLIMITED)
+        results.append(("no admission", *await run_storm(reader, headers)))
+
+    print(
+        f"{ATTACKERS} attackers on {ATTACKER_IPS} IPs, "
+        f"{ATTACKERS / ATTACK_INTERVAL_SECONDS:.0f} logins/s, {READS} product reads"
+    )
+    print(
+        f"{'scenario':>12} {'p50, ms':>9} {'p99, ms':>9} {'cpu, s':>7} "
+        f"{'bcrypt':>7}  logins"
+    )
+    for name, latencies, statuses, hashed, cpu_seconds in results:
+        print(
+            f"{name:>12} {statistics.median(latencies):>9.2f} "
+            f"{percentile(latencies, 0.99):>9.2f} {cpu_seconds:>7.1f} "
+            f"{hashed:>7}  {dict(statuses)}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Load test: product event fan-out to 10k idle and 1k active subscribers
+
+Idle subscribers never read (their queues fill up and drop), active ones
+drain their queue like a WebSocket sender would. A probe task measures how
+late the event loop wakes it up while events are being published.
+
+Run from the repository root:
+    python -m benchmarks.product_events_fanout
+"""
+
+import asyncio
+import statistics
+import time
+
+from src.core.product.entities import ProductResponse
+from src.core.product.events import (
+    ProductEvent,
+    ProductEventBroker,
+    ProductEventType,
+)
+
+IDLE_SUBSCRIBERS = 10_000
+ACTIVE_SUBSCRIBERS = 1_000
+EVENTS = 1_000
+EVENTS_PER_SECOND = 200
+PROBE_INTERVAL = 0.005
+
+
+async def consume(subscription, received: list[int], index: int) -> None:
+    while True:
+        await subscription.get()
+        received[index] += 1
+
+
+async def probe(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+
+async def main() -> None:
+    broker = ProductEventBroker(max_pending=256, log_size=4096)
+    for _ in range(IDLE_SUBSCRIBERS):
+        broker.subscribe()
+
+    received = [0] * ACTIVE_SUBSCRIBERS
+    consumers = [
+        asyncio.create_task(consume(broker.subscribe(), received, i))
+        for i in range(ACTIVE_SUBSCRIBERS)
+    ]
+
+    lags = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+
+    publish_times = []
+    started = time.perf_counter()
+    for i in range(EVENTS):
+        product = ProductResponse(
+            id=i % 500 + 1, name=f"product-{i}", quantity=i, price=1.0
+        )
+        event = ProductEvent(
+            type=ProductEventType.UPDATED, product_id=product.id, product=product
+        )
+        publish_started = time.perf_counter()
+        broker.publish(event)
+        publish_times.append((time.perf_counter() - publish_started) * 1000)
+        await asyncio.sleep(1 / EVENTS_PER_SECOND)
+    await asyncio.sleep(0.1)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe_task
+    for task in consumers:
+        task.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+
+    metrics = broker.metrics()
+    print(f"subscribers          {metrics['subscribers']}")
+    print(f"events published     {EVENTS} in {elapsed:.2f}s")
+    print(
+        f"publish p50/p99, ms  {statistics.median(publish_times):.2f} / {sorted(publish_times)[int(len(publish_times) * 0.99)]:.2f}"
+    )
+    print(f"loop lag p50/max, ms {statistics.median(lags):.2f} / {max(lags):.2f}")
+    print(f"delivered to active  {sum(received)}")
+    print(f"coalesced / dropped  {metrics['coalesced']} / {metrics['dropped']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,37 @@
+"""
+Micro-benchmark: ProductManager.add latency as the catalogue grows
+
+Run from the repository root:
+    python -m benchmarks.product_manager_create
+"""
+
+import time
+
+from src.core.product.entities import ProductCreate
+from src.products.managers import ProductManager
+
+CHECKPOINTS = [1_000, 10_000, 100_000, 1_000_000]
+WINDOW = 1_000
+
+
+def main() -> None:
+    manager = ProductManager()
+    created = 0
+
+    print(f"{'products':>10} {'avg create, us':>16}")
+    for checkpoint in CHECKPOINTS:
+        while created < checkpoint - WINDOW:
+            manager.add(ProductCreate(name=f"product-{created}", quantity=1, price=1.0))
+            created += 1
+
+        started = time.perf_counter()
+        for _ in range(WINDOW):
+            manager.add(ProductCreate(name=f"product-{created}", quantity=1, price=1.0))
+            created += 1
+        elapsed = time.perf_counter() - started
+
+        print(f"{checkpoint:>10} {elapsed / WINDOW * 1_000_000:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: concurrent reads of one hot product, with and without coalescing
+
+BURSTS bursts of CONCURRENCY concurrent detail reads (version lookup, product
+read, JSON serialisation) of the same product from an SQLite store:
+
+direct:    every read goes to the repository, as before ProductService
+           coalesced them
+coalesced: through ProductService, concurrent reads share one fetch
+window:    through ProductService with a WINDOW_MS micro-cache, bursts
+           close together also share results
+
+Reports the wall time per burst and the backend reads it cost.
+
+Run from the repository root:
+    python -m benchmarks.product_read_coalescing
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+from src.api.rest.serialization import SerializedModelCache
+from src.core.product.entities import ProductCreate
+from src.core.product.events import product_event_broker
+from src.core.product.services import ProductService
+from src.db.engine import create_engine, create_tables
+from src.products.sqlalchemy_repository import SQLAlchemyProductRepository
+
+BURSTS = 50
+CONCURRENCY = 200
+WINDOW_MS = 50
+
+
+class CountingRepository:
+    """
+    Counts the single product reads that reach the wrapped repository
+    """
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.stable_objects = repository.stable_objects
+        self.reads = 0
+
+    async def get_by_id(self, product_id: int):
+        self.reads += 1
+        return await self.repository.get_by_id(product_id)
+
+    async def get_product_version(self, product_id: int) -> int:
+        self.reads += 1
+        return await self.repository.get_product_version(product_id)
+
+
+async def run(
+    get_version, get_product, repository: CountingRepository, product_id: int
+) -> dict:
+    json_cache = SerializedModelCache(stable_objects=repository.stable_objects)
+
+    async def read_detail() -> bytes:
+        await get_version(product_id)
+        product = await get_product(product_id)
+        return json_cache.get(product.id, product)
+
+    repository.reads = 0
+    started = time.perf_counter()
+    for _ in range(BURSTS):
+        await asyncio.gather(*[read_detail() for _ in range(CONCURRENCY)])
+    elapsed = time.perf_counter() - started
+    return {
+        "ms_per_burst": elapsed / BURSTS * 1000,
+        "backend_reads": repository.reads,
+        "serialisations": json_cache.misses,
+    }
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "coalescing.db")
+        engine = create_engine(f"sqlite+aiosqlite:///{path}")
+        await create_tables(engine)
+        sql_repository = SQLAlchemyProductRepository(engine)
+        product = await sql_repository.add(
+            ProductCreate(name="hot product", quantity=10, price=9.99)
+        )
+        repository = CountingRepository(sql_repository)
+
+        results = {
+            "direct": await run(
+                repository.get_product_version,
+                repository.get_by_id,
+                repository,
+                product.id,
+            )
+        }
+        for name, window_ms in (("coalesced", 0), (f"window {WINDOW_MS}ms", WINDOW_MS)):
+            service = ProductService(repository, product_event_broker, window_ms / 1000)
+            results[name] = await run(
+                service.get_product_version, service.get, repository, product.id
+            )
+            results[name]["coalesced"] = service.reads.coalesced
+            results[name]["window_hits"] = service.reads.window_hits
+        await engine.dispose()
+
+    print(f"{BURSTS} bursts of {CONCURRENCY} concurrent reads of one product")
+    print(
+        f"{'':<14} {'ms/burst':>9} {'backend reads':>14} {'serialised':>11} "
+        f"{'coalesced':>10} {'window hits':>12}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<14} {result['ms_per_burst']:>9.1f} "
+            f"{result['backend_reads']:>14} {result['serialisations']:>11} "
+            f"{result.get('coalesced', 0):>10} {result.get('window_hits', 0):>12}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""
+Benchmark: product name search on the in-memory index
+
+Fills a ProductManager with synthetic names ("<adjective> <noun> <number>"),
+then times typeahead queries one keystroke at a time, substring queries and
+paging, plus index maintenance on add and rename, and building the index from
+scratch versus restoring it from snapshot columns.
+
+Run from the repository root:
+    python -m benchmarks.product_search
+    python -m benchmarks.product_search --products 100000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from src.core.product.entities import ProductCreate, ProductUpdate
+from src.core.product.search import ProductSearchIndex, cursor_after
+from src.products.managers import ProductManager
+
+DEFAULT_PRODUCTS = 1_000_000
+LIMIT = 10
+ROUNDS = 200
+
+ADJECTIVES = (
+    "red green blue black white small large light heavy smart classic modern "
+    "vintage organic fresh frozen wireless portable digital electric wooden "
+    "steel leather cotton silk golden silver rapid quiet premium"
+).split()
+NOUNS = (
+    "apple banana cherry grape lemon mango melon orange peach pear plum "
+    "keyboard mouse monitor laptop phone tablet camera speaker headset charger "
+    "chair table lamp sofa shelf desk jacket shirt shoes watch bottle kettle"
+).split()
+
+
+def product_name(rng: random.Random, i: int) -> str:
+    return f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}"
+
+
+def time_queries(manager: ProductManager, queries: list[str]) -> list[float]:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        manager.search(query, LIMIT)
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{name:<34} {statistics.median(ordered):>9.1f} {p99:>9.1f} "
+        f"{ordered[-1]:>9.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--products", type=int, default=DEFAULT_PRODUCTS)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    manager = ProductManager()
+    started = time.perf_counter()
+    for i in range(args.products):
+        manager.add(ProductCreate(name=product_name(rng, i), quantity=1, price=1.0))
+    fill_seconds = time.perf_counter() - started
+
+    index = manager.search_index
+    items = [(product.id, product.name) for product in manager.get_all()]
+    started = time.perf_counter()
+    ProductSearchIndex().rebuild(items)
+    rebuild_seconds = time.perf_counter() - started
+    columns = ProductSearchIndex.encode_postings(index.capture())
+    started = time.perf_counter()
+    ProductSearchIndex().restore(items, columns)
+    restore_seconds = time.perf_counter() - started
+
+    typeahead = []
+    for _ in range(ROUNDS // 10):
+        word = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+        typeahead.extend(word[:length] for length in range(1, len(word) + 1))
+    substring = [
+        f"{rng.choice(NOUNS)} {rng.randrange(args.products)}" for _ in range(ROUNDS)
+    ]
+    words = [rng.choice(NOUNS)[1:] for _ in range(ROUNDS)]
+
+    print(f"{args.products} products, {LIMIT} results per page")
+    print(f"{'query':<34} {'p50 us':>9} {'p99 us':>9} {'max us':>9}")
+    report("typeahead (each keystroke)", time_queries(manager, typeahead))
+    report("substring '<noun> <number>'", time_queries(manager, substring))
+    report("substring in a word", time_queries(manager, words))
+
+    pages = []
+    for query in typeahead[:ROUNDS]:
+        after = None
+        for _ in range(5):
+            started = time.perf_counter()
+            products = manager.search(query, LIMIT, after)
+            pages.append((time.perf_counter() - started) * 1e6)
+            if len(products) < LIMIT:
+                break
+            last = products[-1]
+            after = cursor_after(query, last.id, last.name)
+    report("next pages (up to 5)", pages)
+
+    writes = []
+    for product_id in rng.sample(range(1, args.products + 1), ROUNDS):
+        started = time.perf_counter()
+        manager.update(
+            ProductUpdate(name=f"renamed {product_id}", quantity=1, price=1.0),
+            product_id,
+        )
+        writes.append((time.perf_counter() - started) * 1e6)
+    report("update with rename (incl. index)", writes)
+
+    print(
+        f"fill {fill_seconds:.1f}s (incl. index), index rebuild "
+        f"{rebuild_seconds:.1f}s, restore from snapshot columns {restore_seconds:.1f}s"
+    )
+    print(index.metrics())
+
+
+if __name__ == "__main__":
+    main()
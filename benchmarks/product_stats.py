@@ -0,0 +1,85 @@
+"""
+Benchmark: inventory aggregates kept up to date vs reduced per request
+
+write: ProductManager.update with the aggregates maintained (the old
+       product's contribution removed, the new one added)
+read:  get_stats() vs pulling every product and reducing them, which is what
+       dashboards did before /products/stats
+
+Run from the repository root:
+    python -m benchmarks.product_stats
+    python -m benchmarks.product_stats --products 100000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from src.core.product.entities import ProductCreate, ProductUpdate
+from src.products.managers import ProductManager
+
+DEFAULT_PRODUCTS = 1_000_000
+ROUNDS = 1000
+REDUCE_ROUNDS = 5
+
+
+def reduce_products(products) -> dict:
+    prices = [product.price for product in products]
+    return {
+        "total_quantity": sum(product.quantity for product in products),
+        "total_value": sum(product.price * product.quantity for product in products),
+        "out_of_stock": sum(product.quantity == 0 for product in products),
+        "min_price": min(prices, default=None),
+        "max_price": max(prices, default=None),
+    }
+
+
+def timed(function, *args) -> float:
+    started = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - started) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--products", type=int, default=DEFAULT_PRODUCTS)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    manager = ProductManager()
+    for i in range(args.products):
+        manager.add(
+            ProductCreate(
+                name=f"product-{i}",
+                quantity=rng.randrange(100),
+                price=round(rng.uniform(1, 1000), 2),
+            )
+        )
+
+    writes = []
+    for product_id in rng.sample(range(1, args.products + 1), ROUNDS):
+        update = ProductUpdate(
+            name=f"product-{product_id - 1}",
+            quantity=rng.randrange(100),
+            price=round(rng.uniform(1, 1000), 2),
+        )
+        writes.append(timed(manager.update, update, product_id))
+    stats_reads = [timed(manager.get_stats) for _ in range(ROUNDS)]
+    reduce_reads = [
+        timed(lambda: reduce_products(manager.get_all())) for _ in range(REDUCE_ROUNDS)
+    ]
+
+    print(f"{args.products} products")
+    print(f"{'operation':<32} {'p50 us':>12}")
+    for name, latencies in (
+        ("update incl. aggregates", writes),
+        ("get_stats()", stats_reads),
+        ("get_all() + reduce", reduce_reads),
+    ):
+        print(f"{name:<32} {statistics.median(latencies):>12.1f}")
+    print(manager.get_stats())
+
+
+if __name__ == "__main__":
+    main()
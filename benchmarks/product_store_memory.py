@@ -0,0 +1,102 @@
+"""
+Benchmark: memory per product of the ProductManager stores
+
+For each store (PRODUCT_STORE=objects / columnar), fills one bare store and
+one whole ProductManager (store plus name, search and stats indexes) with the
+same products and reports the traced bytes per product, then the latency of
+the reads that now build ProductResponse objects on demand.
+
+Run from the repository root:
+    python -m benchmarks.product_store_memory
+    python -m benchmarks.product_store_memory --products 1000000
+"""
+
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+
+from src.core.product.entities import ProductCreate, ProductResponse, ProductUpdate
+from src.products.managers import ProductManager
+from src.products.stores import create_product_store
+
+DEFAULT_PRODUCTS = 200_000
+STORES = ("objects", "columnar")
+ROUNDS = 1000
+
+
+def product(i: int) -> ProductCreate:
+    return ProductCreate(name=f"product name {i}", quantity=i % 100, price=1.5 + i % 7)
+
+
+def traced_bytes(fill) -> tuple[object, int]:
+    gc.collect()
+    tracemalloc.start()
+    filled = fill()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return filled, size
+
+
+def fill_store(kind: str, products: int):
+    store = create_product_store(kind)
+    for i in range(products):
+        created = product(i)
+        store.put(
+            ProductResponse(
+                id=i + 1,
+                name=created.name,
+                quantity=created.quantity,
+                price=created.price,
+            ),
+            i + 1,
+        )
+    return store
+
+
+def fill_manager(kind: str, products: int) -> ProductManager:
+    manager = ProductManager(create_product_store(kind))
+    for i in range(products):
+        manager.add(product(i))
+    return manager
+
+
+def median_us(function, *args) -> float:
+    latencies = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        function(*args)
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--products", type=int, default=DEFAULT_PRODUCTS)
+    args = parser.parse_args()
+    n = args.products
+
+    print(f"{n} products")
+    print(
+        f"{'store':<10} {'store B/product':>16} {'manager B/product':>18} "
+        f"{'get_by_id us':>13} {'page of 100 us':>15} {'update us':>10}"
+    )
+    for kind in STORES:
+        store, store_bytes = traced_bytes(lambda: fill_store(kind, n))
+        del store
+        manager, manager_bytes = traced_bytes(lambda: fill_manager(kind, n))
+        get_us = median_us(manager.get_by_id, n // 2)
+        page_us = median_us(manager.get_page, n // 2, 100)
+        update = ProductUpdate(name="product name 1", quantity=5, price=2.5)
+        update_us = median_us(manager.update, update, 2)
+        print(
+            f"{kind:<10} {store_bytes / n:>16.0f} {manager_bytes / n:>18.0f} "
+            f"{get_us:>13.1f} {page_us:>15.1f} {update_us:>10.1f}"
+        )
+        del manager
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Benchmark: cold start of the app, with and without lazy routes
+
+import: time to import src.main (the app factory included) in a fresh
+        interpreter, and which heavy dependencies it pulled in
+first:  time from spawning a uvicorn process to its first response on /,
+        then the latency of the first GraphQL request, which imports
+        strawberry when LAZY_ROUTES is on
+
+Every measurement runs in its own process, so nothing is cached between
+rounds apart from the bytecode and the OS page cache.
+
+Run from the repository root:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --rounds 10 --backend sqlalchemy
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BENCHMARK_ENV = {
+    "SECRET_KEY": "benchmark",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "REFRESH_TOKEN_EXPIRE_MINUTES": "120",
+}
+HEAVY_MODULES = ("strawberry", "graphql", "sqlalchemy", "redis", "jose")
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import src.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "heavy": [
+    name for name in %r if name in sys.modules
+]}))
+""" % (HEAVY_MODULES,)
+STARTUP_TIMEOUT_SECONDS = 30
+
+
+def environment(backend: str, lazy: bool, directory: str) -> dict:
+    env = {
+        **BENCHMARK_ENV,
+        **os.environ,
+        "STORAGE_BACKEND": backend,
+        "LAZY_ROUTES": "true" if lazy else "false",
+    }
+    if backend == "sqlalchemy" and "DATABASE_URL" not in os.environ:
+        path = os.path.join(directory, "startup.db")
+        env["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    if backend == "redis" and "REDIS_URL" not in os.environ:
+        env["REDIS_URL"] = "fakeredis://"
+    return env
+
+
+def measure_import(env: dict) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(url: str, body: bytes | None = None) -> int:
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    try:
+        with urllib.request.urlopen(
+            urllib.request.Request(url, data=body, headers=headers), timeout=5
+        ) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        # Unauthenticated GraphQL requests are refused, but only once served
+        return error.code
+
+
+def measure_first_response(env: dict) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "src.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    try:
+        while True:
+            if time.perf_counter() - started > STARTUP_TIMEOUT_SECONDS:
+                raise RuntimeError("server did not start")
+            try:
+                request(f"{base}/")
+                break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        first_response = time.perf_counter() - started
+
+        query = json.dumps({"query": "{ __typename }"}).encode()
+        graphql_started = time.perf_counter()
+        request(f"{base}/v1/api/graphql", query)
+        first_graphql = time.perf_counter() - graphql_started
+        graphql_started = time.perf_counter()
+        request(f"{base}/v1/api/graphql", query)
+        second_graphql = time.perf_counter() - graphql_started
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "first_response": first_response,
+        "first_graphql": first_graphql,
+        "second_graphql": second_graphql,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument(
+        "--backend", choices=("memory", "sqlalchemy", "redis"), default="memory"
+    )
+    args = parser.parse_args()
+
+    print(f"backend {args.backend}, median of {args.rounds} rounds")
+    print(
+        f"{'lazy routes':<12} {'import ms':>10} {'first resp ms':>14} "
+        f"{'1st graphql ms':>15} {'2nd graphql ms':>15}  imported"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for lazy in (False, True):
+            env = environment(args.backend, lazy, directory)
+            imports = [measure_import(env) for _ in range(args.rounds)]
+            starts = [measure_first_response(env) for _ in range(args.rounds)]
+            import_ms = statistics.median(i["seconds"] for i in imports) * 1000
+
+            def median_ms(key: str) -> float:
+                return statistics.median(s[key] for s in starts) * 1000
+
+            print(
+                f"{str(lazy):<12} {import_ms:>10.1f} "
+                f"{median_ms('first_response'):>14.1f} "
+                f"{median_ms('first_graphql'):>15.1f} "
+                f"{median_ms('second_graphql'):>15.1f}  "
+                f"{', '.join(imports[-1]['heavy']) or '-'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
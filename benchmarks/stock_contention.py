@@ -0,0 +1,123 @@
+"""
+Benchmark: many clients taking stock of one hot product at the same time
+
+CLIENTS concurrent clients each take one unit at a time until the product is
+sold out, first the way they had to before the stock endpoints (GET the
+product, PATCH it back with quantity - 1), then with POST .../reserve. Reports
+the requests per second, the units handed out and the units lost to
+overwritten updates, which must be zero for reserve. The memory backend
+handles a request without yielding, so it only loses updates across workers;
+the shared backends lose them within one.
+
+Run from the repository root:
+    python -m benchmarks.stock_contention
+    STORAGE_BACKEND=redis REDIS_URL=redis://localhost:6379 \
+        python -m benchmarks.stock_contention --stock 500
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("REFRESH_TOKEN_EXPIRE_MINUTES", "120")
+
+import httpx
+
+from src.main import app
+
+USERNAME = "benchmark"
+PASSWORD = "Benchmark1!"
+DEFAULT_CLIENTS = 32
+DEFAULT_STOCK = 2000
+
+
+async def read_modify_write(client: httpx.AsyncClient, product_id: int, headers):
+    taken = 0
+    while True:
+        product = await client.get(f"/v1/api/products/{product_id}", headers=headers)
+        product = product.json()
+        if product["quantity"] == 0:
+            return taken
+        response = await client.patch(
+            f"/v1/api/products/{product_id}",
+            json={**product, "quantity": product["quantity"] - 1},
+            headers=headers,
+        )
+        response.raise_for_status()
+        taken += 1
+
+
+async def reserve(client: httpx.AsyncClient, product_id: int, headers):
+    taken = 0
+    while True:
+        response = await client.post(
+            f"/v1/api/products/{product_id}/reserve",
+            json={"quantity": 1},
+            headers=headers,
+        )
+        if response.status_code == 409:
+            return taken
+        response.raise_for_status()
+        taken += 1
+
+
+async def run(client, headers, name: str, take, clients: int, stock: int) -> tuple:
+    response = await client.post(
+        "/v1/api/products/create",
+        json={"name": f"hot product {name}", "quantity": stock, "price": 1.0},
+        headers=headers,
+    )
+    product_id = response.json()["created_product"]["id"]
+
+    started = time.perf_counter()
+    taken = await asyncio.gather(
+        *(take(client, product_id, headers) for _ in range(clients))
+    )
+    seconds = time.perf_counter() - started
+    handed_out = sum(taken)
+    # Requests: one per unit plus the final refusal or empty read per client
+    requests = handed_out * (2 if take is read_modify_write else 1) + clients
+    return requests / seconds, handed_out, handed_out - stock
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS)
+    parser.add_argument("--stock", type=int, default=DEFAULT_STOCK)
+    args = parser.parse_args()
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        await client.post(
+            "/v1/api/users/create",
+            json={
+                "username": USERNAME,
+                "email": "benchmark@example.com",
+                "password": PASSWORD,
+                "is_admin": True,
+            },
+        )
+        response = await client.get(
+            "/v1/api/userslogin", params={"username": USERNAME, "password": PASSWORD}
+        )
+        headers = {"Authorization": response.json()["access_token"]}
+
+        results = [
+            (name, *await run(client, headers, name, take, args.clients, args.stock))
+            for name, take in (("GET + PATCH", read_modify_write), ("reserve", reserve))
+        ]
+
+    print(f"{args.clients} clients, {args.stock} units of one product")
+    print(f"{'method':<12} {'requests/s':>11} {'handed out':>11} {'lost updates':>13}")
+    for name, throughput, handed_out, lost in results:
+        print(f"{name:<12} {throughput:>11.0f} {handed_out:>11} {lost:>13}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
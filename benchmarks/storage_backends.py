@@ -0,0 +1,76 @@
+"""
+Benchmark: in-memory vs async SQLAlchemy (SQLite) product repositories
+
+Run from the repository root:
+    python -m benchmarks.storage_backends
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+from src.core.product.entities import ProductCreate, ProductUpdate
+from src.db.engine import create_engine, create_tables
+from src.products.managers import ProductManager
+from src.products.repositories import InMemoryProductRepository
+from src.products.sqlalchemy_repository import SQLAlchemyProductRepository
+
+PRODUCTS = 5_000
+PAGE_SIZE = 100
+
+
+async def run(repository) -> dict:
+    """
+    Returns seconds per call, get_page is one page of PAGE_SIZE products
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    for i in range(PRODUCTS):
+        await repository.add(ProductCreate(name=f"product-{i}", quantity=1, price=1.0))
+    timings["add"] = (time.perf_counter() - started) / PRODUCTS
+
+    started = time.perf_counter()
+    for product_id in range(1, PRODUCTS + 1):
+        await repository.get_by_id(product_id)
+    timings["get_by_id"] = (time.perf_counter() - started) / PRODUCTS
+
+    started = time.perf_counter()
+    for product_id in range(1, PRODUCTS + 1):
+        await repository.update(
+            ProductUpdate(name=f"product-{product_id - 1}", quantity=2, price=2.0),
+            product_id,
+        )
+    timings["update"] = (time.perf_counter() - started) / PRODUCTS
+
+    started = time.perf_counter()
+    after_id = 0
+    pages = 0
+    while page := await repository.get_page(after_id, PAGE_SIZE):
+        after_id = page[-1].id
+        pages += 1
+    timings["get_page"] = (time.perf_counter() - started) / pages
+
+    return timings
+
+
+async def main() -> None:
+    results = {"memory": await run(InMemoryProductRepository(ProductManager()))}
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(
+            f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        )
+        await create_tables(engine)
+        results["sqlite"] = await run(SQLAlchemyProductRepository(engine))
+        await engine.dispose()
+
+    print(f"{'backend':>8} {'operation':>10} {'avg per call, us':>18}")
+    for backend, timings in results.items():
+        for operation, elapsed in timings.items():
+            print(f"{backend:>8} {operation:>10} {elapsed * 1e6:>18.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
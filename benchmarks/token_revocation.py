@@ -0,0 +1,91 @@
+"""
+Benchmark: revocation check of a refresh token id, Bloom filter vs store
+
+For REVOKED revoked ids in an SQLite store, reports the time of
+TokenRevocationList.is_revoked for ids that were not revoked (the common
+case, answered by the filter) and for revoked ones (filter match plus store
+lookup), next to the store lookup alone. Also reports the filter's measured
+false positive rate, its size and the time of a rebuild.
+
+Run from the repository root:
+    python -m benchmarks.token_revocation
+"""
+
+import asyncio
+import os
+import secrets
+import tempfile
+import time
+
+from src.core.user.revocation import BloomFilter, TokenRevocationList
+from src.db.engine import create_engine, create_tables
+from src.users.sqlalchemy_repository import SQLAlchemyUserRepository
+
+REVOKED = 10_000
+CHECKS = 2_000
+ERROR_RATE = 0.001
+FALSE_POSITIVE_PROBES = 200_000
+
+
+async def per_call_us(check, jtis: list[str]) -> float:
+    started = time.perf_counter()
+    for jti in jtis:
+        await check(jti)
+    return (time.perf_counter() - started) / len(jtis) * 1e6
+
+
+def false_positive_rate() -> tuple[float, int]:
+    bloom_filter = BloomFilter(REVOKED, ERROR_RATE)
+    for _ in range(REVOKED):
+        bloom_filter.add(secrets.token_urlsafe(16))
+    matches = sum(
+        secrets.token_urlsafe(16) in bloom_filter for _ in range(FALSE_POSITIVE_PROBES)
+    )
+    return matches / FALSE_POSITIVE_PROBES, (bloom_filter.size + 7) // 8
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "revocation.db")
+        engine = create_engine(f"sqlite+aiosqlite:///{path}")
+        await create_tables(engine)
+        repository = SQLAlchemyUserRepository(engine)
+        revocations = TokenRevocationList(
+            repository, capacity=REVOKED, error_rate=ERROR_RATE
+        )
+
+        expires_at = int(time.time()) + 3600
+        revoked = [secrets.token_urlsafe(16) for _ in range(REVOKED)]
+        for jti in revoked:
+            await repository.revoke_token(jti, expires_at)
+        started = time.perf_counter()
+        await revocations.rebuild()
+        rebuild_ms = (time.perf_counter() - started) * 1000
+
+        not_revoked = [secrets.token_urlsafe(16) for _ in range(CHECKS)]
+        results = {
+            "not revoked, filter": await per_call_us(
+                revocations.is_revoked, not_revoked
+            ),
+            "not revoked, store only": await per_call_us(
+                repository.is_token_revoked, not_revoked
+            ),
+            "revoked, filter + store": await per_call_us(
+                revocations.is_revoked, revoked[:CHECKS]
+            ),
+        }
+        await engine.dispose()
+
+    rate, size = false_positive_rate()
+    print(f"{REVOKED} revoked ids in SQLite")
+    for name, us in results.items():
+        print(f"{name:<26} {us:>10.2f} us/check")
+    print(f"rebuild                    {rebuild_ms:>10.1f} ms")
+    print(
+        f"false positives            {rate:>10.4%} "
+        f"(target {ERROR_RATE:.2%}, filter {size} bytes)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration, loaded from the working directory
+
+The app is imported and warmed up once in the master (preload_app), the
+workers fork from it and share its modules and state copy-on-write instead
+of each importing them on startup.
+"""
+
+import gc
+import os
+import tempfile
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+# The in-memory stores are per worker, journaling them (JOURNAL_DIR) needs
+# WEB_CONCURRENCY=1: a second worker fails to start on the journal's lock
+workers = int(os.environ.get("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+wsgi_app = "src.main:app"
+preload_app = True
+
+# The settings default is keyed by the parent pid, which the preloading master
+# does not share with its workers
+os.environ.setdefault(
+    "METRICS_DIR",
+    os.path.join(tempfile.gettempdir(), f"playground-metrics-{os.getpid()}"),
+)
+
+
+def when_ready(server):
+    from src.app import warm_up
+
+    warm_up(server.app.wsgi())
+    # Keeps the preloaded objects out of the workers' collections, which would
+    # otherwise write to (and so copy) every page they live on
+    gc.freeze()
@@ -0,0 +1,89 @@
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    InlineFragmentNode,
+    IntValueNode,
+    ValidationRule,
+    get_named_type,
+)
+
+from src.core.pagination import MAX_PAGE_SIZE
+from src.settings import get_settings
+
+GRAPHQL_MAX_DEPTH: int = get_settings().graphql_max_depth
+GRAPHQL_MAX_COMPLEXITY: int = get_settings().graphql_max_complexity
+GRAPHQL_MAX_ALIASES: int = get_settings().graphql_max_aliases
+
+
+class QueryComplexityRule(ValidationRule):
+    """
+    Rejects operations whose estimated cost exceeds GRAPHQL_MAX_COMPLEXITY
+
+    Every field costs 1. The selections of a field with a `first` argument
+    are counted once per requested item: the literal value, its default when
+    omitted, MAX_PAGE_SIZE when it comes from a variable (worst case).
+    """
+
+    def enter_operation_definition(self, node, *_):
+        root_type = self.context.schema.get_root_type(node.operation)
+        if root_type is None:
+            return
+        cost = self._selection_cost(node.selection_set, root_type, set())
+        if cost > GRAPHQL_MAX_COMPLEXITY:
+            self.report_error(
+                GraphQLError(
+                    f"Query complexity {cost} exceeds the limit of "
+                    f"{GRAPHQL_MAX_COMPLEXITY}",
+                    node,
+                )
+            )
+
+    def _selection_cost(self, selection_set, parent_type, fragments: set) -> int:
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                fields = getattr(parent_type, "fields", {})
+                field = fields.get(selection.name.value)
+                if field is None:
+                    # Introspection and unknown fields (reported by other rules)
+                    continue
+                cost += 1
+                if selection.selection_set is not None:
+                    cost += self._page_size(selection, field) * self._selection_cost(
+                        selection.selection_set, get_named_type(field.type), fragments
+                    )
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition is not None:
+                    fragment_type = self.context.schema.get_type(
+                        selection.type_condition.name.value
+                    )
+                cost += self._selection_cost(
+                    selection.selection_set, fragment_type, fragments
+                )
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.context.get_fragment(name)
+                if fragment is None or name in fragments:
+                    # Unknown or cyclic fragments are reported by other rules
+                    continue
+                cost += self._selection_cost(
+                    fragment.selection_set,
+                    self.context.schema.get_type(fragment.type_condition.name.value),
+                    fragments | {name},
+                )
+        return cost
+
+    @staticmethod
+    def _page_size(node: FieldNode, field) -> int:
+        if "first" not in field.args:
+            return 1
+        for argument in node.arguments or ():
+            if argument.name.value != "first":
+                continue
+            if isinstance(argument.value, IntValueNode):
+                return max(1, min(int(argument.value.value), MAX_PAGE_SIZE))
+            return MAX_PAGE_SIZE
+        default = field.args["first"].default_value
+        return default if isinstance(default, int) else MAX_PAGE_SIZE
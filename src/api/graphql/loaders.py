@@ -0,0 +1,32 @@
+from strawberry.dataloader import DataLoader
+
+from src.api.graphql.types import Product, User
+from src.core.product.services import product_service
+from src.core.user.services import UserService
+
+
+async def load_products(product_ids: list[int]) -> list[Product | None]:
+    products = await product_service.get_many(product_ids)
+    return [
+        Product.from_response(product) if product is not None else None
+        for product in products
+    ]
+
+
+async def load_users(user_ids: list[int]) -> list[User | None]:
+    user_tuples = await UserService.get_many(user_ids)
+    return [
+        User.from_stored(*user_tuple) if user_tuple is not None else None
+        for user_tuple in user_tuples
+    ]
+
+
+class Loaders:
+    """
+    Per-request loaders: every .load() made while resolving one level of the
+    query is collected and fetched with a single get_many call
+    """
+
+    def __init__(self):
+        self.products = DataLoader(load_fn=load_products)
+        self.users = DataLoader(load_fn=load_users)
@@ -0,0 +1,29 @@
+from fastapi import Depends
+from strawberry.fastapi import BaseContext, GraphQLRouter
+
+from src.api.graphql.loaders import Loaders
+from src.api.graphql.schema import schema
+from src.api.rest.user.dependencies import get_current_user_from_jwt
+from src.core.user.entities import Principal
+
+
+class GraphQLContext(BaseContext):
+    def __init__(self, current_user: Principal):
+        super().__init__()
+        self.current_user = current_user
+        self.loaders = Loaders()
+
+
+async def get_context(
+    current_user=Depends(get_current_user_from_jwt),
+) -> GraphQLContext:
+    return GraphQLContext(current_user)
+
+
+graphql_router = GraphQLRouter(
+    schema,
+    prefix="/graphql",
+    context_getter=get_context,
+    graphql_ide=None,
+    tags=["graphql"],
+)
@@ -0,0 +1,98 @@
+import strawberry
+from strawberry.extensions import (
+    AddValidationRules,
+    MaxAliasesLimiter,
+    QueryDepthLimiter,
+)
+from strawberry.permission import BasePermission
+from strawberry.types import Info
+
+from src.api.graphql.limits import (
+    GRAPHQL_MAX_ALIASES,
+    GRAPHQL_MAX_DEPTH,
+    QueryComplexityRule,
+)
+from src.api.graphql.types import Product, ProductPage, User, UserPage
+from src.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+)
+from src.core.permissions import Permissions, permissions_to_mask
+from src.core.product.services import product_service
+from src.core.user.services import UserService
+
+
+class CanViewProducts(BasePermission):
+    message = "This user doesn't have necessary permissions"
+    required_mask = permissions_to_mask([Permissions.VIEW_PRODUCT])
+
+    def has_permission(self, source, info: Info, **kwargs) -> bool:
+        mask = info.context.current_user.permission_mask
+        return mask & self.required_mask == self.required_mask
+
+
+def _page_size(first: int) -> int:
+    if not 1 <= first <= MAX_PAGE_SIZE:
+        raise ValueError(f"first must be between 1 and {MAX_PAGE_SIZE}")
+    return first
+
+
+@strawberry.type
+class Query:
+    @strawberry.field(
+        description="Page of products ordered by ID",
+        permission_classes=[CanViewProducts],
+    )
+    async def products(
+        self, first: int = DEFAULT_PAGE_SIZE, after: str | None = None
+    ) -> ProductPage:
+        page_size = _page_size(first)
+        products = await product_service.get_page(decode_cursor(after), page_size)
+        next_cursor = None
+        if len(products) == page_size:
+            next_cursor = encode_cursor(products[-1].id)
+        return ProductPage(
+            total_count=await product_service.count(),
+            next_cursor=next_cursor,
+            items=[Product.from_response(product) for product in products],
+        )
+
+    @strawberry.field(permission_classes=[CanViewProducts])
+    async def product(self, info: Info, id: int) -> Product | None:
+        return await info.context.loaders.products.load(id)
+
+    @strawberry.field(description="Page of users ordered by ID")
+    async def users(
+        self, first: int = DEFAULT_PAGE_SIZE, after: str | None = None
+    ) -> UserPage:
+        page_size = _page_size(first)
+        users = await UserService.get_page(decode_cursor(after), page_size)
+        next_cursor = None
+        if len(users) == page_size:
+            next_cursor = encode_cursor(users[-1][0])
+        return UserPage(
+            total_count=await UserService.count(),
+            next_cursor=next_cursor,
+            items=[User.from_stored(*user_tuple) for user_tuple in users],
+        )
+
+    @strawberry.field
+    async def user(self, info: Info, id: int) -> User | None:
+        return await info.context.loaders.users.load(id)
+
+    @strawberry.field(description="The authenticated user")
+    def me(self, info: Info) -> User:
+        current_user = info.context.current_user
+        return User.from_stored(current_user.id, current_user)
+
+
+schema = strawberry.Schema(
+    query=Query,
+    extensions=[
+        QueryDepthLimiter(max_depth=GRAPHQL_MAX_DEPTH),
+        MaxAliasesLimiter(max_alias_count=GRAPHQL_MAX_ALIASES),
+        AddValidationRules([QueryComplexityRule]),
+    ],
+)
@@ -0,0 +1,62 @@
+import strawberry
+from strawberry.types import Info
+
+from src.core.product.entities import ProductResponse
+
+
+@strawberry.type
+class User:
+    id: int
+    username: str
+    email: str
+    is_admin: bool
+    permissions: list[str]
+
+    @classmethod
+    def from_stored(cls, user_id: int, user) -> "User":
+        return cls(
+            id=user_id,
+            username=user.username,
+            email=user.email,
+            is_admin=user.is_admin,
+            permissions=list(user.permissions),
+        )
+
+
+@strawberry.type
+class Product:
+    id: int
+    name: str
+    quantity: int
+    price: float
+    created_by_id: strawberry.Private[int | None]
+
+    @strawberry.field(description="User who created the product")
+    async def created_by(self, info: Info) -> User | None:
+        if self.created_by_id is None:
+            return None
+        return await info.context.loaders.users.load(self.created_by_id)
+
+    @classmethod
+    def from_response(cls, product: ProductResponse) -> "Product":
+        return cls(
+            id=product.id,
+            name=product.name,
+            quantity=product.quantity,
+            price=product.price,
+            created_by_id=product.created_by,
+        )
+
+
+@strawberry.type
+class ProductPage:
+    total_count: int
+    next_cursor: str | None
+    items: list[Product]
+
+
+@strawberry.type
+class UserPage:
+    total_count: int
+    next_cursor: str | None
+    items: list[User]
@@ -0,0 +1,47 @@
+import importlib
+
+from fastapi import APIRouter
+from starlette.routing import Route
+
+
+class LazyRouter:
+    """
+    ASGI app serving an APIRouter that is imported on its first request
+
+    Keeps a heavy router (and everything its module imports) out of the
+    startup path. Exceptions propagate to the app's own handlers as for any
+    other route. The router's routes are missing from the OpenAPI schema
+    until it is loaded.
+
+    import_path: "package.module:router_name"
+    """
+
+    def __init__(self, import_path: str, prefix: str = ""):
+        self.import_path = import_path
+        self.prefix = prefix
+        self._router = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._router is not None
+
+    def load(self) -> APIRouter:
+        if self._router is None:
+            module_name, router_name = self.import_path.split(":")
+            router = APIRouter(prefix=self.prefix)
+            router.include_router(
+                getattr(importlib.import_module(module_name), router_name)
+            )
+            self._router = router
+        return self._router
+
+    async def __call__(self, scope, receive, send):
+        await self.load()(scope, receive, send)
+
+
+def lazy_route(path: str, import_path: str, prefix: str, methods: list[str]) -> Route:
+    """
+    Route for `path` served by a LazyRouter, `prefix` is what `path` is
+    mounted under in the eagerly included routers
+    """
+    return Route(path, LazyRouter(import_path, prefix), methods=methods)
@@ -0,0 +1,85 @@
+import time
+
+from fastapi import APIRouter, Response
+
+from src.core.metrics import metrics_registry
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+http_requests = metrics_registry.counter(
+    "http_requests_total",
+    "HTTP requests by route template, method and status",
+    ("route", "method", "status"),
+)
+http_request_seconds = metrics_registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and method",
+    ("route", "method"),
+)
+
+metrics_router = APIRouter(tags=["metrics"])
+
+
+@metrics_router.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    description="Metrics of all workers in the Prometheus text format.",
+    include_in_schema=False,
+)
+async def metrics() -> Response:
+    return Response(metrics_registry.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
+def route_template(scope) -> str:
+    """
+    Template of the matched route, with the prefixes of the routers it was
+    included in
+
+    FastAPI versions that do not copy included routes match the router's own
+    route, whose template lacks those prefixes. They are taken from the
+    request path instead: the route's template covers as many trailing
+    segments of it as it has (no route uses a multi-segment path converter).
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if not path:
+        return "unmatched"
+    segments = scope["path"].split("/")
+    prefix = "/".join(segments[: len(segments) - path.count("/")])
+    return prefix + path
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request counts and latency per route
+
+    Requests are labelled with the matched route template (not the raw path)
+    so the number of series stays bounded, unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route_path = route_template(scope)
+            method = scope["method"]
+            http_request_seconds.observe(
+                time.perf_counter() - started, route_path, method
+            )
+            http_requests.inc(route_path, method, status_code)
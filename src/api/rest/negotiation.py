@@ -0,0 +1,268 @@
+import gzip
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+from pydantic_core import from_json
+from starlette import status
+
+from src.api.rest.serialization import JSONBytesResponse
+from src.settings import get_settings
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        from backports import zstd
+    except ImportError:
+        zstd = None
+
+COMPRESSION_MIN_BYTES: int = get_settings().compression_min_bytes
+GZIP_LEVEL: int = get_settings().gzip_level
+ZSTD_LEVEL: int = get_settings().zstd_level
+ENCODED_CACHE_MAX_BYTES: int = get_settings().encoded_cache_max_bytes
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_MEDIA_TYPES = (
+    MSGPACK_MEDIA_TYPE,
+    "application/x-msgpack",
+    "application/vnd.msgpack",
+)
+# Preferred first when the client weighs them equally
+_CODINGS = tuple(
+    coding
+    for coding, available in (("zstd", zstd is not None), ("gzip", True))
+    if available
+)
+VARY = "Accept, Accept-Encoding"
+
+
+@dataclass(frozen=True, slots=True)
+class Representation:
+    """
+    Media type and content coding a response body is sent in
+    """
+
+    media_type: str = JSON_MEDIA_TYPE
+    content_encoding: str | None = None
+
+    def tag(self, etag: str) -> str:
+        """
+        ETag of this representation, each one needs its own
+
+        Tag the representation actually sent: a body under
+        COMPRESSION_MIN_BYTES goes out without the negotiated coding.
+        """
+        suffix = ""
+        if self.media_type != JSON_MEDIA_TYPE:
+            suffix += "-msgpack"
+        if self.content_encoding is not None:
+            suffix += f"-{self.content_encoding}"
+        return etag[:-1] + suffix + '"' if suffix else etag
+
+    def tags(self, etag: str) -> tuple[str, ...]:
+        """
+        ETags a response in this representation may carry, with and without
+        the coding
+        """
+        if self.content_encoding is None:
+            return (self.tag(etag),)
+        return self.tag(etag), replace(self, content_encoding=None).tag(etag)
+
+
+_JSON = Representation()
+
+
+def negotiate(request: Request) -> Representation:
+    """
+    Picks the representation from Accept and Accept-Encoding
+
+    MessagePack is sent only to clients that list it and weigh it at least
+    as high as JSON. The coding is the highest weighted of zstd and gzip,
+    bodies under COMPRESSION_MIN_BYTES are still sent uncompressed.
+    """
+    return Representation(
+        _negotiate_media_type(request.headers.get("accept")),
+        _negotiate_coding(request.headers.get("accept-encoding")),
+    )
+
+
+class EncodedBodyCache:
+    """
+    Encoded bodies keyed by (key, representation), LRU bounded by total bytes
+
+    The key is the ETag when the endpoint has one, so an unchanged collection
+    is not re-encoded and its JSON is not even rebuilt. Otherwise it is the
+    JSON body itself: equal bytes encode to equal bytes.
+    """
+
+    def __init__(self, max_bytes: int = ENCODED_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        # (key, representation) -> (body, content coding applied)
+        self._bodies = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, representation: Representation) -> tuple | None:
+        entry = self._bodies.get((key, representation))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._bodies.move_to_end((key, representation))
+        return entry
+
+    def peek(self, key, representation: Representation) -> tuple | None:
+        """
+        get() without counting or refreshing the entry
+        """
+        return self._bodies.get((key, representation))
+
+    def set(self, key, representation: Representation, entry: tuple) -> None:
+        cost = self._cost(key, entry)
+        if cost > self.max_bytes:
+            return
+        old_entry = self._bodies.pop((key, representation), None)
+        if old_entry is not None:
+            self.size -= self._cost(key, old_entry)
+        self._bodies[(key, representation)] = entry
+        self.size += cost
+        while self.size > self.max_bytes:
+            (old_key, _), evicted = self._bodies.popitem(last=False)
+            self.size -= self._cost(old_key, evicted)
+
+    def clear(self) -> None:
+        self._bodies.clear()
+        self.size = 0
+
+    def metrics(self) -> dict:
+        return {
+            "entries": len(self._bodies),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    @staticmethod
+    def _cost(key, entry: tuple) -> int:
+        return len(entry[0]) + (len(key) if isinstance(key, bytes) else 0)
+
+
+encoded_body_cache = EncodedBodyCache()
+
+
+async def encoded_response(
+    representation: Representation,
+    build_json: Callable[[], Awaitable[bytes]],
+    etag: str | None = None,
+) -> Response:
+    """
+    Response with the JSON from `build_json()` in `representation`
+
+    `etag` is the JSON representation's, the response carries the tag of
+    the one sent (see Representation.tag).
+    """
+    headers = {"Vary": VARY}
+    if representation == _JSON:
+        if etag is not None:
+            headers["ETag"] = etag
+        return JSONBytesResponse(await build_json(), headers=headers)
+
+    json_body = None
+    cache_key = etag
+    if cache_key is None:
+        cache_key = json_body = await build_json()
+    entry = encoded_body_cache.get(cache_key, representation)
+    if entry is None and json_body is None:
+        json_body = await build_json()
+        # Concurrent requests for the same ETag all missed, the first one
+        # back encodes the body for the others
+        entry = encoded_body_cache.peek(cache_key, representation)
+    if entry is None:
+        entry = encode_body(json_body, representation)
+        encoded_body_cache.set(cache_key, representation, entry)
+    body, content_encoding = entry
+    if content_encoding is not None:
+        headers["Content-Encoding"] = content_encoding
+    if etag is not None:
+        sent = replace(representation, content_encoding=content_encoding)
+        headers["ETag"] = sent.tag(etag)
+    return Response(body, media_type=representation.media_type, headers=headers)
+
+
+def not_modified_encoded_response(etag: str) -> Response:
+    """
+    304 for an ETag returned by Representation.tag, the one the client has
+    """
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Vary": VARY}
+    )
+
+
+def encode_body(json_body: bytes, representation: Representation) -> tuple:
+    body = json_body
+    if representation.media_type == MSGPACK_MEDIA_TYPE:
+        body = msgpack.packb(from_json(json_body))
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return body, None
+    if representation.content_encoding == "zstd":
+        return zstd.compress(body, level=ZSTD_LEVEL), "zstd"
+    if representation.content_encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+    return body, None
+
+
+def _negotiate_media_type(accept: str | None) -> str:
+    if msgpack is None or not accept:
+        return JSON_MEDIA_TYPE
+    weights = _weights(accept)
+    msgpack_weight = max(weights.get(media, 0.0) for media in _MSGPACK_MEDIA_TYPES)
+    json_weight = weights.get(
+        JSON_MEDIA_TYPE, weights.get("application/*", weights.get("*/*", 0.0))
+    )
+    if msgpack_weight > 0 and msgpack_weight >= json_weight:
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def _negotiate_coding(accept_encoding: str | None) -> str | None:
+    if not accept_encoding:
+        return None
+    weights = _weights(accept_encoding)
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for coding in _CODINGS:
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def _weights(header: str) -> dict[str, float]:
+    """
+    token -> q of an Accept style header, malformed q values count as 0
+    """
+    weights = {}
+    for item in header.split(","):
+        token, *params = item.split(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[token] = max(weight, weights.get(token, 0.0))
+    return weights
@@ -3,7 +3,17 @@ from functools import wraps
 from fastapi import HTTPException
 from starlette import status
 
-from src.core.product.exceptions import ProductNotFoundError, ProductAlreadyExistsError
+from src.core.product.exceptions import (
+    InsufficientStockError,
+    ProductAlreadyExistsError,
+    ProductBulkOperationError,
+    ProductNotFoundError,
+    ProductVersionConflictError,
+    ProductWriteContentionError,
+)
+
+# Retry-After of a product write given up under write contention
+CONTENTION_RETRY_SECONDS = 1
 
 
 def handle_product_errors(func):
@@ -15,5 +25,28 @@ def handle_product_errors(func):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
         except ProductAlreadyExistsError as e:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except InsufficientStockError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        except ProductVersionConflictError as e:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e)
+            )
+        except ProductWriteContentionError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": str(CONTENTION_RETRY_SECONDS)},
+            )
+        except ProductBulkOperationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "message": str(e),
+                    "errors": [
+                        {"index": index, "error": str(error)}
+                        for index, error in sorted(e.errors.items())
+                    ],
+                },
+            )
 
     return wrapper
@@ -0,0 +1,45 @@
+from src.api.rest.serialization import (
+    SerializedModelCache,
+    json_array,
+    json_object,
+    json_value,
+)
+from src.core.product.entities import ProductResponse
+from src.products.repositories import product_repository
+
+product_json_cache = SerializedModelCache(
+    stable_objects=product_repository.stable_objects
+)
+
+
+def product_json(product: ProductResponse) -> bytes:
+    return product_json_cache.get(product.id, product)
+
+
+def product_list_json(
+    products: list[ProductResponse], total_products: int, next_cursor: str | None
+) -> bytes:
+    """
+    ProductListResponse body built from cached per-product bytes
+    """
+    return json_object(
+        {
+            "total_products": json_value(total_products),
+            "products": json_array([product_json(product) for product in products]),
+            "next_cursor": json_value(next_cursor),
+        }
+    )
+
+
+def product_search_json(
+    products: list[ProductResponse], next_cursor: str | None
+) -> bytes:
+    """
+    ProductSearchResponse body built from cached per-product bytes
+    """
+    return json_object(
+        {
+            "products": json_array([product_json(product) for product in products]),
+            "next_cursor": json_value(next_cursor),
+        }
+    )
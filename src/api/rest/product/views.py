@@ -1,17 +1,71 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
 
+import anyio
+
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+)
+from starlette import status
+
+from src.api.rest.conditional import etag_matches, make_etag, not_modified_response
+from src.api.rest.negotiation import (
+    encoded_response,
+    negotiate,
+    not_modified_encoded_response,
+)
+from src.api.rest.product.serialization import (
+    product_json,
+    product_json_cache,
+    product_list_json,
+    product_search_json,
+)
+from src.api.rest.serialization import JSONBytesResponse
+from src.api.rest.streaming import ndjson_response, wants_ndjson
 from src.api.rest.user.decorators import handle_check_permissions
-from src.api.rest.user.dependencies import get_current_user_from_jwt
+from src.api.rest.user.dependencies import (
+    get_current_user_from_jwt,
+    get_current_user_from_websocket,
+)
+from src.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+)
 from src.core.permissions import Permissions
 from src.api.rest.product.decorators import handle_product_errors
+from src.core.product.bulk import PRODUCT_BULK_MAX_ITEMS
 from src.core.product.entities import (
+    ProductBulkItemResult,
+    ProductBulkResponse,
+    ProductBulkUpdate,
     ProductListResponse,
     ProductResponse,
+    ProductSearchResponse,
+    ProductStats,
+    ProductStockAdjustment,
+    ProductStockChange,
+    ProductStockResponse,
     ProductCreate,
     ProductUpdate,
     UpdateProductResponse,
     CreateProductResponse,
 )
+from src.core.product.events import ProductEventSubscription
+from src.core.product.search import (
+    SEARCH_DEFAULT_LIMIT,
+    SEARCH_MAX_LIMIT,
+    cursor_after,
+    decode_search_cursor,
+    encode_search_cursor,
+)
 from src.core.product.services import product_service
 
 product_router = APIRouter(prefix="/products", tags=["products"])
@@ -21,32 +75,145 @@ product_router = APIRouter(prefix="/products", tags=["products"])
     "/",
     response_model=ProductListResponse,
     summary="Get list of products",
-    description="Returns a list of all products with the total number of items.",
+    description=(
+        "Returns a page of products ordered by ID with the total number of items. "
+        "Pass `next_cursor` as `after` to get the next page. "
+        "Send `Accept: application/x-ndjson` to stream products one per line instead, "
+        "or `Accept: application/msgpack` for MessagePack. Large pages are compressed "
+        "with zstd or gzip when `Accept-Encoding` allows. "
+        "Pages carry an `ETag`, send it back in `If-None-Match` to get `304 Not Modified` "
+        "while the collection is unchanged."
+    ),
 )
 @handle_check_permissions([Permissions.VIEW_PRODUCT])
 async def get_product_list(
+    request: Request,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(default=None, description="Opaque page cursor"),
     current_user=Depends(get_current_user_from_jwt),
 ) -> ProductListResponse:
-    all_products = product_service.get_all()
-    products_list_output = ProductListResponse(
-        total_products=len(all_products),
-        products=all_products,
-    )
-    return products_list_output
+    try:
+        after_id = decode_cursor(after)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if wants_ndjson(request):
+        return ndjson_response(
+            fetch_page=product_service.get_page,
+            serialize=lambda product: (product.id, product_json(product)),
+            after_id=after_id,
+            limit=limit,
+        )
+
+    page_size = limit or DEFAULT_PAGE_SIZE
+    representation = negotiate(request)
+    # Read the version before the page: a write in between only makes the
+    # ETag stale, never lets a client keep outdated data
+    version = await product_service.get_collection_version()
+    etag = make_etag("products", f"v{version}", after_id, page_size)
+    for tag in representation.tags(etag):
+        if etag_matches(request, tag):
+            return not_modified_encoded_response(tag)
+
+    async def build_json() -> bytes:
+        products = await product_service.get_page(after_id, page_size)
+        next_cursor = None
+        if len(products) == page_size:
+            next_cursor = encode_cursor(products[-1].id)
+        # Stored products are already validated, skip response_model and
+        # reuse their cached JSON
+        return product_list_json(products, await product_service.count(), next_cursor)
+
+    return await encoded_response(representation, build_json, etag)
+
+
+@product_router.get(
+    "/search",
+    response_model=ProductSearchResponse,
+    summary="Search products by name",
+    description=(
+        "Case-insensitive name search. Names starting with `q` come first in "
+        "alphabetical order, then names containing `q` elsewhere (3 characters "
+        "or more) by ID. Pass `next_cursor` as `after` to get the next page."
+    ),
+)
+@handle_check_permissions([Permissions.VIEW_PRODUCT])
+async def search_products(
+    q: str = Query(min_length=1, max_length=100, description="Name or part of it"),
+    limit: int = Query(default=SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    after: Optional[str] = Query(default=None, description="Opaque page cursor"),
+    current_user=Depends(get_current_user_from_jwt),
+) -> ProductSearchResponse:
+    try:
+        cursor = decode_search_cursor(after)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    products = await product_service.search(q, limit, cursor)
+    next_cursor = None
+    if len(products) == limit:
+        last = products[-1]
+        next_cursor = encode_search_cursor(cursor_after(q, last.id, last.name))
+    return JSONBytesResponse(product_search_json(products, next_cursor))
+
+
+@product_router.get(
+    "/stats",
+    response_model=ProductStats,
+    summary="Get inventory statistics",
+    description=(
+        "Returns total stock, total inventory value (price × quantity), the number "
+        "of out-of-stock products and the price range. Supports `If-None-Match` "
+        "with the returned `ETag`."
+    ),
+)
+@handle_check_permissions([Permissions.VIEW_PRODUCT])
+async def get_product_stats(
+    request: Request,
+    current_user=Depends(get_current_user_from_jwt),
+) -> ProductStats:
+    version = await product_service.get_collection_version()
+    etag = make_etag("product-stats", f"v{version}")
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    stats = await product_service.get_stats()
+    return JSONBytesResponse(stats.model_dump_json(), headers={"ETag": etag})
 
 
 @product_router.get(
     "/{product_id}",
     summary="Get product by ID",
-    description="Returns detailed information about a product by its unique identifier.",
+    description=(
+        "Returns detailed information about a product by its unique identifier. "
+        "Supports `If-None-Match` with the returned `ETag` and the same "
+        "`Accept`/`Accept-Encoding` negotiation as the product list."
+    ),
 )
 @handle_check_permissions([Permissions.VIEW_PRODUCT])
 @handle_product_errors
 async def get_product_by_product_id(
-    product_id: int, current_user=Depends(get_current_user_from_jwt)
+    product_id: int,
+    request: Request,
+    current_user=Depends(get_current_user_from_jwt),
 ) -> ProductResponse:
-    product_output = product_service.get(product_id)
-    return product_output
+    representation = negotiate(request)
+    version = await product_service.get_product_version(product_id)
+    etag = make_etag("product", product_id, f"v{version}")
+    for tag in representation.tags(etag):
+        if etag_matches(request, tag):
+            return not_modified_encoded_response(tag)
+
+    # The body may be older than `version` (a cache not yet invalidated, a
+    # read in flight), it is tagged with the version it was read at
+    product, version = await product_service.get_with_version(product_id)
+
+    async def build_json() -> bytes:
+        return product_json(product)
+
+    return await encoded_response(
+        representation, build_json, make_etag("product", product_id, f"v{version}")
+    )
 
 
 @product_router.post(
@@ -61,7 +228,7 @@ async def create_product(
     product: ProductCreate,
     current_user=Depends(get_current_user_from_jwt),
 ) -> CreateProductResponse:
-    created_product = product_service.add(product)
+    created_product = await product_service.add(product, created_by=current_user.id)
     return CreateProductResponse(
         created_product=created_product, user_who_created=current_user
     )
@@ -80,12 +247,87 @@ async def update_product(
     product_id: int,
     current_user=Depends(get_current_user_from_jwt),
 ) -> UpdateProductResponse:
-    updated_product = product_service.update(product, product_id)
+    updated_product = await product_service.update(product, product_id)
     return UpdateProductResponse(
         updated_product=updated_product, user_who_updated=current_user
     )
 
 
+@product_router.post(
+    "/{product_id}/reserve",
+    response_model=ProductStockResponse,
+    summary="Reserve stock",
+    description=(
+        "Atomically takes `quantity` units of a product. Answers `409 Conflict` "
+        "when fewer are in stock and `412 Precondition Failed` when "
+        "`expected_version` is given and the product was changed since. With "
+        "the Redis store, `503` with `Retry-After` when concurrent writers keep "
+        "winning the race for the product."
+    ),
+)
+@handle_check_permissions([Permissions.UPDATE_PRODUCT])
+@handle_product_errors
+async def reserve_stock(
+    product_id: int,
+    change: ProductStockChange,
+    current_user=Depends(get_current_user_from_jwt),
+) -> ProductStockResponse:
+    return _stock_response(
+        *await product_service.reserve(
+            product_id, change.quantity, change.expected_version
+        )
+    )
+
+
+@product_router.post(
+    "/{product_id}/release",
+    response_model=ProductStockResponse,
+    summary="Release stock",
+    description="Atomically returns `quantity` previously reserved units of a product.",
+)
+@handle_check_permissions([Permissions.UPDATE_PRODUCT])
+@handle_product_errors
+async def release_stock(
+    product_id: int,
+    change: ProductStockChange,
+    current_user=Depends(get_current_user_from_jwt),
+) -> ProductStockResponse:
+    return _stock_response(
+        *await product_service.release(
+            product_id, change.quantity, change.expected_version
+        )
+    )
+
+
+@product_router.post(
+    "/{product_id}/adjust",
+    response_model=ProductStockResponse,
+    summary="Adjust stock",
+    description=(
+        "Atomically adds a signed `delta` to the quantity of a product, which "
+        "never goes below zero."
+    ),
+)
+@handle_check_permissions([Permissions.UPDATE_PRODUCT])
+@handle_product_errors
+async def adjust_stock(
+    product_id: int,
+    adjustment: ProductStockAdjustment,
+    current_user=Depends(get_current_user_from_jwt),
+) -> ProductStockResponse:
+    return _stock_response(
+        *await product_service.adjust_quantity(
+            product_id, adjustment.delta, adjustment.expected_version
+        )
+    )
+
+
+def _stock_response(product: ProductResponse, version: int) -> ProductStockResponse:
+    return ProductStockResponse(
+        product_id=product.id, quantity=product.quantity, version=version
+    )
+
+
 @product_router.delete(
     "/{product_id}",
     summary="Delete product",
@@ -97,5 +339,135 @@ async def delete_product(
     product_id: int,
     current_user=Depends(get_current_user_from_jwt),
 ) -> dict:
-    product_service.delete(product_id)
+    await product_service.delete(product_id)
+    product_json_cache.invalidate(product_id)
     return {"message": f"Product was deleted successfully by {current_user.username}"}
+
+
+ATOMIC_QUERY = Query(
+    default=True,
+    description=(
+        "Apply all items or none of them. "
+        "With false, valid items are applied and failures are reported per item."
+    ),
+)
+
+
+@product_router.post(
+    "/bulk/create",
+    response_model=ProductBulkResponse,
+    summary="Create products in bulk",
+    description="Creates a batch of products in one request.",
+)
+@handle_check_permissions([Permissions.ADD_PRODUCT])
+@handle_product_errors
+async def create_products_bulk(
+    products: list[ProductCreate] = Body(
+        min_length=1, max_length=PRODUCT_BULK_MAX_ITEMS
+    ),
+    atomic: bool = ATOMIC_QUERY,
+    current_user=Depends(get_current_user_from_jwt),
+) -> ProductBulkResponse:
+    results = await product_service.add_many(
+        products, atomic, created_by=current_user.id
+    )
+    return _bulk_response(results, current_user)
+
+
+@product_router.patch(
+    "/bulk/update",
+    response_model=ProductBulkResponse,
+    summary="Update products in bulk",
+    description="Updates a batch of existing products, each item carries its ID.",
+)
+@handle_check_permissions([Permissions.UPDATE_PRODUCT])
+@handle_product_errors
+async def update_products_bulk(
+    products: list[ProductBulkUpdate] = Body(
+        min_length=1, max_length=PRODUCT_BULK_MAX_ITEMS
+    ),
+    atomic: bool = ATOMIC_QUERY,
+    current_user=Depends(get_current_user_from_jwt),
+) -> ProductBulkResponse:
+    results = await product_service.update_many(products, atomic)
+    return _bulk_response(results, current_user)
+
+
+@product_router.post(
+    "/bulk/delete",
+    response_model=ProductBulkResponse,
+    summary="Delete products in bulk",
+    description="Deletes a batch of products by their IDs.",
+)
+@handle_check_permissions([Permissions.DELETE_PRODUCT])
+@handle_product_errors
+async def delete_products_bulk(
+    product_ids: list[int] = Body(min_length=1, max_length=PRODUCT_BULK_MAX_ITEMS),
+    atomic: bool = ATOMIC_QUERY,
+    current_user=Depends(get_current_user_from_jwt),
+) -> ProductBulkResponse:
+    results = await product_service.delete_many(product_ids, atomic)
+    for result in results:
+        if not isinstance(result, Exception):
+            product_json_cache.invalidate(result)
+    return _bulk_response(results, current_user)
+
+
+def _bulk_response(results: list, current_user) -> ProductBulkResponse:
+    items = []
+    for index, result in enumerate(results):
+        if isinstance(result, Exception):
+            items.append(ProductBulkItemResult(index=index, error=str(result)))
+        elif isinstance(result, ProductResponse):
+            items.append(
+                ProductBulkItemResult(index=index, product_id=result.id, product=result)
+            )
+        else:
+            items.append(ProductBulkItemResult(index=index, product_id=result))
+    failed = sum(1 for item in items if item.error is not None)
+    return ProductBulkResponse(
+        total=len(items),
+        succeeded=len(items) - failed,
+        failed=failed,
+        results=items,
+        user_who_applied=current_user,
+    )
+
+
+@product_router.websocket("/ws")
+async def product_changes(websocket: WebSocket):
+    """
+    Pushes created/updated/deleted product events as JSON text frames
+    """
+    current_user = await get_current_user_from_websocket(websocket)
+    if current_user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if Permissions.VIEW_PRODUCT not in current_user.permissions:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = product_service.events.subscribe()
+    try:
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(_send_product_events, websocket, subscription)
+            await _wait_for_disconnect(websocket)
+            task_group.cancel_scope.cancel()
+    finally:
+        product_service.events.unsubscribe(subscription)
+
+
+async def _send_product_events(
+    websocket: WebSocket, subscription: ProductEventSubscription
+) -> None:
+    while True:
+        payload = await subscription.get()
+        await websocket.send_text(payload)
+
+
+async def _wait_for_disconnect(websocket: WebSocket) -> None:
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
@@ -0,0 +1,91 @@
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from src.settings import get_settings
+
+JSON_CACHE_MAX_SIZE: int = get_settings().json_cache_max_size
+
+
+class JSONBytesResponse(Response):
+    """
+    JSON response whose body is already serialised
+
+    Returning it from a view bypasses response_model validation and the
+    default encoder, so only pass bytes built from trusted internal objects.
+    """
+
+    media_type = "application/json"
+
+
+def json_object(fields: dict[str, bytes]) -> bytes:
+    """
+    Builds a JSON object from already serialised member values
+    """
+    members = [
+        b'"' + name.encode("utf-8") + b'":' + value for name, value in fields.items()
+    ]
+    return b"{" + b",".join(members) + b"}"
+
+
+def json_array(items: list[bytes]) -> bytes:
+    return b"[" + b",".join(items) + b"]"
+
+
+def json_value(value) -> bytes:
+    return to_json(value)
+
+
+class SerializedModelCache:
+    """
+    Cache of serialised model bytes keyed by item id
+
+    An entry is only served for the very object it was built from: stores
+    replace the stored object on update, so an updated item misses and is
+    serialised again without any explicit invalidation. Backends that build
+    fresh objects on every read would never hit, with `stable_objects` False
+    the bytes are built but not kept. Beyond max_size the oldest entries are
+    evicted first.
+    """
+
+    def __init__(
+        self, max_size: int = JSON_CACHE_MAX_SIZE, stable_objects: bool = True
+    ):
+        self.max_size = max_size
+        self.stable_objects = stable_objects
+        # Two flat dicts instead of (model, bytes) tuples: filling the cache
+        # then allocates no GC-tracked objects
+        self.models = {}  # item_id -> model the bytes were built from
+        self.payloads = {}  # item_id -> bytes, in insertion order
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, item_id: int, model: BaseModel) -> bytes:
+        if self.models.get(item_id) is model:
+            self.hits += 1
+            return self.payloads[item_id]
+
+        self.misses += 1
+        payload = model.__pydantic_serializer__.to_json(model)
+        if not self.stable_objects:
+            return payload
+        if item_id not in self.payloads and len(self.payloads) >= self.max_size:
+            self.invalidate(next(iter(self.payloads)))
+        self.models[item_id] = model
+        self.payloads[item_id] = payload
+        return payload
+
+    def invalidate(self, item_id: int) -> None:
+        self.models.pop(item_id, None)
+        self.payloads.pop(item_id, None)
+
+    def clear(self) -> None:
+        self.models.clear()
+        self.payloads.clear()
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self.payloads),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,53 @@
+from typing import Awaitable, Callable
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_CHUNK_SIZE = 500
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(
+    fetch_page: Callable[[int, int], Awaitable[list]],
+    serialize: Callable[[object], tuple[int, bytes]],
+    after_id: int,
+    limit: int | None,
+) -> StreamingResponse:
+    """
+    Streams items one JSON document per line, fetching them page by page
+    (keyset on id) so at most STREAM_CHUNK_SIZE items are held at once
+
+    fetch_page(after_id, size) -> items
+    serialize(item) -> (item_id, line bytes without newline)
+    """
+
+    async def lines():
+        last_id = after_id
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = (
+                STREAM_CHUNK_SIZE
+                if remaining is None
+                else min(STREAM_CHUNK_SIZE, remaining)
+            )
+            items = await fetch_page(last_id, size)
+            if not items:
+                return
+
+            chunk = []
+            for item in items:
+                last_id, line = serialize(item)
+                chunk.append(line)
+            chunk.append(b"")
+            yield b"\n".join(chunk)
+
+            if remaining is not None:
+                remaining -= len(items)
+            if len(items) < size:
+                return
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
@@ -4,16 +4,18 @@ from fastapi import Depends, HTTPException
 from starlette import status
 
 from src.api.rest.user.dependencies import get_current_user_from_jwt
+from src.core.permissions import permissions_to_mask
 
 
 def handle_check_permissions(required_permissions: list[str]):
+    required_mask = permissions_to_mask(required_permissions)
+
     def decorator(func):
         @wraps(func)
         async def wrapper(
             *args, current_user=Depends(get_current_user_from_jwt), **kwargs
         ):
-            user_permissions = current_user.permissions
-            if not set(required_permissions).issubset(set(user_permissions)):
+            if current_user.permission_mask & required_mask != required_mask:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="This user doesn't have necessary permissions",
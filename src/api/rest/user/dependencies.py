@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, WebSocket, status
 from fastapi.security import APIKeyHeader
 
 from src.core.user.exceptions import (
@@ -10,11 +10,11 @@ from src.core.user.entities import UserResponse
 from src.core.user.services import UserService
 
 
-def get_current_user_from_jwt(
+async def get_current_user_from_jwt(
     token: str = Depends(APIKeyHeader(name="Authorization")),
 ) -> UserResponse | None:
     try:
-        user_tuple = UserService.get_current_user_from_jwt(token)
+        user_output = await UserService.get_principal_from_jwt(token)
     except TokenExpiredError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
     except TokenIsNotValidError as e:
@@ -22,20 +22,25 @@ def get_current_user_from_jwt(
     except TokenTypeIsNotValidError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
 
-    if not user_tuple:
+    if not user_output:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
         )
 
-    user_id = user_tuple[0]
-    user = user_tuple[1]
+    return user_output
 
-    user_output = UserResponse(
-        id=user_id,
-        username=user.username,
-        email=user.email,
-        is_admin=user.is_admin,
-        permissions=user.permissions,
-    )
 
-    return user_output
+async def get_current_user_from_websocket(websocket: WebSocket) -> UserResponse | None:
+    """
+    Same JWT as the REST API, taken from the Authorization header or,
+    for browsers that can't set headers, from the `token` query parameter
+    """
+    token = websocket.headers.get("authorization") or websocket.query_params.get(
+        "token"
+    )
+    if not token:
+        return None
+    try:
+        return await UserService.get_principal_from_jwt(token)
+    except (TokenExpiredError, TokenIsNotValidError, TokenTypeIsNotValidError):
+        return None
@@ -1,18 +1,34 @@
+import math
 from datetime import timedelta
 from typing import Optional
 
-from fastapi import APIRouter, Query, HTTPException, Depends
+from fastapi import APIRouter, Query, HTTPException, Depends, Request
 from starlette import status
 from starlette.status import HTTP_400_BAD_REQUEST
 
+from src.api.rest.negotiation import encoded_response, negotiate
+from src.api.rest.serialization import json_array, json_object, json_value
+from src.api.rest.streaming import ndjson_response, wants_ndjson
 from src.api.rest.user.dependencies import get_current_user_from_jwt
+from src.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+)
+from src.core.user.admission import login_admission
 from src.core.user.exceptions import (
+    LoginOverloadedError,
+    LoginRateLimitedError,
+    PasswordHasherBusyError,
     UserNotFoundError,
     UserAlreadyExistsError,
     UserCreationError,
     TokenCreationError,
     TokenExpiredError,
     TokenIsNotValidError,
+    TokenRevokedError,
     TokenTypeIsNotValidError,
 )
 from src.core.permissions import Permissions
@@ -23,7 +39,7 @@ from src.core.user.entities import (
 )
 from src.core.user.services import (
     UserService,
-    ACCESS_TOKEN_EXPIRE_MINUTES,
+    ACCESS_TOKEN_LIFETIME_MINUTES,
     REFRESH_TOKEN_EXPIRE_MINUTES,
     TokenData,
 )
@@ -38,47 +54,86 @@ user_router = APIRouter(
     "/",
     response_model=UserListResponse,
     summary="Get list of users",
-    description="Returns a list of all users with the total number of them.",
+    description=(
+        "Returns a page of users ordered by ID with the total number of them. "
+        "Pass `next_cursor` as `after` to get the next page. "
+        "Send `Accept: application/x-ndjson` to stream users one per line instead, "
+        "or `Accept: application/msgpack` for MessagePack. Large pages are compressed "
+        "with zstd or gzip when `Accept-Encoding` allows."
+    ),
 )
-async def get_users() -> UserListResponse:
-    users = UserService.get_all()
-    output_users = [
-        UserResponse(
-            id=user[0],
-            username=user[1].username,
-            email=user[1].email,
-            is_admin=user[1].is_admin,
-            permissions=user[1].permissions,
+async def get_users(
+    request: Request,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(default=None, description="Opaque page cursor"),
+) -> UserListResponse:
+    try:
+        after_id = decode_cursor(after)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if wants_ndjson(request):
+        return ndjson_response(
+            fetch_page=UserService.get_page,
+            serialize=lambda user: (user[0], _user_json(user)),
+            after_id=after_id,
+            limit=limit,
+        )
+
+    page_size = limit or DEFAULT_PAGE_SIZE
+
+    async def build_json() -> bytes:
+        users = await UserService.get_page(after_id, page_size)
+        next_cursor = None
+        if len(users) == page_size:
+            next_cursor = encode_cursor(users[-1][0])
+        return json_object(
+            {
+                "total_users": json_value(await UserService.count()),
+                "users": json_array([_user_json(user) for user in users]),
+                "next_cursor": json_value(next_cursor),
+            }
         )
-        for user in users
-    ]
-    result = UserListResponse(
-        total_users=len(users),
-        users=output_users,
+
+    # Users have no version to tag, encodings are cached by the JSON bytes
+    return await encoded_response(negotiate(request), build_json)
+
+
+def _to_user_response(user: tuple) -> UserResponse:
+    # Stored users were validated on creation, skip revalidating them
+    return UserResponse.model_construct(
+        id=user[0],
+        username=user[1].username,
+        email=user[1].email,
+        is_admin=user[1].is_admin,
+        permissions=user[1].permissions,
     )
-    return result
+
+
+def _user_json(user: tuple) -> bytes:
+    user_response = _to_user_response(user)
+    return user_response.__pydantic_serializer__.to_json(user_response)
 
 
 @user_router.get(
     "/{user_id}",
     response_model=UserResponse,
     summary="Get a user",
-    description="Returns a user with the given ID.",
+    description=(
+        "Returns a user with the given ID. Supports the same `Accept`/"
+        "`Accept-Encoding` negotiation as the user list."
+    ),
 )
-async def get_user_by_user_id(user_id: int) -> UserResponse:
+async def get_user_by_user_id(user_id: int, request: Request) -> UserResponse:
     try:
-        user = UserService.get_by_id(user_id)
+        user = await UserService.get_by_id(user_id)
     except UserNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
-    user_output = UserResponse(
-        id=user_id,
-        username=user.username,
-        email=user.email,
-        is_admin=user.is_admin,
-        permissions=user.permissions,
-    )
-    return user_output
+    async def build_json() -> bytes:
+        return _user_json((user_id, user))
+
+    return await encoded_response(negotiate(request), build_json)
 
 
 @user_router.post(
@@ -88,6 +143,7 @@ async def get_user_by_user_id(user_id: int) -> UserResponse:
     description="Creates a new user and returns the created user with an assigned ID.",
 )
 async def create_user(
+    request: Request,
     user: CreateUser,
     permissions: Optional[list[str]] = Query(
         default=None,
@@ -97,11 +153,18 @@ async def create_user(
     ),
 ) -> UserResponse:
     try:
-        created_user = UserService.add(user, permissions)
+        with login_admission.admit(_client_ip(request)):
+            created_user = await UserService.add(user, permissions)
+    except (LoginRateLimitedError, LoginOverloadedError) as e:
+        raise _throttled(e)
     except UserAlreadyExistsError as e:
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
     except UserCreationError as e:
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    except PasswordHasherBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
 
     return created_user
 
@@ -110,36 +173,42 @@ async def create_user(
     "login",
     response_model=dict,
     summary="User Login",
-    description="Login user using access token and refresh token",
+    description=(
+        "Login user using access token and refresh token. Attempts are rate limited "
+        "per username and per client IP: `429` or `503` with `Retry-After` when "
+        "over the limit."
+    ),
 )
-async def login(username: str, password: str) -> dict:
-    user = UserService.authenticate_user(username, password)
+async def login(request: Request, username: str, password: str) -> dict:
+    client_ip = _client_ip(request)
+    try:
+        with login_admission.admit(client_ip, username):
+            user = await UserService.authenticate_user(username, password)
+    except (LoginRateLimitedError, LoginOverloadedError) as e:
+        raise _throttled(e)
+    except PasswordHasherBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
         )
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    login_admission.refund(client_ip, username)
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_LIFETIME_MINUTES)
     refresh_token_expires = timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES)
 
     data_access_token = TokenData(
-        sub=username,
+        sub=user.username,
         is_admin=user.is_admin,
         extra={
-            "user_id": user.id,
+            **UserService.access_token_claims(user.id, user),
             "type": "access_token",
             "access_token_expires": int(access_token_expires.total_seconds()),
         },
     )
-    data_refresh_token = TokenData(
-        sub=username,
-        is_admin=user.is_admin,
-        extra={
-            "user_id": user.id,
-            "type": "refresh_token",
-            "refresh_token_expires": int(refresh_token_expires.total_seconds()),
-        },
-    )
+    data_refresh_token = UserService.refresh_token_data(user.id, user)
     try:
         access_token = UserService.create_token(
             data=data_access_token, expires_delta=access_token_expires
@@ -158,21 +227,25 @@ async def login(username: str, password: str) -> dict:
 
 @user_router.post(
     "/refresh",
-    response_model=str,
+    response_model=dict,
     summary="Refresh user",
-    description="Refresh user using access token and refresh token",
+    description=(
+        "Exchanges a refresh token for a new access token and a new refresh token. "
+        "Each refresh token is accepted once: reusing one revokes every refresh "
+        "token issued since the login it came from."
+    ),
 )
-async def refresh_user(token: str) -> str:
+async def refresh_user(token: str) -> dict:
     try:
-        username = UserService.verify_token(token, "refresh_token")
-    except TokenExpiredError as e:
+        payload = await UserService.rotate_refresh_token(token)
+    except (TokenExpiredError, TokenRevokedError) as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
     except TokenIsNotValidError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except TokenTypeIsNotValidError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    user_tuple = UserService.get_by_username(username)
+    user_tuple = await UserService.get_by_username(payload["sub"])
     if not user_tuple:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -182,29 +255,59 @@ async def refresh_user(token: str) -> str:
     user_id = user_tuple[0]
     user = user_tuple[1]
 
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_LIFETIME_MINUTES)
+    refresh_token_expires = timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES)
 
     new_access_token = TokenData(
         sub=user.username,
         is_admin=user.is_admin,
         extra={
-            "user_id": user_id,
+            **UserService.access_token_claims(user_id, user),
             "type": "access_token",
             "access_token_expires": int(access_token_expires.total_seconds()),
         },
     )
 
+    new_refresh_token = UserService.refresh_token_data(
+        user_id, user, family=payload["extra"]["family"]
+    )
+
     try:
         access_token = UserService.create_token(
             data=new_access_token, expires_delta=access_token_expires
         )
+        refresh_token = UserService.create_token(
+            data=new_refresh_token, expires_delta=refresh_token_expires
+        )
     except TokenCreationError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=str(e),
         )
 
-    return f"Access Token was refreshed: {access_token}"
+    return {"access_token": access_token, "refresh_token": refresh_token}
+
+
+@user_router.post(
+    "/revoke",
+    response_model=dict,
+    summary="Revoke refresh token",
+    description=(
+        "Revokes a refresh token together with every refresh token rotated from "
+        "the same login. Access tokens already issued stay valid until they expire."
+    ),
+)
+async def revoke_refresh_token(token: str) -> dict:
+    try:
+        await UserService.revoke_refresh_token(token)
+    except TokenExpiredError as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+    except TokenIsNotValidError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except TokenTypeIsNotValidError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {"detail": "Refresh token was revoked"}
 
 
 @user_router.put(
@@ -215,3 +318,18 @@ async def refresh_user(token: str) -> str:
 )
 async def me(current_user=Depends(get_current_user_from_jwt)):
     return current_user
+
+
+def _client_ip(request: Request) -> str | None:
+    return request.client.host if request.client else None
+
+
+def _throttled(e: LoginRateLimitedError | LoginOverloadedError) -> HTTPException:
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    if isinstance(e, LoginOverloadedError):
+        status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return HTTPException(
+        status_code=status_code,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+    )
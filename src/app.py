@@ -0,0 +1,138 @@
+"""
+Application factory
+
+Only FastAPI and the settings are imported at module level: create_app()
+installs the settings before the rest of src is imported, since modules read
+their constants from get_settings() on first import.
+"""
+
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, FastAPI
+
+from src.api.lazy import LazyRouter, lazy_route
+from src.settings import Settings, configure
+
+API_PREFIX = "/v1/api"
+
+
+def create_app(settings: Settings | None = None) -> FastAPI:
+    """
+    Builds the app for `settings`, None loads them from the environment
+
+    With settings.lazy_routes, GraphQL (strawberry and graphql-core) is
+    imported on its first request, warm_up() imports it ahead of time.
+    """
+    settings = configure(settings)
+
+    from src.api.rest.metrics import MetricsMiddleware, metrics_router
+    from src.api.rest.negotiation import encoded_body_cache
+    from src.api.rest.product.serialization import product_json_cache
+    from src.api.rest.product.views import product_router
+    from src.api.rest.user.views import user_router
+    from src.core.metrics import metrics_registry
+    from src.core.product.events import product_event_broker
+    from src.core.product.services import product_service
+    from src.core.user.admission import login_admission
+    from src.core.user.hashing import password_hasher
+    from src.core.user.revocation import token_revocations
+    from src.core.user.token_cache import token_cache
+    from src.products.repositories import product_repository
+    from src.users.repositories import user_repository
+
+    backend = settings.storage_backend
+    journals = []
+    if backend == "memory" and settings.journal_dir:
+        journals = [product_repository.journal, user_repository.journal]
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        metrics_registry.start()
+        for journal in journals:
+            await journal.open()
+        if backend == "sqlalchemy":
+            from src.db.engine import create_tables, get_engine
+
+            await create_tables(get_engine())
+        if backend == "redis":
+            product_repository.cache.start()
+            user_repository.cache.start()
+        await token_revocations.start()
+        yield
+        await token_revocations.stop()
+        if backend == "sqlalchemy":
+            await get_engine().dispose()
+        if backend == "redis":
+            from src.db.redis import get_redis
+
+            await product_repository.cache.stop()
+            await user_repository.cache.stop()
+            await get_redis().aclose()
+        for journal in journals:
+            await journal.close()
+        password_hasher.shutdown()
+        await metrics_registry.stop()
+
+    metrics_registry.add_collector("password_hasher", password_hasher.metrics)
+    metrics_registry.add_collector("token_cache", token_cache.metrics)
+    metrics_registry.add_collector("token_revocations", token_revocations.metrics)
+    metrics_registry.add_collector("login_admission", login_admission.metrics)
+    metrics_registry.add_collector("product_events", product_event_broker.metrics)
+    metrics_registry.add_collector("product_reads", product_service.reads.metrics)
+    metrics_registry.add_collector("product_json_cache", product_json_cache.metrics)
+    metrics_registry.add_collector("encoded_body_cache", encoded_body_cache.metrics)
+    if backend == "redis":
+        metrics_registry.add_collector(
+            "product_read_cache", product_repository.cache.metrics
+        )
+        metrics_registry.add_collector("user_read_cache", user_repository.cache.metrics)
+    if backend == "memory":
+        metrics_registry.add_collector(
+            "product_search_index", product_repository.manager.search_index.metrics
+        )
+    for journal in journals:
+        metrics_registry.add_collector(f"{journal.name}_journal", journal.metrics)
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(MetricsMiddleware)
+
+    api_v1_router = APIRouter(prefix=API_PREFIX)
+    api_v1_router.include_router(product_router)
+    api_v1_router.include_router(user_router)
+    if not settings.lazy_routes:
+        from src.api.graphql.router import graphql_router
+
+        api_v1_router.include_router(graphql_router)
+
+    app.include_router(api_v1_router)
+    app.include_router(metrics_router)
+    if settings.lazy_routes:
+        app.router.routes.append(
+            lazy_route(
+                f"{API_PREFIX}/graphql",
+                "src.api.graphql.router:graphql_router",
+                prefix=API_PREFIX,
+                methods=["GET", "POST"],
+            )
+        )
+
+    @app.get("/")
+    async def index():
+        return {"message": "This is the main Page"}
+
+    return app
+
+
+def warm_up(app: FastAPI) -> None:
+    """
+    Imports everything deferred to the first request
+
+    Called in the gunicorn master before forking (see gunicorn.conf.py), so
+    the workers share these modules copy-on-write instead of each importing
+    them on a live request.
+    """
+    from jose import jwt  # noqa: F401, imported by the token functions on use
+
+    for route in app.routes:
+        if isinstance(getattr(route, "app", None), LazyRouter):
+            route.app.load()
@@ -0,0 +1,358 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from src.settings import get_settings
+
+METRICS_DIR: str = get_settings().metrics_dir
+METRICS_FLUSH_SECONDS: float = get_settings().metrics_flush_seconds
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+# For in-memory operations that take microseconds
+FAST_BUCKETS = (
+    0.000001,
+    0.000005,
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.1,
+    1.0,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Counter:
+    """
+    Monotonic counter, one value per label tuple
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.series = {}  # label values -> value
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def snapshot(self) -> dict:
+        return {
+            "type": self.type,
+            "help": self.documentation,
+            "labelnames": self.labelnames,
+            "series": [[list(labels), value] for labels, value in self.series.items()],
+        }
+
+
+class Histogram:
+    """
+    Latency histogram, one series per label tuple
+
+    A series is a flat list [count in bucket 0, ..., count above the last
+    bucket, sum of observed values]. Counts are stored per bucket and only
+    made cumulative when rendered, so observe() is one bisect and two adds.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> per-bucket counts + [sum]
+
+    def observe(self, value: float, *labels) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, *labels):
+        """
+        Decorator timing a sync or async callable into this histogram
+        """
+
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.observe(time.perf_counter() - started, *labels)
+
+                return async_wrapper
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, *labels)
+
+            return wrapper
+
+        return decorator
+
+    def snapshot(self) -> dict:
+        return {
+            "type": self.type,
+            "help": self.documentation,
+            "labelnames": self.labelnames,
+            "buckets": self.buckets,
+            "series": [
+                [list(labels), values] for labels, values in self.series.items()
+            ],
+        }
+
+
+class MetricsRegistry:
+    """
+    Metrics of one worker process plus aggregation across workers
+
+    Updates only touch plain dicts owned by the process, there are no locks
+    on the hot path. Each worker periodically writes a snapshot to
+    `directory`, the worker serving /metrics sums its live values with the
+    other workers' snapshots. Snapshots of workers that exited are removed.
+
+    Collectors expose the metrics() dicts of existing components as gauges:
+    add_collector("token_cache", token_cache.metrics) gives token_cache_hits
+    and so on, numeric values only.
+    """
+
+    def __init__(self, directory: str, flush_seconds: float):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.metrics = {}
+        self.collectors = {}
+        self._flusher: asyncio.Task | None = None
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, prefix: str, collect) -> None:
+        self.collectors[prefix] = collect
+
+    def snapshot(self) -> dict:
+        snapshot = {name: metric.snapshot() for name, metric in self.metrics.items()}
+        for prefix, collect in self.collectors.items():
+            for key, value in collect().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                snapshot[f"{prefix}_{key}"] = {
+                    "type": "gauge",
+                    "help": f"{prefix} {key}",
+                    "labelnames": (),
+                    "series": [[[], value]],
+                }
+        return snapshot
+
+    def flush(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._snapshot_path(os.getpid())
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temporary_path, path)
+
+    def collect(self) -> dict:
+        """
+        Own live snapshot merged with the latest snapshots of other workers
+        """
+        merged = self.snapshot()
+        for snapshot in self._read_other_snapshots():
+            for name, metric in snapshot.items():
+                self._merge(merged, name, metric)
+        return merged
+
+    def render(self) -> str:
+        return render_text(self.collect())
+
+    def start(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_forever())
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        try:
+            os.remove(self._snapshot_path(os.getpid()))
+        except OSError:
+            pass
+
+    def _register(self, metric):
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    async def _flush_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Could not write metrics snapshot")
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def _read_other_snapshots(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        own_pid = os.getpid()
+        for name in names:
+            pid_part, _, extension = name.partition(".")
+            if extension != "json" or not pid_part.isdigit():
+                continue
+            pid = int(pid_part)
+            if pid == own_pid:
+                continue
+            path = os.path.join(self.directory, name)
+            if not _is_alive(pid):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as file:
+                    yield json.load(file)
+            except (OSError, ValueError):
+                continue
+
+    @staticmethod
+    def _merge(merged: dict, name: str, metric: dict) -> None:
+        target = merged.get(name)
+        if target is None:
+            merged[name] = metric
+            return
+        series = {tuple(labels): values for labels, values in target["series"]}
+        for labels, values in metric["series"]:
+            labels = tuple(labels)
+            current = series.get(labels)
+            if current is None:
+                series[labels] = values
+            elif isinstance(current, list):
+                series[labels] = [a + b for a, b in zip(current, values)]
+            else:
+                series[labels] = current + values
+        target["series"] = [[list(labels), values] for labels, values in series.items()]
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _format_labels(labelnames, labels, extra: str = "") -> str:
+    pairs = [
+        f'{name}="{_escape(str(value))}"' for name, value in zip(labelnames, labels)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render_text(snapshot: dict) -> str:
+    """
+    Prometheus text exposition format 0.0.4
+    """
+    lines = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        labelnames = metric["labelnames"]
+        lines.append(f"# HELP {name} {_escape(metric['help'])}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        if metric["type"] != "histogram":
+            for labels, value in metric["series"]:
+                labels_text = _format_labels(labelnames, labels)
+                lines.append(f"{name}{labels_text} {_format_value(value)}")
+            continue
+
+        bounds = [*metric["buckets"], float("inf")]
+        for labels, values in metric["series"]:
+            cumulative = 0
+            for bound, count in zip(bounds, values):
+                cumulative += count
+                le = 'le="' + _format_value(float(bound)) + '"'
+                labels_text = _format_labels(labelnames, labels, le)
+                lines.append(f"{name}_bucket{labels_text} {cumulative}")
+            labels_text = _format_labels(labelnames, labels)
+            lines.append(f"{name}_sum{labels_text} {_format_value(values[-1])}")
+            lines.append(f"{name}_count{labels_text} {cumulative}")
+    lines.append("")
+    return "\n".join(lines)
+
+
+metrics_registry = MetricsRegistry(
+    directory=METRICS_DIR,
+    flush_seconds=METRICS_FLUSH_SECONDS,
+)
@@ -0,0 +1,76 @@
+import base64
+import binascii
+from bisect import bisect_right
+
+CURSOR_PREFIX = "id:"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursorError(Exception):
+    def __init__(self):
+        super().__init__("Pagination cursor is not valid")
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = f"{CURSOR_PREFIX}{last_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> int:
+    """
+    Returns the id to continue after, 0 for the first page
+    """
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursorError()
+    if not raw.startswith(CURSOR_PREFIX):
+        raise InvalidCursorError()
+    try:
+        last_id = int(raw[len(CURSOR_PREFIX) :])
+    except ValueError:
+        raise InvalidCursorError()
+    if last_id < 0:
+        raise InvalidCursorError()
+    return last_id
+
+
+class KeysetIndex:
+    """
+    Sorted list of ids for keyset pagination (WHERE id > after ORDER BY id LIMIT n)
+
+    Ids must be appended in increasing order (managers allocate them monotonically).
+    Removed ids are left as tombstones and skipped while paging, the list is
+    compacted once tombstones outnumber live ids.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.removed = 0
+
+    def append(self, item_id: int) -> None:
+        self.ids.append(item_id)
+
+    def extend(self, item_ids) -> None:
+        self.ids.extend(item_ids)
+
+    def remove(self, live: dict) -> None:
+        self.removed += 1
+        if self.removed > len(self.ids) // 2:
+            self.ids = [item_id for item_id in self.ids if item_id in live]
+            self.removed = 0
+
+    def page(self, live: dict, after_id: int, limit: int) -> list[int]:
+        result = []
+        position = bisect_right(self.ids, after_id)
+        ids = self.ids
+        while position < len(ids) and len(result) < limit:
+            item_id = ids[position]
+            if item_id in live:
+                result.append(item_id)
+            position += 1
+        return result
@@ -10,3 +10,24 @@ class Permissions(StrEnum):
     @classmethod
     def list(cls):
         return [permission for permission in cls]
+
+
+# Bit of each permission in a permission mask, taken from the enum order:
+# add new permissions at the end so masks in issued tokens keep their meaning
+PERMISSION_BITS = {
+    permission: 1 << index for index, permission in enumerate(Permissions)
+}
+
+
+def permissions_to_mask(permissions) -> int:
+    """
+    Unknown permission names are ignored
+    """
+    mask = 0
+    for permission in permissions:
+        mask |= PERMISSION_BITS.get(permission, 0)
+    return mask
+
+
+def mask_to_permissions(mask: int) -> list[str]:
+    return [permission for permission, bit in PERMISSION_BITS.items() if mask & bit]
@@ -0,0 +1,73 @@
+"""
+One-pass validation of bulk product operations
+
+Each check simulates applying the items in order against the current store
+(seen through the lookup callables) plus the changes made by earlier items of
+the same batch, and returns item index -> error for the items that would fail.
+"""
+
+from typing import Callable
+
+from src.core.product.entities import ProductCreate, ProductBulkUpdate
+from src.core.product.exceptions import ProductAlreadyExistsError, ProductNotFoundError
+from src.settings import get_settings
+
+PRODUCT_BULK_MAX_ITEMS: int = get_settings().product_bulk_max_items
+
+
+def check_add_many(
+    products: list[ProductCreate],
+    name_owner: Callable[[str], int | None],
+) -> dict[int, Exception]:
+    errors = {}
+    claimed = set()
+    for index, product in enumerate(products):
+        if product.name in claimed or name_owner(product.name) is not None:
+            errors[index] = ProductAlreadyExistsError()
+            continue
+        claimed.add(product.name)
+    return errors
+
+
+def check_update_many(
+    products: list[ProductBulkUpdate],
+    product_name: Callable[[int], str | None],
+    name_owner: Callable[[str], int | None],
+) -> dict[int, Exception]:
+    errors = {}
+    names = {}  # product id -> name after earlier items of the batch
+    owners = {}  # name -> owner id (or None once released) after earlier items
+    for index, product in enumerate(products):
+        old_name = (
+            names[product.id] if product.id in names else product_name(product.id)
+        )
+        if old_name is None:
+            errors[index] = ProductNotFoundError()
+            continue
+
+        owner = (
+            owners[product.name] if product.name in owners else name_owner(product.name)
+        )
+        if owner is not None and owner != product.id:
+            errors[index] = ProductAlreadyExistsError()
+            continue
+
+        if old_name != product.name:
+            owners[old_name] = None
+            owners[product.name] = product.id
+            names[product.id] = product.name
+    return errors
+
+
+def check_delete_many(
+    product_ids: list[int],
+    is_product_exist: Callable[[int], bool],
+) -> dict[int, Exception]:
+    errors = {}
+    deleted = set()
+    for index, product_id in enumerate(product_ids):
+        if product_id in deleted or not is_product_exist(product_id):
+            errors[index] = ProductNotFoundError()
+            continue
+        deleted.add(product_id)
+    return errors
@@ -33,6 +33,14 @@ class ProductUpdate(ProductBase):
     """
 
 
+class ProductBulkUpdate(ProductUpdate):
+    """
+    Schema for updating an existing Product inside a bulk update
+    """
+
+    id: int = Field(description="ID of the product to update")
+
+
 class ProductDelete(ProductBase):
     """
     Schema for deleting an existing Product
@@ -45,6 +53,9 @@ class ProductResponse(ProductBase):
     """
 
     id: int = Field(description="Unique product ID")
+    created_by: int | None = Field(
+        default=None, description="ID of the user who created the product"
+    )
 
 
 class ProductListResponse(BaseModel):
@@ -54,6 +65,69 @@ class ProductListResponse(BaseModel):
 
     total_products: int
     products: list[ProductResponse]
+    next_cursor: str | None = Field(
+        default=None,
+        description="Opaque cursor of the next page, null on the last page",
+    )
+
+
+class ProductSearchResponse(BaseModel):
+    """
+    Schema for a page of product search results, best matches first
+    """
+
+    products: list[ProductResponse]
+    next_cursor: str | None = Field(
+        default=None,
+        description="Opaque cursor of the next page, null on the last page",
+    )
+
+
+class ProductStockChange(BaseModel):
+    """
+    Schema for reserving or releasing units of a Product
+    """
+
+    quantity: int = Field(gt=0, description="Units to reserve or release")
+    expected_version: int | None = Field(
+        default=None,
+        description="Apply only if the product is still at this version (its ETag)",
+    )
+
+
+class ProductStockAdjustment(BaseModel):
+    """
+    Schema for changing the stock of a Product by a signed delta
+    """
+
+    delta: int = Field(description="Units to add, negative to remove")
+    expected_version: int | None = Field(
+        default=None,
+        description="Apply only if the product is still at this version (its ETag)",
+    )
+
+
+class ProductStockResponse(BaseModel):
+    """
+    Schema for the stock of a Product after a reservation, release or adjustment
+    """
+
+    product_id: int
+    quantity: int
+    version: int = Field(description="Version of the product after the change")
+
+
+class ProductStats(BaseModel):
+    """
+    Schema for inventory aggregates over all Products
+    """
+
+    total_products: int
+    total_quantity: int = Field(description="Units in stock over all products")
+    total_value: float = Field(description="Sum of price * quantity")
+    out_of_stock: int = Field(description="Products with quantity 0")
+    min_price: float | None = Field(description="Null when there are no products")
+    max_price: float | None = Field(description="Null when there are no products")
 
 
 class CreateProductResponse(BaseModel):
@@ -72,3 +146,26 @@ class UpdateProductResponse(BaseModel):
 
     updated_product: ProductResponse
     user_who_updated: UserResponse
+
+
+class ProductBulkItemResult(BaseModel):
+    """
+    Outcome of one item of a bulk operation
+    """
+
+    index: int = Field(description="Position of the item in the request")
+    product_id: int | None = None
+    product: ProductResponse | None = None
+    error: str | None = None
+
+
+class ProductBulkResponse(BaseModel):
+    """
+    Response schema for bulk Product operations with per-item results
+    """
+
+    total: int
+    succeeded: int
+    failed: int
+    results: list[ProductBulkItemResult]
+    user_who_applied: UserResponse
@@ -0,0 +1,141 @@
+import asyncio
+from collections import OrderedDict
+from enum import StrEnum
+
+from pydantic import BaseModel
+
+from src.core.product.entities import ProductResponse
+from src.settings import get_settings
+
+PRODUCT_EVENTS_MAX_PENDING: int = get_settings().product_events_max_pending
+PRODUCT_EVENTS_LOG_SIZE: int = get_settings().product_events_log_size
+
+
+class ProductEventType(StrEnum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+
+
+class ProductEvent(BaseModel):
+    """
+    Change of a single product pushed to subscribers
+    """
+
+    type: ProductEventType
+    product_id: int
+    product: ProductResponse | None = None
+
+
+class ProductEventSubscription:
+    """
+    Read cursor of one client into the broker's event log
+
+    Events the client has not sent yet are coalesced by product id (a newer
+    event for a pending product replaces it in place) and capped at
+    max_pending, the oldest pending event is dropped beyond that. A client
+    that falls further behind than the log size skips the lost events.
+    """
+
+    def __init__(self, broker: "ProductEventBroker", max_pending: int):
+        self.broker = broker
+        self.max_pending = max_pending
+        self.cursor = broker.next_sequence
+        self.pending = OrderedDict()  # product_id -> payload
+        self.coalesced = 0
+        self.dropped = 0
+
+    async def get(self) -> str:
+        while not self.pending:
+            await self.broker.wait(self.cursor)
+            self._collect()
+        _, payload = self.pending.popitem(last=False)
+        return payload
+
+    def _collect(self) -> None:
+        broker = self.broker
+        oldest = broker.next_sequence - min(broker.next_sequence, broker.log_size)
+        if self.cursor < oldest:
+            self.dropped += oldest - self.cursor
+            self.cursor = oldest
+
+        for sequence in range(self.cursor, broker.next_sequence):
+            product_id, payload = broker.log[sequence % broker.log_size]
+            if product_id in self.pending:
+                self.pending[product_id] = payload
+                self.coalesced += 1
+                continue
+            if len(self.pending) >= self.max_pending:
+                self.pending.popitem(last=False)
+                self.dropped += 1
+            self.pending[product_id] = payload
+        self.cursor = broker.next_sequence
+
+
+class ProductEventBroker:
+    """
+    In-process fan-out of product changes
+
+    Each event is serialised once into a fixed-size ring buffer shared by all
+    subscribers. Publishing is O(1) and never awaits: it only resolves one
+    future that the subscribers currently waiting for news share, clients
+    that are busy or stalled cost nothing until they read again.
+    """
+
+    def __init__(self, max_pending: int, log_size: int):
+        self.max_pending = max_pending
+        self.log_size = log_size
+        self.log = [None] * log_size  # sequence % log_size -> (product_id, payload)
+        self.next_sequence = 0
+        self.subscriptions: set[ProductEventSubscription] = set()
+        self._news: asyncio.Future | None = None
+
+    def subscribe(self) -> ProductEventSubscription:
+        subscription = ProductEventSubscription(self, self.max_pending)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ProductEventSubscription) -> None:
+        self.subscriptions.discard(subscription)
+
+    def publish(self, event: ProductEvent) -> None:
+        if self.subscriptions:
+            payload = event.model_dump_json()
+            self.log[self.next_sequence % self.log_size] = (event.product_id, payload)
+        self.next_sequence += 1
+        if self._news is not None:
+            if not self._news.done():
+                self._news.set_result(None)
+            self._news = None
+
+    async def wait(self, sequence: int) -> None:
+        """
+        Returns once an event with a number >= sequence was published
+        """
+        while self.next_sequence <= sequence:
+            if self._news is None:
+                self._news = asyncio.get_running_loop().create_future()
+            news = self._news
+            try:
+                await news
+            except asyncio.CancelledError:
+                # Cancelling one waiter cancels the shared future for everybody,
+                # only re-raise in the task that was actually cancelled
+                if self._news is news:
+                    self._news = None
+                if asyncio.current_task().cancelling():
+                    raise
+
+    def metrics(self) -> dict:
+        return {
+            "subscribers": len(self.subscriptions),
+            "published": self.next_sequence,
+            "coalesced": sum(s.coalesced for s in self.subscriptions),
+            "dropped": sum(s.dropped for s in self.subscriptions),
+        }
+
+
+product_event_broker = ProductEventBroker(
+    max_pending=PRODUCT_EVENTS_MAX_PENDING,
+    log_size=PRODUCT_EVENTS_LOG_SIZE,
+)
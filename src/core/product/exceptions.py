@@ -6,3 +6,28 @@ class ProductAlreadyExistsError(Exception):
 class ProductNotFoundError(Exception):
     def __init__(self):
         super().__init__("Product not found")
+
+
+class ProductBulkOperationError(Exception):
+    """
+    Raised by atomic bulk operations, errors maps item index -> error
+    """
+
+    def __init__(self, errors: dict[int, Exception]):
+        super().__init__("Bulk operation was not applied")
+        self.errors = errors
+
+
+class InsufficientStockError(Exception):
+    def __init__(self):
+        super().__init__("Not enough stock")
+
+
+class ProductVersionConflictError(Exception):
+    def __init__(self):
+        super().__init__("Product was changed since the expected version")
+
+
+class ProductWriteContentionError(Exception):
+    def __init__(self):
+        super().__init__("Product is changed by too many writers at once, retry")
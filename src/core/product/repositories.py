@@ -0,0 +1,119 @@
+from abc import ABC, abstractmethod
+
+from src.core.product.entities import (
+    ProductBulkUpdate,
+    ProductCreate,
+    ProductResponse,
+    ProductStats,
+    ProductUpdate,
+)
+from src.core.product.search import SearchCursor
+
+
+class ProductRepository(ABC):
+    """
+    Storage interface ProductService depends on
+    """
+
+    # True when reads hand out the stored object itself until the product
+    # changes, the identity SerializedModelCache entries are keyed on
+    stable_objects: bool = False
+
+    @abstractmethod
+    async def add(
+        self, product: ProductCreate, created_by: int | None = None
+    ) -> ProductResponse: ...
+
+    @abstractmethod
+    async def get_by_id(self, product_id: int) -> ProductResponse: ...
+
+    @abstractmethod
+    async def get_with_version(self, product_id: int) -> tuple[ProductResponse, int]:
+        """
+        The product and the version it was read at, for ETags that match the
+        body they come with
+        """
+
+    @abstractmethod
+    async def get_many(self, product_ids: list[int]) -> list[ProductResponse | None]:
+        """
+        Products in the order of product_ids, None for missing ones
+        """
+
+    @abstractmethod
+    async def update(
+        self, product: ProductUpdate, product_id: int
+    ) -> ProductResponse: ...
+
+    @abstractmethod
+    async def adjust_quantity(
+        self, product_id: int, delta: int, expected_version: int | None = None
+    ) -> tuple[ProductResponse, int]:
+        """
+        Atomically adds `delta` to the quantity, returns (product, version)
+
+        Raises InsufficientStockError instead of going below zero and
+        ProductVersionConflictError when expected_version is not the
+        product's current version.
+        """
+
+    @abstractmethod
+    async def delete(self, product_id: int) -> None: ...
+
+    @abstractmethod
+    async def add_many(
+        self,
+        products: list[ProductCreate],
+        atomic: bool,
+        created_by: int | None = None,
+    ) -> list[ProductResponse | Exception]:
+        """
+        atomic: apply all items or raise ProductBulkOperationError with every
+        failing item, otherwise failed items are returned in place of results
+        """
+
+    @abstractmethod
+    async def update_many(
+        self, products: list[ProductBulkUpdate], atomic: bool
+    ) -> list[ProductResponse | Exception]: ...
+
+    @abstractmethod
+    async def delete_many(
+        self, product_ids: list[int], atomic: bool
+    ) -> list[int | Exception]: ...
+
+    @abstractmethod
+    async def get_all(self) -> list[ProductResponse]: ...
+
+    @abstractmethod
+    async def get_page(self, after_id: int, limit: int) -> list[ProductResponse]: ...
+
+    @abstractmethod
+    async def search(
+        self, query: str, limit: int, after: SearchCursor | None = None
+    ) -> list[ProductResponse]:
+        """
+        Case-insensitive name search: names starting with the query ordered
+        by name, then names containing it ordered by id (see SearchCursor)
+        """
+
+    @abstractmethod
+    async def count(self) -> int: ...
+
+    @abstractmethod
+    async def get_stats(self) -> ProductStats:
+        """
+        Inventory aggregates over all products
+        """
+
+    @abstractmethod
+    async def get_collection_version(self) -> int:
+        """
+        Monotonic version of the whole collection, changes on every write
+        """
+
+    @abstractmethod
+    async def get_product_version(self, product_id: int) -> int:
+        """
+        Version of a single product, raises ProductNotFoundError
+        """
@@ -0,0 +1,392 @@
+import base64
+import binascii
+import json
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import NamedTuple
+
+from src.core.pagination import InvalidCursorError
+
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 100
+NGRAM_SIZE = 3
+# Substring candidates checked one by one before intersecting posting lists
+SUBSTRING_WALK = 64
+
+PREFIX_TIER = "prefix"
+SUBSTRING_TIER = "substring"
+
+
+def normalize(text: str) -> str:
+    key = text.casefold()
+    # Already lowercase names share the string object instead of a copy
+    return text if key == text else key
+
+
+def ngrams(key: str) -> set[str]:
+    return {key[i : i + NGRAM_SIZE] for i in range(len(key) - NGRAM_SIZE + 1)}
+
+
+class SearchCursor(NamedTuple):
+    """
+    Position after the last returned match
+
+    Matches are ranked in two tiers: names starting with the query ordered by
+    (normalized name, id), then names containing it elsewhere ordered by id.
+    """
+
+    tier: str
+    key: str
+    product_id: int
+
+
+def cursor_after(query: str, product_id: int, name: str) -> SearchCursor:
+    key = normalize(name)
+    tier = PREFIX_TIER if key.startswith(normalize(query)) else SUBSTRING_TIER
+    return SearchCursor(tier, key, product_id)
+
+
+def encode_search_cursor(cursor: SearchCursor) -> str:
+    raw = json.dumps(list(cursor), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor: str | None) -> SearchCursor | None:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        tier, key, product_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise InvalidCursorError()
+    if tier not in (PREFIX_TIER, SUBSTRING_TIER) or not isinstance(key, str):
+        raise InvalidCursorError()
+    if not isinstance(product_id, int) or product_id < 0:
+        raise InvalidCursorError()
+    return SearchCursor(tier, key, product_id)
+
+
+def rank_matches(
+    query: str, candidates, after: SearchCursor | None, limit: int
+) -> list[SearchCursor]:
+    """
+    One page of matches from an unindexed list of (name, id) candidates,
+    same ranking as ProductSearchIndex.search
+    """
+    query_key = normalize(query)
+    prefix = []
+    substring = []
+    for name, product_id in candidates:
+        key = normalize(name)
+        if key.startswith(query_key):
+            prefix.append(SearchCursor(PREFIX_TIER, key, product_id))
+        elif len(query_key) >= NGRAM_SIZE and query_key in key:
+            substring.append(SearchCursor(SUBSTRING_TIER, key, product_id))
+    prefix.sort(key=lambda match: (match.key, match.product_id))
+    substring.sort(key=lambda match: match.product_id)
+
+    if after is not None and after.tier == PREFIX_TIER:
+        position = (after.key, after.product_id)
+        prefix = [m for m in prefix if (m.key, m.product_id) > position]
+    elif after is not None:
+        prefix = []
+        substring = [m for m in substring if m.product_id > after.product_id]
+    return (prefix + substring)[:limit]
+
+
+class SortedKeyList:
+    """
+    Sorted list of (key, id) split into chunks of about `load` items
+
+    Inserting into one flat list of 1M items moves megabytes per call, here
+    it moves at most one chunk. `maxes` holds the last item of every chunk
+    for the bisect to the right chunk.
+    """
+
+    def __init__(self, load: int = 1000):
+        self.load = load
+        self.chunks = []
+        self.maxes = []
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def rebuild(self, items) -> None:
+        items = sorted(items)
+        self.chunks = [
+            items[start : start + self.load]
+            for start in range(0, len(items), self.load)
+        ]
+        self.maxes = [chunk[-1] for chunk in self.chunks]
+        self.size = len(items)
+
+    def add(self, item) -> None:
+        self.size += 1
+        if not self.chunks:
+            self.chunks.append([item])
+            self.maxes.append(item)
+            return
+        position = bisect_left(self.maxes, item)
+        if position == len(self.maxes):
+            position -= 1
+            self.chunks[position].append(item)
+            self.maxes[position] = item
+        else:
+            insort(self.chunks[position], item)
+        chunk = self.chunks[position]
+        if len(chunk) > 2 * self.load:
+            self.chunks[position : position + 1] = [
+                chunk[: self.load],
+                chunk[self.load :],
+            ]
+            self.maxes[position : position + 1] = [chunk[self.load - 1], chunk[-1]]
+
+    def remove(self, item) -> None:
+        position = bisect_left(self.maxes, item)
+        if position == len(self.maxes):
+            return
+        chunk = self.chunks[position]
+        index = bisect_left(chunk, item)
+        if index == len(chunk) or chunk[index] != item:
+            return
+        del chunk[index]
+        self.size -= 1
+        if chunk:
+            self.maxes[position] = chunk[-1]
+        else:
+            del self.chunks[position]
+            del self.maxes[position]
+
+    def iter_after(self, item):
+        """
+        Items greater than `item` in order
+        """
+        position = bisect_right(self.maxes, item)
+        if position == len(self.maxes):
+            return
+        chunk = self.chunks[position]
+        yield from chunk[bisect_right(chunk, item) :]
+        for chunk in self.chunks[position + 1 :]:
+            yield from chunk
+
+
+class ProductSearchIndex:
+    """
+    Product name index for typeahead search, maintained by ProductManager
+
+    keys: SortedKeyList of (normalized name, id), a prefix query is one bisect
+        and a walk over the matches in rank order
+    postings: trigram -> sorted array of ids whose name contains it. A
+        substring query walks the shortest posting list of its trigrams from
+        the cursor on, checking the candidates against the current names.
+        Renamed and deleted products stay in a posting list (checked away at
+        query time) until they make up half of it, then that list is
+        compacted.
+    stale_by_gram: trigram -> number of stale ids in its posting list
+
+    Substring matches need a query of at least NGRAM_SIZE characters, shorter
+    queries only match name prefixes.
+    """
+
+    def __init__(self):
+        self.keys = SortedKeyList()
+        self.keys_by_id = {}
+        self.postings = {}
+        self.stale_by_gram = {}
+        self.live_postings = 0
+        self.stale_postings = 0
+
+    def add(self, product_id: int, name: str) -> None:
+        key = normalize(name)
+        self.keys_by_id[product_id] = key
+        self.keys.add((key, product_id))
+        for gram in ngrams(key):
+            self.live_postings += 1
+            posting = self.postings.get(gram)
+            if posting is None:
+                self.postings[gram] = array("q", (product_id,))
+            elif posting[-1] < product_id:
+                posting.append(product_id)
+            else:
+                # A renamed product, its id may still be listed as stale
+                position = bisect_left(posting, product_id)
+                if position == len(posting) or posting[position] != product_id:
+                    posting.insert(position, product_id)
+                elif self.stale_by_gram.get(gram):
+                    self.stale_by_gram[gram] -= 1
+                    self.stale_postings -= 1
+
+    def remove(self, product_id: int) -> None:
+        key = self.keys_by_id.pop(product_id, None)
+        if key is None:
+            return
+        self.keys.remove((key, product_id))
+        for gram in ngrams(key):
+            self.live_postings -= 1
+            stale = self.stale_by_gram.get(gram, 0) + 1
+            if 2 * stale < len(self.postings[gram]):
+                self.stale_by_gram[gram] = stale
+                self.stale_postings += 1
+            else:
+                self._compact(gram, stale - 1)
+
+    def rebuild(self, items) -> None:
+        """
+        Replaces the index with (id, name) items
+        """
+        self._rebuild_keys(items)
+        postings = {}
+        for product_id in sorted(self.keys_by_id):
+            for gram in ngrams(self.keys_by_id[product_id]):
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = array("q", (product_id,))
+                else:
+                    posting.append(product_id)
+        self._set_postings(postings, {})
+
+    def capture(self):
+        """
+        Copies of the posting lists for a snapshot, see encode_postings
+        """
+        postings = {gram: posting[:] for gram, posting in self.postings.items()}
+        return postings, self.stale_by_gram.copy()
+
+    @staticmethod
+    def encode_postings(state) -> dict:
+        """
+        Snapshot columns of captured posting lists, concatenated into one array
+        """
+        postings, stale_by_gram = state
+        grams = list(postings)
+        offsets = array("q", [0])
+        ids = array("q")
+        for gram in grams:
+            ids.extend(postings[gram])
+            offsets.append(len(ids))
+        return {
+            "ngram": grams,
+            "ngram_stale": array("q", [stale_by_gram.get(gram, 0) for gram in grams]),
+            "ngram_offsets": offsets,
+            "ngram_ids": ids,
+        }
+
+    def restore(self, items, columns) -> None:
+        """
+        Replaces the index with (id, name) items and the posting lists of
+        encode_postings columns, splitting those is much cheaper than
+        computing the trigrams of every name again
+        """
+        self._rebuild_keys(items)
+        ids = columns["ngram_ids"]
+        offsets = columns["ngram_offsets"]
+        postings = {
+            gram: ids[start:end]
+            for gram, start, end in zip(columns["ngram"], offsets, offsets[1:])
+        }
+        stale_by_gram = {
+            gram: stale
+            for gram, stale in zip(columns["ngram"], columns["ngram_stale"])
+            if stale
+        }
+        self._set_postings(postings, stale_by_gram)
+
+    def search(
+        self, query: str, limit: int, after: SearchCursor | None = None
+    ) -> list[SearchCursor]:
+        query_key = normalize(query)
+        matches = []
+        if after is None or after.tier == PREFIX_TIER:
+            start = (after.key, after.product_id) if after else (query_key, -1)
+            for key, product_id in self.keys.iter_after(start):
+                if not key.startswith(query_key) or len(matches) == limit:
+                    break
+                matches.append(SearchCursor(PREFIX_TIER, key, product_id))
+
+        if len(matches) < limit and len(query_key) >= NGRAM_SIZE:
+            after_id = 0
+            if after is not None and after.tier == SUBSTRING_TIER:
+                after_id = after.product_id
+            for product_id in self._substring_candidates(query_key, after_id):
+                key = self.keys_by_id.get(product_id)
+                if key is None or query_key not in key or key.startswith(query_key):
+                    continue
+                matches.append(SearchCursor(SUBSTRING_TIER, key, product_id))
+                if len(matches) == limit:
+                    break
+        return matches
+
+    def metrics(self) -> dict:
+        return {
+            "names": len(self.keys),
+            "ngrams": len(self.postings),
+            "live_postings": self.live_postings,
+            "stale_postings": self.stale_postings,
+        }
+
+    def _substring_candidates(self, query_key: str, after_id: int):
+        """
+        Ids after `after_id` that contain every trigram of the query, ascending
+
+        The first candidates come straight from the shortest posting list,
+        which is enough when matches are dense. When they are sparse, the rest
+        of that list is intersected with the next shortest one as sets rather
+        than checking every id against its name.
+        """
+        postings = []
+        for gram in ngrams(query_key):
+            posting = self.postings.get(gram)
+            if posting is None:
+                return
+            postings.append(posting)
+        postings.sort(key=len)
+
+        shortest = postings[0]
+        position = bisect_right(shortest, after_id)
+        walk_end = min(position + SUBSTRING_WALK, len(shortest))
+        yield from shortest[position:walk_end]
+        if walk_end == len(shortest):
+            return
+
+        candidates = set(shortest[walk_end:])
+        if len(postings) > 1:
+            other = postings[1]
+            candidates.intersection_update(
+                other[bisect_left(other, shortest[walk_end]) :]
+            )
+        yield from sorted(candidates)
+
+    def _compact(self, gram: str, stale: int) -> None:
+        """
+        Drops the ids that no longer contain `gram` from its posting list
+        """
+        keys_by_id = self.keys_by_id
+        posting = array(
+            "q",
+            [
+                product_id
+                for product_id in self.postings[gram]
+                if gram in keys_by_id.get(product_id, "")
+            ],
+        )
+        self.stale_postings -= stale
+        self.stale_by_gram.pop(gram, None)
+        if posting:
+            self.postings[gram] = posting
+        else:
+            del self.postings[gram]
+
+    def _rebuild_keys(self, items) -> None:
+        self.keys_by_id = {product_id: normalize(name) for product_id, name in items}
+        self.keys.rebuild(
+            (key, product_id) for product_id, key in self.keys_by_id.items()
+        )
+
+    def _set_postings(self, postings: dict, stale_by_gram: dict) -> None:
+        self.postings = postings
+        self.stale_by_gram = stale_by_gram
+        self.stale_postings = sum(stale_by_gram.values())
+        self.live_postings = (
+            sum(len(posting) for posting in postings.values()) - self.stale_postings
+        )
@@ -1,5 +1,23 @@
-from src.products.managers import product_manager, ProductManager
-from src.core.product.entities import ProductResponse, ProductCreate, ProductUpdate
+from src.core.product.entities import (
+    ProductBulkUpdate,
+    ProductResponse,
+    ProductCreate,
+    ProductStats,
+    ProductUpdate,
+)
+from src.core.product.events import (
+    ProductEvent,
+    ProductEventBroker,
+    ProductEventType,
+    product_event_broker,
+)
+from src.core.product.repositories import ProductRepository
+from src.core.product.search import SearchCursor
+from src.core.singleflight import SingleFlight
+from src.products.repositories import product_repository
+from src.settings import get_settings
+
+PRODUCT_READ_WINDOW_MS: int = get_settings().product_read_window_ms
 
 
 class ProductService:
@@ -7,23 +25,186 @@ class ProductService:
     Product Service to manage products
     """
 
-    def __init__(self, manager: ProductManager):
-        self.manager = manager
+    def __init__(
+        self,
+        repository: ProductRepository,
+        events: ProductEventBroker,
+        read_window_seconds: float = PRODUCT_READ_WINDOW_MS / 1000,
+    ):
+        self.repository = repository
+        self.events = events
+        # (collection version, ProductStats) of the last get_stats()
+        self._stats = None
+        # Single product reads, keyed by (kind, product_id)
+        self.reads = SingleFlight(read_window_seconds)
+
+    async def add(
+        self, product: ProductCreate, created_by: int | None = None
+    ) -> ProductResponse:
+        created_product = await self.repository.add(product, created_by)
+        self.events.publish(
+            ProductEvent(
+                type=ProductEventType.CREATED,
+                product_id=created_product.id,
+                product=created_product,
+            )
+        )
+        return created_product
+
+    async def get(self, product_id: int) -> ProductResponse:
+        """
+        Concurrent calls for the same product share one backend read and
+        get the same object
+        """
+        return await self.reads.do(
+            ("product", product_id), lambda: self.repository.get_by_id(product_id)
+        )
+
+    async def get_with_version(self, product_id: int) -> tuple[ProductResponse, int]:
+        """
+        get() with the version the product was read at, shared the same way
+        """
+        return await self.reads.do(
+            ("product_with_version", product_id),
+            lambda: self.repository.get_with_version(product_id),
+        )
+
+    async def get_many(self, product_ids: list[int]) -> list[ProductResponse | None]:
+        return await self.repository.get_many(product_ids)
+
+    async def update(self, product: ProductUpdate, product_id: int) -> ProductResponse:
+        updated_product = await self.repository.update(product, product_id)
+        self._forget(product_id)
+        self.events.publish(
+            ProductEvent(
+                type=ProductEventType.UPDATED,
+                product_id=product_id,
+                product=updated_product,
+            )
+        )
+        return updated_product
+
+    async def reserve(
+        self, product_id: int, quantity: int, expected_version: int | None = None
+    ) -> tuple[ProductResponse, int]:
+        return await self.adjust_quantity(product_id, -quantity, expected_version)
+
+    async def release(
+        self, product_id: int, quantity: int, expected_version: int | None = None
+    ) -> tuple[ProductResponse, int]:
+        return await self.adjust_quantity(product_id, quantity, expected_version)
+
+    async def adjust_quantity(
+        self, product_id: int, delta: int, expected_version: int | None = None
+    ) -> tuple[ProductResponse, int]:
+        """
+        Returns the product after the change and its new version
+        """
+        updated_product, version = await self.repository.adjust_quantity(
+            product_id, delta, expected_version
+        )
+        self._forget(product_id)
+        self.events.publish(
+            ProductEvent(
+                type=ProductEventType.UPDATED,
+                product_id=product_id,
+                product=updated_product,
+            )
+        )
+        return updated_product, version
+
+    async def delete(self, product_id: int) -> None:
+        await self.repository.delete(product_id)
+        self._forget(product_id)
+        self.events.publish(
+            ProductEvent(type=ProductEventType.DELETED, product_id=product_id)
+        )
+
+    async def add_many(
+        self,
+        products: list[ProductCreate],
+        atomic: bool,
+        created_by: int | None = None,
+    ) -> list[ProductResponse | Exception]:
+        results = await self.repository.add_many(products, atomic, created_by)
+        for result in results:
+            if isinstance(result, ProductResponse):
+                self.events.publish(
+                    ProductEvent(
+                        type=ProductEventType.CREATED,
+                        product_id=result.id,
+                        product=result,
+                    )
+                )
+        return results
+
+    async def update_many(
+        self, products: list[ProductBulkUpdate], atomic: bool
+    ) -> list[ProductResponse | Exception]:
+        results = await self.repository.update_many(products, atomic)
+        for result in results:
+            if isinstance(result, ProductResponse):
+                self._forget(result.id)
+                self.events.publish(
+                    ProductEvent(
+                        type=ProductEventType.UPDATED,
+                        product_id=result.id,
+                        product=result,
+                    )
+                )
+        return results
+
+    async def delete_many(
+        self, product_ids: list[int], atomic: bool
+    ) -> list[int | Exception]:
+        results = await self.repository.delete_many(product_ids, atomic)
+        for result in results:
+            if not isinstance(result, Exception):
+                self._forget(result)
+                self.events.publish(
+                    ProductEvent(type=ProductEventType.DELETED, product_id=result)
+                )
+        return results
+
+    async def get_all(self) -> list[ProductResponse]:
+        return await self.repository.get_all()
+
+    async def get_page(self, after_id: int, limit: int) -> list[ProductResponse]:
+        return await self.repository.get_page(after_id, limit)
+
+    async def search(
+        self, query: str, limit: int, after: SearchCursor | None = None
+    ) -> list[ProductResponse]:
+        return await self.repository.search(query, limit, after)
 
-    def add(self, product: ProductCreate) -> ProductResponse:
-        return self.manager.add(product)
+    async def count(self) -> int:
+        return await self.repository.count()
 
-    def get(self, product_id: int) -> ProductResponse:
-        return self.manager.get_by_id(product_id)
+    async def get_stats(self) -> ProductStats:
+        """
+        Recomputed only after a write, the shared backends scan every product
+        """
+        version = await self.repository.get_collection_version()
+        if self._stats is None or self._stats[0] != version:
+            self._stats = (version, await self.repository.get_stats())
+        return self._stats[1]
 
-    def update(self, product: ProductUpdate, product_id: int) -> ProductResponse:
-        return self.manager.update(product, product_id)
+    async def get_collection_version(self) -> int:
+        return await self.repository.get_collection_version()
 
-    def delete(self, product_id: int) -> None:
-        self.manager.delete(product_id)
+    async def get_product_version(self, product_id: int) -> int:
+        return await self.reads.do(
+            ("version", product_id),
+            lambda: self.repository.get_product_version(product_id),
+        )
 
-    def get_all(self) -> list[ProductResponse]:
-        return self.manager.get_all()
+    def _forget(self, product_id: int) -> None:
+        """
+        Reads after a write must not share a fetch started before it
+        """
+        self.reads.forget(("product", product_id))
+        self.reads.forget(("product_with_version", product_id))
+        self.reads.forget(("version", product_id))
 
 
-product_service = ProductService(product_manager)
+product_service = ProductService(product_repository, product_event_broker)
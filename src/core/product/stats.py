@@ -0,0 +1,94 @@
+from collections import Counter
+from heapq import heapify, heappop, heappush
+
+from src.core.product.entities import ProductStats
+
+# Values are summed as integers in units of the smallest float (2**-1074), so
+# the total is exact however many updates it absorbs
+_VALUE_SHIFT = 1074
+
+
+def _exact(price: float) -> int:
+    numerator, denominator = price.as_integer_ratio()
+    # denominator is a power of two
+    return numerator << (_VALUE_SHIFT + 1 - denominator.bit_length())
+
+
+class ProductStatsAggregator:
+    """
+    Inventory aggregates updated per product instead of recomputed per read
+
+    price_counts: price -> number of products at that price
+    min_prices, max_prices: heaps of the prices (max negated), prices no
+        longer in price_counts are popped once they reach the top, so the
+        minimum and maximum are always at index 0
+    """
+
+    def __init__(self):
+        self.products = 0
+        self.quantity = 0
+        self.value = 0
+        self.out_of_stock = 0
+        self.price_counts = Counter()
+        self.min_prices = []
+        self.max_prices = []
+
+    def add(self, quantity: int, price: float) -> None:
+        self.products += 1
+        self.quantity += quantity
+        self.value += _exact(price) * quantity
+        if quantity == 0:
+            self.out_of_stock += 1
+        self.price_counts[price] += 1
+        if self.price_counts[price] == 1:
+            heappush(self.min_prices, price)
+            heappush(self.max_prices, -price)
+
+    def remove(self, quantity: int, price: float) -> None:
+        self.products -= 1
+        self.quantity -= quantity
+        self.value -= _exact(price) * quantity
+        if quantity == 0:
+            self.out_of_stock -= 1
+        self.price_counts[price] -= 1
+        if self.price_counts[price] == 0:
+            del self.price_counts[price]
+            self._prune_prices()
+
+    def rebuild(self, quantities, prices) -> None:
+        """
+        Replaces the aggregates with the products given as parallel columns
+        """
+        self.products = len(quantities)
+        self.quantity = sum(quantities)
+        self.value = sum(map(int.__mul__, map(_exact, prices), quantities))
+        self.out_of_stock = quantities.count(0)
+        self.price_counts = Counter(prices)
+        self._rebuild_heaps()
+
+    def stats(self) -> ProductStats:
+        has_prices = bool(self.price_counts)
+        return ProductStats(
+            total_products=self.products,
+            total_quantity=self.quantity,
+            total_value=self.value / (1 << _VALUE_SHIFT),
+            out_of_stock=self.out_of_stock,
+            min_price=self.min_prices[0] if has_prices else None,
+            max_price=-self.max_prices[0] if has_prices else None,
+        )
+
+    def _prune_prices(self) -> None:
+        while self.min_prices and self.min_prices[0] not in self.price_counts:
+            heappop(self.min_prices)
+        while self.max_prices and -self.max_prices[0] not in self.price_counts:
+            heappop(self.max_prices)
+        # Prices removed below the top stay in the heaps, drop them before
+        # they outnumber the live ones
+        if len(self.min_prices) + len(self.max_prices) > 4 * len(self.price_counts):
+            self._rebuild_heaps()
+
+    def _rebuild_heaps(self) -> None:
+        self.min_prices = list(self.price_counts)
+        self.max_prices = [-price for price in self.price_counts]
+        heapify(self.min_prices)
+        heapify(self.max_prices)
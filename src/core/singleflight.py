@@ -0,0 +1,84 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Collapses concurrent reads of the same key into one
+
+    The first call for a key starts `fetch()` in its own task, calls for the
+    key arriving before it completes wait for that task and share its result
+    or exception. A caller that is cancelled does not cancel the fetch the
+    others wait for.
+
+    With `window_seconds`, a result is also handed to the calls made that
+    long after it completed (a micro-cache), exceptions never are. forget()
+    must be called when the value behind a key changes, so that calls made
+    after a write neither join a fetch started before it nor get a result
+    from before it.
+    """
+
+    def __init__(self, window_seconds: float = 0):
+        self.window_seconds = window_seconds
+        self._flights = {}  # key -> asyncio.Task
+        # key -> (expires_at, result), in completion order so expiring ones
+        # are at the front
+        self._results = {}
+
+        self.calls = 0
+        self.fetches = 0
+        self.coalesced = 0
+        self.window_hits = 0
+
+    async def do(self, key: Hashable, fetch: Callable[[], Awaitable]):
+        self.calls += 1
+        if self._results:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.window_hits += 1
+                return entry[1]
+
+        flight = self._flights.get(key)
+        if flight is None:
+            self.fetches += 1
+            flight = asyncio.ensure_future(fetch())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._land(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(flight)
+
+    def forget(self, key: Hashable) -> None:
+        self._flights.pop(key, None)
+        self._results.pop(key, None)
+
+    def metrics(self) -> dict:
+        return {
+            "calls": self.calls,
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+            "window_hits": self.window_hits,
+            "in_flight": len(self._flights),
+            "window_entries": len(self._results),
+        }
+
+    def _land(self, key: Hashable, flight: asyncio.Task) -> None:
+        # Also marks the exception as retrieved when every waiter went away
+        failed = flight.cancelled() or flight.exception() is not None
+        # forget() may already have dropped the flight, its result is stale
+        if self._flights.get(key) is not flight:
+            return
+        del self._flights[key]
+        if failed or self.window_seconds <= 0:
+            return
+
+        now = time.monotonic()
+        results = self._results
+        results.pop(key, None)
+        results[key] = (now + self.window_seconds, flight.result())
+        while results:
+            oldest_key = next(iter(results))
+            if results[oldest_key][0] > now:
+                break
+            del results[oldest_key]
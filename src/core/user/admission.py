@@ -0,0 +1,155 @@
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from src.core.user.exceptions import LoginOverloadedError, LoginRateLimitedError
+from src.settings import get_settings
+
+LOGIN_MAX_CONCURRENT: int = get_settings().login_max_concurrent
+LOGIN_USER_BURST: int = get_settings().login_user_burst
+LOGIN_USER_PER_MINUTE: float = get_settings().login_user_per_minute
+LOGIN_IP_BURST: int = get_settings().login_ip_burst
+LOGIN_IP_PER_MINUTE: float = get_settings().login_ip_per_minute
+LOGIN_BUCKETS_MAX_SIZE: int = get_settings().login_buckets_max_size
+LOGIN_OVERLOAD_RETRY_SECONDS: float = get_settings().login_overload_retry_seconds
+
+
+class TokenBuckets:
+    """
+    Token bucket per key: `burst` attempts at once, refilled at `per_minute`
+
+    Bounded LRU of key -> (tokens, refilled_at), a key evicted or never seen
+    starts with a full bucket.
+    """
+
+    def __init__(self, burst: int, per_minute: float, max_size: int):
+        self.burst = burst
+        self.rate = per_minute / 60
+        self.max_size = max_size
+        self._buckets = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def wait_seconds(self, key: str, now: float) -> float:
+        """
+        Time until `key` has a token, 0 when it has one now
+        """
+        tokens = self._tokens(key, now)
+        if tokens >= 1:
+            return 0.0
+        return (1 - tokens) / self.rate
+
+    def take(self, key: str, now: float) -> None:
+        self._put(key, self._tokens(key, now) - 1, now)
+
+    def give_back(self, key: str, now: float) -> None:
+        self._put(key, min(self.burst, self._tokens(key, now) + 1), now)
+
+    def _tokens(self, key: str, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.burst
+        tokens, refilled_at = bucket
+        return min(self.burst, tokens + (now - refilled_at) * self.rate)
+
+    def _put(self, key: str, tokens: float, now: float) -> None:
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_size:
+            self._buckets.popitem(last=False)
+
+
+class LoginAdmission:
+    """
+    Admission control in front of bcrypt for the credential endpoints
+
+    Attempts are charged to a per-username and a per-client-IP token bucket
+    and limited to `max_concurrent` in flight, so a credential-stuffing burst
+    is turned away before any hashing instead of queueing on the hasher pool
+    and taking the CPU from every other request. State is per worker process.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        user_buckets: TokenBuckets,
+        ip_buckets: TokenBuckets,
+        overload_retry_seconds: float,
+    ):
+        self.max_concurrent = max_concurrent
+        self.user_buckets = user_buckets
+        self.ip_buckets = ip_buckets
+        self.overload_retry_seconds = overload_retry_seconds
+
+        self.in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.overloaded = 0
+
+    @contextmanager
+    def admit(self, client_ip: str | None, username: str | None = None):
+        """
+        Raises LoginRateLimitedError or LoginOverloadedError, both carry the
+        seconds to wait before retrying
+        """
+        now = time.monotonic()
+        charges = self._charges(client_ip, username)
+        wait = max(
+            (buckets.wait_seconds(key, now) for buckets, key in charges), default=0.0
+        )
+        if wait > 0:
+            self.rate_limited += 1
+            raise LoginRateLimitedError(wait)
+        if self.in_flight >= self.max_concurrent:
+            self.overloaded += 1
+            raise LoginOverloadedError(self.overload_retry_seconds)
+
+        for buckets, key in charges:
+            buckets.take(key, now)
+        self.in_flight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def refund(self, client_ip: str | None, username: str | None = None) -> None:
+        """
+        Returns the tokens of a successful login, only failures use up the budget
+        """
+        now = time.monotonic()
+        for buckets, key in self._charges(client_ip, username):
+            buckets.give_back(key, now)
+
+    def metrics(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "overloaded": self.overloaded,
+            "user_buckets": len(self.user_buckets),
+            "ip_buckets": len(self.ip_buckets),
+        }
+
+    def _charges(self, client_ip: str | None, username: str | None) -> list:
+        charges = []
+        if username is not None:
+            # Usernames are case-insensitive, so are their buckets
+            charges.append((self.user_buckets, username.casefold()))
+        if client_ip is not None:
+            charges.append((self.ip_buckets, client_ip))
+        return charges
+
+
+login_admission = LoginAdmission(
+    max_concurrent=LOGIN_MAX_CONCURRENT,
+    user_buckets=TokenBuckets(
+        LOGIN_USER_BURST, LOGIN_USER_PER_MINUTE, LOGIN_BUCKETS_MAX_SIZE
+    ),
+    ip_buckets=TokenBuckets(
+        LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE, LOGIN_BUCKETS_MAX_SIZE
+    ),
+    overload_retry_seconds=LOGIN_OVERLOAD_RETRY_SECONDS,
+)
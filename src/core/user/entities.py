@@ -90,6 +90,15 @@ class UserResponse(UserBase):
     id: int = Field(description="Unique user ID")
 
 
+class Principal(UserResponse):
+    """
+    The authenticated user of a request, with the permissions precompiled
+    into a bitmask (see src.core.permissions)
+    """
+
+    permission_mask: int = Field(default=0, exclude=True)
+
+
 class UserResponseWithHashedPWD(UserResponse):
     """
     To get an existing User with hashed password
@@ -105,3 +114,7 @@ class UserListResponse(BaseModel):
 
     total_users: int
     users: list[UserResponse]
+    next_cursor: str | None = Field(
+        default=None,
+        description="Opaque cursor of the next page, null on the last page",
+    )
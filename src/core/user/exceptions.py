@@ -28,6 +28,28 @@ class TokenTypeIsNotValidError(Exception):
         super().__init__("Authentication Error: Token type is not valid")
 
 
+class TokenRevokedError(Exception):
+    def __init__(self):
+        super().__init__("Authentication Error: Token was revoked")
+
+
 class TokenCreationError(Exception):
     def __init__(self):
         super().__init__("Authentication Error: Error creating token")
+
+
+class PasswordHasherBusyError(Exception):
+    def __init__(self):
+        super().__init__("Password hasher is busy, try again later")
+
+
+class LoginRateLimitedError(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("Too many login attempts, try again later")
+        self.retry_after = retry_after
+
+
+class LoginOverloadedError(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("Too many logins in progress, try again later")
+        self.retry_after = retry_after
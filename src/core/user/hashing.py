@@ -0,0 +1,129 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt
+
+from src.core.metrics import metrics_registry
+from src.core.user.exceptions import PasswordHasherBusyError
+from src.settings import get_settings
+
+PASSWORD_HASHER_EXECUTOR: str = get_settings().password_hasher_executor
+PASSWORD_HASHER_WORKERS: int = get_settings().password_hasher_workers
+PASSWORD_HASHER_MAX_PENDING: int = get_settings().password_hasher_max_pending
+
+# bcrypt hash of a random password at the default cost, verified for unknown
+# usernames so that they take as long to reject as wrong passwords
+DUMMY_PASSWORD_HASH = "$2b$12$UBL22RuWM/.OGNp/wVMT7ucy33sLrD.uV3RDi/RwJS6PizLh/KDy2"
+
+password_hasher_seconds = metrics_registry.histogram(
+    "password_hasher_duration_seconds",
+    "bcrypt hashing/verification time including the wait for a pool worker",
+    ("operation",),
+)
+
+
+def _hash_password(password: bytes) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt())
+
+
+def _check_password(password: bytes, hashed_password: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing/verification in a worker pool so the event loop is never blocked
+
+    executor: "thread" (bcrypt releases the GIL) or "process"
+    workers: pool size
+    max_pending: jobs allowed in flight + queued, extra jobs are rejected
+    """
+
+    def __init__(self, executor: str, workers: int, max_pending: int):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown password hasher executor: {executor}")
+        self.executor_type = executor
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Executor | None = None
+
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    async def hash(self, password: str) -> str:
+        hashed_password = await self._run(
+            "hash", _hash_password, password.encode("utf-8")
+        )
+        return hashed_password.decode("utf-8")
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(
+            "verify",
+            _check_password,
+            password.encode("utf-8"),
+            hashed_password.encode("utf-8"),
+        )
+
+    def metrics(self) -> dict:
+        return {
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "total_seconds": self.total_seconds,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, operation: str, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusyError()
+
+        self.pending += 1
+        self.submitted += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+            return result
+        finally:
+            self.pending -= 1
+            elapsed = time.perf_counter() - started
+            self.total_seconds += elapsed
+            password_hasher_seconds.observe(elapsed, operation)
+
+    def _get_executor(self) -> Executor:
+        # Created lazily so that forked gunicorn workers get their own pool
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hasher"
+                )
+        return self._executor
+
+
+password_hasher = PasswordHasher(
+    executor=PASSWORD_HASHER_EXECUTOR,
+    workers=PASSWORD_HASHER_WORKERS,
+    max_pending=PASSWORD_HASHER_MAX_PENDING,
+)
@@ -0,0 +1,52 @@
+from abc import ABC, abstractmethod
+
+from src.core.user.entities import CreateUser, UserResponse
+
+
+class UserRepository(ABC):
+    """
+    Storage interface UserService depends on
+
+    Stored users are returned as (user_id, user) where user carries
+    username/email/is_admin/permissions and the hashed password
+    """
+
+    @abstractmethod
+    async def add(self, user: CreateUser) -> UserResponse: ...
+
+    @abstractmethod
+    async def get_by_id(self, user_id: int): ...
+
+    @abstractmethod
+    async def get_by_username(self, username: str) -> tuple | None: ...
+
+    @abstractmethod
+    async def get_many(self, user_ids: list[int]) -> list[tuple | None]:
+        """
+        (user_id, user) in the order of user_ids, None for missing ones
+        """
+
+    @abstractmethod
+    async def get_all(self) -> list[tuple]: ...
+
+    @abstractmethod
+    async def get_page(self, after_id: int, limit: int) -> list[tuple]: ...
+
+    @abstractmethod
+    async def count(self) -> int: ...
+
+    @abstractmethod
+    async def revoke_token(self, jti: str, expires_at: int) -> bool:
+        """
+        Adds a token id to the revocation list until `expires_at` (unix
+        seconds), False when it was already on it
+        """
+
+    @abstractmethod
+    async def is_token_revoked(self, jti: str) -> bool: ...
+
+    @abstractmethod
+    async def get_revoked_tokens(self, now: int) -> list[str]:
+        """
+        Ids still revoked after `now`, the expired ones are dropped
+        """
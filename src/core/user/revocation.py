@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import math
+import time
+
+from src.core.user.repositories import UserRepository
+from src.settings import get_settings
+from src.users.repositories import user_repository
+
+REVOCATION_FILTER_CAPACITY: int = get_settings().revocation_filter_capacity
+REVOCATION_FILTER_ERROR_RATE: float = get_settings().revocation_filter_error_rate
+REVOCATION_REBUILD_SECONDS: float = get_settings().revocation_rebuild_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Set membership with false positives but no false negatives
+
+    Sized for `capacity` keys at `error_rate`, more keys raise the false
+    positive rate. Keys cannot be removed, build a new filter instead. The
+    probes come from the two halves of the key's 64 bit hash (double hashing).
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.probes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, key: str) -> None:
+        first, second = self._hashes(key)
+        bits = self._bits
+        for i in range(self.probes):
+            position = (first + i * second) % self.size
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        first, second = self._hashes(key)
+        bits = self._bits
+        size = self.size
+        # Most keys are not members, most lookups stop at the first clear bit
+        for i in range(self.probes):
+            position = (first + i * second) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @staticmethod
+    def _hashes(key: str) -> tuple[int, int]:
+        # str hashes are salted per process and cached on the string, which
+        # suits a filter every worker builds for itself
+        value = hash(key) & 0xFFFFFFFFFFFFFFFF
+        return value & 0xFFFFFFFF, (value >> 32) | 1
+
+
+class TokenRevocationList:
+    """
+    Revoked token ids, with a per-worker BloomFilter in front of the store
+
+    The filter holds every id revoked by this worker plus all ids in the
+    store at the last rebuild, so the common case, a token that was not
+    revoked, is answered without a store lookup. Only filter matches are
+    looked up. The rebuild every `rebuild_seconds` drops expired ids and
+    adds the ones revoked by other workers: until then a token they revoked
+    is only refused where an exact store operation checks it, as the
+    single-use check of refresh token rotation does.
+    """
+
+    def __init__(
+        self,
+        repository: UserRepository,
+        capacity: int = REVOCATION_FILTER_CAPACITY,
+        error_rate: float = REVOCATION_FILTER_ERROR_RATE,
+        rebuild_seconds: float = REVOCATION_REBUILD_SECONDS,
+    ):
+        self.repository = repository
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_seconds = rebuild_seconds
+        self._filter = BloomFilter(capacity, error_rate)
+        # Ids revoked while a rebuild reads the store, added to the new filter
+        self._revoked_during_rebuild: list[str] | None = None
+        self._rebuilder: asyncio.Task | None = None
+
+        self.filter_negatives = 0
+        self.lookups = 0
+        self.false_positives = 0
+        self.revocations = 0
+        self.rebuilds = 0
+
+    async def is_revoked(self, jti: str) -> bool:
+        if jti not in self._filter:
+            self.filter_negatives += 1
+            return False
+        self.lookups += 1
+        revoked = await self.repository.is_token_revoked(jti)
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    async def revoke(self, jti: str, expires_at: int) -> bool:
+        """
+        False when `jti` was already revoked, by any worker
+        """
+        self._filter.add(jti)
+        if self._revoked_during_rebuild is not None:
+            self._revoked_during_rebuild.append(jti)
+        revoked = await self.repository.revoke_token(jti, expires_at)
+        if revoked:
+            self.revocations += 1
+        return revoked
+
+    async def rebuild(self) -> None:
+        self._revoked_during_rebuild = []
+        try:
+            jtis = await self.repository.get_revoked_tokens(int(time.time()))
+            rebuilt = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+            for jti in jtis:
+                rebuilt.add(jti)
+            for jti in self._revoked_during_rebuild:
+                rebuilt.add(jti)
+        finally:
+            self._revoked_during_rebuild = None
+        self._filter = rebuilt
+        self.rebuilds += 1
+
+    async def start(self) -> None:
+        """
+        Loads the filter before returning, then rebuilds it in the background
+        """
+        await self.rebuild()
+        if self._rebuilder is None or self._rebuilder.done():
+            self._rebuilder = asyncio.create_task(self._rebuild_forever())
+
+    async def stop(self) -> None:
+        if self._rebuilder is not None:
+            self._rebuilder.cancel()
+            await asyncio.gather(self._rebuilder, return_exceptions=True)
+            self._rebuilder = None
+
+    def metrics(self) -> dict:
+        return {
+            "filter_entries": self._filter.count,
+            "filter_bytes": (self._filter.size + 7) // 8,
+            "filter_negatives": self.filter_negatives,
+            "lookups": self.lookups,
+            "false_positives": self.false_positives,
+            "revocations": self.revocations,
+            "rebuilds": self.rebuilds,
+        }
+
+    async def _rebuild_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.rebuild_seconds)
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("Could not rebuild the token revocation filter")
+
+
+token_revocations = TokenRevocationList(user_repository)
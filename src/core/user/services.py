@@ -1,38 +1,59 @@
+import secrets
+import time
 from datetime import datetime, timedelta, timezone
-from dotenv import load_dotenv
-import os
 from typing import Optional
 
-import bcrypt
-from jose import jwt, JWTError, ExpiredSignatureError
 from pydantic import BaseModel, Field
 
+from src.core.metrics import FAST_BUCKETS, metrics_registry
+from src.core.permissions import mask_to_permissions, permissions_to_mask
 from src.core.user.exceptions import (
     TokenCreationError,
     TokenExpiredError,
     TokenIsNotValidError,
+    TokenRevokedError,
     TokenTypeIsNotValidError,
 )
-from src.users.managers import user_manager
+from src.core.user.hashing import DUMMY_PASSWORD_HASH, password_hasher
+from src.core.user.revocation import token_revocations
+from src.core.user.token_cache import token_cache
+from src.users.repositories import user_repository
 from src.core.user.entities import (
+    Principal,
     UserResponse,
     UserResponseWithHashedPWD,
     CreateUser,
     AdminUser,
     RegularUser,
 )
+from src.settings import get_settings
 
-load_dotenv()
+SECRET_KEY: str = get_settings().secret_key
+ALGORITHM: str = get_settings().algorithm
+ACCESS_TOKEN_EXPIRE_MINUTES: int = get_settings().access_token_expire_minutes
+REFRESH_TOKEN_EXPIRE_MINUTES: int = get_settings().refresh_token_expire_minutes
+STATELESS_PERMISSIONS: bool = get_settings().stateless_permissions
+STATELESS_ACCESS_TOKEN_EXPIRE_MINUTES: int = (
+    get_settings().stateless_access_token_expire_minutes
+)
+ACCESS_TOKEN_LIFETIME_MINUTES: int = (
+    min(ACCESS_TOKEN_EXPIRE_MINUTES, STATELESS_ACCESS_TOKEN_EXPIRE_MINUTES)
+    if STATELESS_PERMISSIONS
+    else ACCESS_TOKEN_EXPIRE_MINUTES
+)
 
-SECRET_KEY: str = os.environ["SECRET_KEY"]
-ALGORITHM: str = os.environ["ALGORITHM"]
-ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.environ["ACCESS_TOKEN_EXPIRE_MINUTES"])
-REFRESH_TOKEN_EXPIRE_MINUTES: int = int(os.environ["REFRESH_TOKEN_EXPIRE_MINUTES"])
+jwt_seconds = metrics_registry.histogram(
+    "jwt_duration_seconds",
+    "JWT encode/decode time",
+    ("operation",),
+    FAST_BUCKETS,
+)
 
 
 class TokenData(BaseModel):
     sub: str
     is_admin: Optional[bool] = False
+    jti: Optional[str] = None
     extra: Optional[dict] = Field(default_factory=dict)
 
 
@@ -42,7 +63,7 @@ class UserService:
     """
 
     @staticmethod
-    def add(user: CreateUser, permissions: Optional[list[str]]) -> UserResponse:
+    async def add(user: CreateUser, permissions: Optional[list[str]]) -> UserResponse:
         if user.is_admin:
             new_user = AdminUser(
                 username=user.username,
@@ -57,40 +78,51 @@ class UserService:
                 permissions=permissions,
             )
 
-        return user_manager.add(new_user)
+        return await user_repository.add(new_user)
 
     @staticmethod
-    def get_by_id(user_id: int) -> UserResponse:
-        user_output = user_manager.get_by_id(user_id)
+    async def get_by_id(user_id: int) -> UserResponse:
+        user_output = await user_repository.get_by_id(user_id)
         return user_output
 
     @staticmethod
-    def get_by_username(username: str) -> UserResponse | None:
-        user_output = user_manager.get_by_username(username)
+    async def get_by_username(username: str) -> UserResponse | None:
+        user_output = await user_repository.get_by_username(username)
         return user_output
 
     @staticmethod
-    def get_all() -> list[UserResponse]:
-        return user_manager.get_all()
+    async def get_many(user_ids: list[int]) -> list[tuple | None]:
+        return await user_repository.get_many(user_ids)
 
     @staticmethod
-    def verify_password(plain_password: str, hashed_password: str) -> bool:
-        return bcrypt.checkpw(
-            plain_password.encode("utf-8"), hashed_password.encode("utf-8")
-        )
+    async def get_all() -> list[UserResponse]:
+        return await user_repository.get_all()
+
+    @staticmethod
+    async def get_page(after_id: int, limit: int) -> list[tuple]:
+        return await user_repository.get_page(after_id, limit)
+
+    @staticmethod
+    async def count() -> int:
+        return await user_repository.count()
+
+    @staticmethod
+    async def verify_password(plain_password: str, hashed_password: str) -> bool:
+        return await password_hasher.verify(plain_password, hashed_password)
 
     @classmethod
-    def authenticate_user(
+    async def authenticate_user(
         cls, username: str, password: str
     ) -> UserResponseWithHashedPWD | None:
-        user_tuple = user_manager.get_by_username(username)
+        user_tuple = await user_repository.get_by_username(username)
 
         if not user_tuple:
+            await cls.verify_password(password, DUMMY_PASSWORD_HASH)
             return None
 
         user_id = user_tuple[0]
         user = user_tuple[1]
-        if not cls.verify_password(password, user.password):
+        if not await cls.verify_password(password, user.password):
             return None
         user_output = UserResponseWithHashedPWD(
             id=user_id,
@@ -103,7 +135,11 @@ class UserService:
         return user_output
 
     @staticmethod
+    @jwt_seconds.time("encode")
     def create_token(data: TokenData, expires_delta: timedelta) -> str:
+        # jose pulls in the cryptography backends, imported on first use
+        from jose import jwt
+
         try:
             expire = datetime.now(timezone.utc) + expires_delta
             payload = data.model_dump(exclude_unset=True)
@@ -115,12 +151,138 @@ class UserService:
             return encoded_jwt
 
     @classmethod
-    def get_current_user_from_jwt(cls, token: str) -> UserResponse | None:
+    async def get_current_user_from_jwt(cls, token: str) -> UserResponse | None:
         username = cls.verify_token(token, "access_token")
-        return cls.get_by_username(username)
+        return await cls.get_by_username(username)
+
+    @classmethod
+    async def get_principal_from_jwt(cls, token: str) -> Principal | None:
+        """
+        Resolve an access token to a Principal, served from token_cache
+        when the same token was already verified
+
+        In stateless mode the principal is built from the token's signed
+        claims alone, tokens issued without them still go to the store.
+        """
+        digest = token_cache.digest(token)
+        principal = token_cache.get(digest)
+        if principal is not None:
+            return principal
+
+        payload = cls.decode_token(token, "access_token")
+        extra = payload["extra"]
+        if STATELESS_PERMISSIONS and "permissions" in extra:
+            principal = Principal.model_construct(
+                id=extra["user_id"],
+                username=payload["sub"],
+                email=extra["email"],
+                is_admin=payload.get("is_admin", False),
+                permissions=mask_to_permissions(extra["permissions"]),
+                permission_mask=extra["permissions"],
+            )
+            token_cache.set(digest, principal, payload["exp"])
+            return principal
+
+        user_tuple = await cls.get_by_username(payload.get("sub"))
+        if not user_tuple:
+            return None
+
+        user_id = user_tuple[0]
+        user = user_tuple[1]
+        principal = Principal(
+            id=user_id,
+            username=user.username,
+            email=user.email,
+            is_admin=user.is_admin,
+            permissions=user.permissions,
+            permission_mask=permissions_to_mask(user.permissions),
+        )
+        token_cache.set(digest, principal, payload["exp"])
+        return principal
+
+    @staticmethod
+    def access_token_claims(user_id: int, user) -> dict:
+        """
+        Claims of an access token that let it be authorized statelessly
+        """
+        return {
+            "user_id": user_id,
+            "email": user.email,
+            "permissions": permissions_to_mask(user.permissions),
+        }
+
+    @staticmethod
+    def refresh_token_data(user_id: int, user, family: str | None = None) -> TokenData:
+        """
+        Claims of a new refresh token, each one gets its own id (jti)
+
+        `family` is the id shared by all the tokens rotated from one login,
+        a new one when None. They are revoked together.
+        """
+        return TokenData(
+            sub=user.username,
+            is_admin=user.is_admin,
+            jti=secrets.token_urlsafe(16),
+            extra={
+                "user_id": user_id,
+                "type": "refresh_token",
+                "family": family or secrets.token_urlsafe(16),
+                "refresh_token_expires": REFRESH_TOKEN_EXPIRE_MINUTES * 60,
+            },
+        )
+
+    @classmethod
+    async def rotate_refresh_token(cls, token: str) -> dict:
+        """
+        Consumes a refresh token and returns its payload
+
+        Every refresh token is accepted once. A used one presented again has
+        leaked, so its family is revoked: the tokens already rotated from it
+        stop working as well.
+        """
+        payload = cls.decode_token(token, "refresh_token")
+        jti, family = cls._refresh_token_ids(payload)
+        if await token_revocations.is_revoked(family):
+            raise TokenRevokedError()
+        if not await token_revocations.revoke(jti, payload["exp"]):
+            await cls._revoke_token_family(family)
+            raise TokenRevokedError()
+        return payload
+
+    @classmethod
+    async def revoke_refresh_token(cls, token: str) -> None:
+        """
+        Revokes the token and every token of its family
+        """
+        payload = cls.decode_token(token, "refresh_token")
+        _, family = cls._refresh_token_ids(payload)
+        await cls._revoke_token_family(family)
+
+    @staticmethod
+    def _refresh_token_ids(payload: dict) -> tuple[str, str]:
+        # Tokens issued before rotation have no id and cannot be revoked
+        jti = payload.get("jti")
+        family = payload["extra"].get("family")
+        if not jti or not family:
+            raise TokenIsNotValidError()
+        return jti, family
 
     @staticmethod
-    def verify_token(token: str, token_type: str) -> str:
+    async def _revoke_token_family(family: str) -> None:
+        # Rotation renews the expiry, a family outlives each of its tokens
+        expires_at = int(time.time()) + REFRESH_TOKEN_EXPIRE_MINUTES * 60
+        await token_revocations.revoke(family, expires_at)
+
+    @classmethod
+    def verify_token(cls, token: str, token_type: str) -> str:
+        payload = cls.decode_token(token, token_type)
+        return payload.get("sub")
+
+    @staticmethod
+    @jwt_seconds.time("decode")
+    def decode_token(token: str, token_type: str) -> dict:
+        from jose import ExpiredSignatureError, JWTError, jwt
+
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         except ExpiredSignatureError:
@@ -139,6 +301,4 @@ class UserService:
         ):
             raise TokenExpiredError()
 
-        username = payload.get("sub")
-
-        return username
+        return payload
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from src.settings import get_settings
+
+TOKEN_CACHE_MAX_SIZE: int = get_settings().token_cache_max_size
+TOKEN_CACHE_TTL_SECONDS: int = get_settings().token_cache_ttl_seconds
+
+
+class TokenCache:
+    """
+    Bounded LRU + TTL cache of verified access tokens
+
+    Keys are sha256 digests of the raw token, values are the resolved principal.
+    An entry never outlives the token's own `exp` claim. There is no
+    invalidation: users are never changed or removed once added, a cached
+    principal is served until its entry expires, `ttl_seconds` at most.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # digest -> (expires_at, principal)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, digest: bytes):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, principal = entry
+            if time.time() >= expires_at:
+                del self._entries[digest]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return principal
+
+    def set(self, digest: bytes, principal, token_exp: int) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = min(time.time() + self.ttl_seconds, token_exp)
+        with self._lock:
+            self._entries[digest] = (expires_at, principal)
+            self._entries.move_to_end(digest)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+token_cache = TokenCache(
+    max_size=TOKEN_CACHE_MAX_SIZE,
+    ttl_seconds=TOKEN_CACHE_TTL_SECONDS,
+)
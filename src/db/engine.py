@@ -0,0 +1,80 @@
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from src.db.tables import (
+    COLLECTION_VERSION_SHARDS,
+    collection_versions_table,
+    metadata,
+)
+from src.settings import get_settings
+
+DATABASE_URL: str = get_settings().database_url
+DATABASE_POOL_SIZE: int = get_settings().database_pool_size
+DATABASE_MAX_OVERFLOW: int = get_settings().database_max_overflow
+DATABASE_POOL_RECYCLE: int = get_settings().database_pool_recycle
+DATABASE_STATEMENT_CACHE_SIZE: int = get_settings().database_statement_cache_size
+
+VERSIONED_COLLECTIONS = ("products",)
+
+
+def create_engine(database_url: str = DATABASE_URL) -> AsyncEngine:
+    """
+    Async engine with a tuned pool
+
+    Compiled SQL is reused through SQLAlchemy's statement cache, and on
+    PostgreSQL (asyncpg) statements are also prepared server side and cached
+    per connection.
+    """
+    options = {
+        "query_cache_size": DATABASE_STATEMENT_CACHE_SIZE,
+    }
+    if database_url.startswith("sqlite"):
+        # aiosqlite runs each connection in its own thread, a small pool is enough
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(
+            pool_size=DATABASE_POOL_SIZE,
+            max_overflow=DATABASE_MAX_OVERFLOW,
+            pool_recycle=DATABASE_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+        if database_url.startswith("postgresql+asyncpg"):
+            options["connect_args"] = {
+                "prepared_statement_cache_size": DATABASE_STATEMENT_CACHE_SIZE,
+            }
+    return create_async_engine(database_url, **options)
+
+
+async def create_tables(engine: AsyncEngine) -> None:
+    async with engine.begin() as connection:
+        await connection.run_sync(metadata.create_all)
+        for name in VERSIONED_COLLECTIONS:
+            result = await connection.execute(
+                select(collection_versions_table.c.shard).where(
+                    collection_versions_table.c.name == name
+                )
+            )
+            missing_shards = set(range(COLLECTION_VERSION_SHARDS)) - set(
+                result.scalars()
+            )
+            if missing_shards:
+                await connection.execute(
+                    insert(collection_versions_table),
+                    [
+                        {"name": name, "shard": shard, "version": 0}
+                        for shard in sorted(missing_shards)
+                    ],
+                )
+
+
+_engine: AsyncEngine | None = None
+
+
+def get_engine() -> AsyncEngine:
+    """
+    Engine shared by all SQLAlchemy repositories of the process
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_engine()
+    return _engine
@@ -0,0 +1,505 @@
+import asyncio
+import fcntl
+import gc
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from itertools import accumulate
+
+from pydantic_core import from_json, to_json
+
+from src.core.metrics import metrics_registry
+from src.settings import get_settings
+
+JOURNAL_DIR: str = get_settings().journal_dir
+JOURNAL_SYNC: bool = get_settings().journal_sync
+JOURNAL_FLUSH_MS: int = get_settings().journal_flush_ms
+JOURNAL_SNAPSHOT_RECORDS: int = get_settings().journal_snapshot_records
+
+SNAPSHOT_MAGIC = b"PGSNAP01"
+SNAPSHOT_SUFFIX = ".snap"
+SEGMENT_SUFFIX = ".wal"
+LOCK_FILE = "lock"
+# Log record frame: payload length, crc32 of the payload
+FRAME_HEADER = struct.Struct("<II")
+CRC_CHUNK = 1 << 24
+
+logger = logging.getLogger(__name__)
+
+journal_fsync_seconds = metrics_registry.histogram(
+    "journal_fsync_duration_seconds",
+    "Write + fsync of one group of write-ahead log records",
+    ("journal",),
+)
+
+
+def encode_record(operations: list) -> bytes:
+    payload = to_json(operations)
+    return FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(data) -> tuple[list, int]:
+    """
+    Decodes the log records of one segment
+
+    Returns the records and the offset where the valid part ends, a torn or
+    corrupt record stops the scan.
+    """
+    records = []
+    offset = 0
+    end = len(data)
+    while offset + FRAME_HEADER.size <= end:
+        length, crc = FRAME_HEADER.unpack_from(data, offset)
+        start = offset + FRAME_HEADER.size
+        payload = data[start : start + length]
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            break
+        records.append(from_json(payload))
+        offset = start + length
+    return records, offset
+
+
+def write_snapshot(path: str, meta: dict, columns: dict) -> None:
+    """
+    Writes a columnar snapshot: numeric columns as raw arrays, text columns as
+    one UTF-8 blob plus an array of character offsets
+
+    columns: name -> array.array or list[str], all of the same length
+    """
+    sections = []
+    descriptions = []
+    position = 0
+    crc = 0
+    rows = 0
+    for name, values in columns.items():
+        rows = len(values)
+        if isinstance(values, array):
+            parts = [values.tobytes()]
+            description = {"name": name, "type": values.typecode}
+        else:
+            offsets = array("q", accumulate(map(len, values), initial=0))
+            parts = [offsets.tobytes(), "".join(values).encode("utf-8")]
+            description = {"name": name, "type": "str"}
+        description["sections"] = []
+        for part in parts:
+            description["sections"].append([position, len(part)])
+            crc = zlib.crc32(part, crc)
+            position += len(part)
+            sections.append(part)
+        descriptions.append(description)
+
+    header = json.dumps(
+        {
+            "meta": meta,
+            "rows": rows,
+            "byteorder": sys.byteorder,
+            "crc": crc,
+            "columns": descriptions,
+        }
+    ).encode("utf-8")
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(SNAPSHOT_MAGIC)
+        file.write(struct.pack("<I", len(header)))
+        file.write(header)
+        for part in sections:
+            file.write(part)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+    _fsync_directory(os.path.dirname(path))
+
+
+def read_snapshot(path: str) -> tuple[dict, dict]:
+    """
+    Memory-maps a snapshot written by write_snapshot, returns (meta, columns)
+
+    Raises ValueError when the file is not a complete snapshot.
+    """
+    with open(path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        if data[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a snapshot")
+        (header_size,) = struct.unpack_from("<I", data, len(SNAPSHOT_MAGIC))
+        body = len(SNAPSHOT_MAGIC) + 4 + header_size
+        header = json.loads(data[len(SNAPSHOT_MAGIC) + 4 : body])
+
+        crc = 0
+        for start in range(body, len(data), CRC_CHUNK):
+            crc = zlib.crc32(data[start : min(start + CRC_CHUNK, len(data))], crc)
+        if crc != header["crc"]:
+            raise ValueError(f"{path} is corrupt")
+
+        swap = header["byteorder"] != sys.byteorder
+        columns = {}
+        for column in header["columns"]:
+            sections = [
+                data[body + offset : body + offset + size]
+                for offset, size in column["sections"]
+            ]
+            if column["type"] != "str":
+                columns[column["name"]] = _to_array(column["type"], sections[0], swap)
+                continue
+            offsets = _to_array("q", sections[0], swap)
+            text = sections[1].decode("utf-8")
+            columns[column["name"]] = [
+                text[start:end] for start, end in zip(offsets, offsets[1:])
+            ]
+    return header["meta"], columns
+
+
+def _to_array(typecode: str, data: bytes, swap: bool) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if swap:
+        values.byteswap()
+    return values
+
+
+def _fsync_directory(path: str) -> None:
+    # Makes renames and new files durable, not supported everywhere
+    try:
+        descriptor = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def _numbered_files(directory: str, suffix: str) -> list[tuple[int, str]]:
+    files = []
+    for name in os.listdir(directory):
+        number, _, extension = name.partition(".")
+        if f".{extension}" == suffix and number.isdigit():
+            files.append((int(number), os.path.join(directory, name)))
+    return sorted(files)
+
+
+class Journal:
+    """
+    Durability for one in-memory store: a write-ahead log plus snapshots
+
+    The store (ProductManager, UserManager) calls append() with the
+    operations of every mutation, which only queues the encoded record. A
+    background task writes the queue with one write + fsync per group of
+    records (group commit), so the request path does not touch the disk. With
+    `sync` set, commit() waits until the records queued so far are fsynced.
+
+    Every `snapshot_records` records, and on close, the store state is
+    captured and written as a snapshot `<n>.snap`, and the log moves on to
+    segment `<n>.wal`. Once the snapshot is on disk the older snapshots and
+    segments are deleted. Recovery loads the newest snapshot and replays the
+    segments from <n> on, stopping at the first torn record.
+
+    A journal has a single writer: open() takes an exclusive lock on the
+    directory and fails when another process holds it, so journaling needs a
+    single worker (WEB_CONCURRENCY=1).
+
+    The store provides:
+        capture() -> (meta, state)      on the event loop, cheap copies only
+        encode_snapshot(state) -> columns    in a worker thread
+        restore(meta, columns)          into an empty store
+        replay(operations)              idempotent
+    """
+
+    def __init__(
+        self,
+        name: str,
+        directory: str,
+        store,
+        sync: bool = JOURNAL_SYNC,
+        flush_seconds: float = JOURNAL_FLUSH_MS / 1000,
+        snapshot_records: int = JOURNAL_SNAPSHOT_RECORDS,
+    ):
+        self.name = name
+        self.directory = directory
+        self.store = store
+        self.sync = sync
+        self.flush_seconds = flush_seconds
+        self.snapshot_records = snapshot_records
+
+        self.segment = 1  # segment new records go to
+        self.buffer = []  # encoded records, an int switches to that segment
+        self.waiters = []  # commit() futures resolved by the next flush
+        self.records_since_snapshot = 0
+        self._file = None  # only touched by the thread doing the flush
+        self._file_segment = 0
+        self._wake: asyncio.Event | None = None
+        self._flusher: asyncio.Task | None = None
+        self._snapshot_task: asyncio.Task | None = None
+        self._closing = False
+        self._lock_file = None
+
+        self.appended = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.snapshots = 0
+        self.snapshot_seconds = 0.0
+        self.replayed = 0
+        self.recovery_seconds = 0.0
+
+    async def open(self) -> None:
+        """
+        Recovers the store and starts writing, call before the first mutation
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock()
+        started = time.perf_counter()
+        self.segment = self.recover()
+        self.recovery_seconds = time.perf_counter() - started
+        self.records_since_snapshot = self.replayed
+        self.start()
+        logger.info(
+            "Recovered %s in %.2fs (%d log records replayed)",
+            self.name,
+            self.recovery_seconds,
+            self.replayed,
+        )
+
+    async def close(self) -> None:
+        """
+        Flushes the log and writes a final snapshot, so the next start does
+        not replay anything
+        """
+        if self._flusher is not None:
+            await self.stop()
+            await self.snapshot()
+        self._unlock()
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._open_segment(self.segment)
+        self._closing = False
+        self._wake = asyncio.Event()
+        self._flusher = asyncio.create_task(self._flush_forever())
+
+    async def stop(self) -> None:
+        """
+        Flushes the log and stops writing, without a snapshot
+        """
+        if self._flusher is None:
+            return
+        self._closing = True
+        self._wake.set()
+        await self._flusher
+        self._flusher = None
+        if self._snapshot_task is not None:
+            await self._snapshot_task
+        self._file.close()
+        self._file = None
+
+    def append(self, operations: list) -> None:
+        self.buffer.append(encode_record(operations))
+        self.appended += 1
+        self.records_since_snapshot += 1
+        if self._wake is not None:
+            self._wake.set()
+
+    async def commit(self) -> None:
+        """
+        Returns at once unless `sync` is set, then waits for the fsync of
+        everything appended so far
+        """
+        if not self.sync or self._flusher is None:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self._wake.set()
+        await waiter
+
+    async def snapshot(self) -> None:
+        state = self.store.capture()
+        # Records appended from now on are not in the snapshot
+        self.segment += 1
+        self.buffer.append(self.segment)
+        self.records_since_snapshot = 0
+        if self._wake is not None:
+            self._wake.set()
+
+        started = time.perf_counter()
+        await asyncio.to_thread(self._write_snapshot, self.segment, *state)
+        self.snapshot_seconds = time.perf_counter() - started
+        self.snapshots += 1
+
+    def recover(self) -> int:
+        """
+        Loads the newest snapshot and replays the log after it
+
+        Returns the number of the segment to continue with.
+        """
+        # Recovery only allocates, collections would rescan the growing heap
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._recover()
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _recover(self) -> int:
+        base = 1
+        snapshots = _numbered_files(self.directory, SNAPSHOT_SUFFIX)
+        if snapshots:
+            base, path = snapshots[-1]
+            # An unreadable snapshot is not skipped: the log before it is gone
+            self.store.restore(*read_snapshot(path))
+
+        segments = [
+            (number, path)
+            for number, path in _numbered_files(self.directory, SEGMENT_SUFFIX)
+            if number >= base
+        ]
+        for expected, (number, path) in enumerate(segments, start=base):
+            if number != expected:
+                raise RuntimeError(
+                    f"Journal {self.directory} misses segment {expected}"
+                )
+
+        next_segment = base
+        for position, (number, path) in enumerate(segments):
+            with open(path, "rb") as file:
+                data = file.read()
+            records, valid_size = read_records(data)
+            for operations in records:
+                self.store.replay(operations)
+            self.replayed += len(records)
+            next_segment = number + 1
+            if valid_size < len(data):
+                logger.warning(
+                    "Discarding %d bytes of torn log records in %s",
+                    len(data) - valid_size,
+                    path,
+                )
+                with open(path, "r+b") as file:
+                    file.truncate(valid_size)
+                for _, later_path in segments[position + 1 :]:
+                    os.replace(later_path, f"{later_path}.discarded")
+                break
+        return next_segment
+
+    def metrics(self) -> dict:
+        return {
+            "appended": self.appended,
+            "buffered": len(self.buffer),
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "segment": self.segment,
+            "snapshots": self.snapshots,
+            "snapshot_seconds": self.snapshot_seconds,
+            "replayed": self.replayed,
+            "recovery_seconds": self.recovery_seconds,
+        }
+
+    def _lock(self) -> None:
+        if self._lock_file is not None:
+            return
+        lock_file = open(os.path.join(self.directory, LOCK_FILE), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise RuntimeError(
+                f"Journal {self.directory} is used by another process, "
+                "journaling needs a single worker (WEB_CONCURRENCY=1)"
+            )
+        self._lock_file = lock_file
+
+    def _unlock(self) -> None:
+        if self._lock_file is not None:
+            # Closing the file releases the lock
+            self._lock_file.close()
+            self._lock_file = None
+
+    async def _flush_forever(self) -> None:
+        while not self._closing:
+            await self._wake.wait()
+            self._wake.clear()
+            if not self.waiters and not self._closing:
+                # Nobody waits for this group, let it grow a little
+                await asyncio.sleep(self.flush_seconds)
+            await self._flush()
+            if self.records_since_snapshot >= self.snapshot_records and (
+                self._snapshot_task is None or self._snapshot_task.done()
+            ):
+                self._snapshot_task = asyncio.create_task(self.snapshot())
+        await self._flush()
+
+    async def _flush(self) -> None:
+        buffer, self.buffer = self.buffer, []
+        waiters, self.waiters = self.waiters, []
+        if buffer:
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._write, buffer)
+            except OSError as e:
+                logger.exception("Could not write journal %s", self.name)
+                self.flush_errors += 1
+                # Retried with the next group, replay is idempotent
+                self.buffer[:0] = buffer
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+                return
+            journal_fsync_seconds.observe(time.perf_counter() - started, self.name)
+            self.flushes += 1
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _write(self, buffer: list) -> None:
+        records = []
+        for item in buffer:
+            if isinstance(item, int):
+                self._write_records(records)
+                records = []
+                if item != self._file_segment:
+                    self._open_segment(item)
+            else:
+                records.append(item)
+        self._write_records(records)
+
+    def _write_records(self, records: list) -> None:
+        if records:
+            self._file.write(b"".join(records))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _open_segment(self, number: int) -> None:
+        if self._file is not None:
+            self._file.close()
+        path = os.path.join(self.directory, f"{number:08d}{SEGMENT_SUFFIX}")
+        self._file = open(path, "ab")
+        self._file_segment = number
+        _fsync_directory(self.directory)
+
+    def _write_snapshot(self, number: int, meta: dict, state) -> None:
+        path = os.path.join(self.directory, f"{number:08d}{SNAPSHOT_SUFFIX}")
+        write_snapshot(path, meta, self.store.encode_snapshot(state))
+        # Everything before segment <number> is in the snapshot now
+        for older, older_path in _numbered_files(self.directory, SNAPSHOT_SUFFIX):
+            if older < number:
+                os.remove(older_path)
+        for older, older_path in _numbered_files(self.directory, SEGMENT_SUFFIX):
+            if older < number:
+                os.remove(older_path)
+
+
+def create_journal(name: str, store) -> Journal | None:
+    """
+    Journal of one in-memory store under JOURNAL_DIR, None when it is not set
+    """
+    if not JOURNAL_DIR:
+        return None
+    return Journal(name, os.path.join(JOURNAL_DIR, name), store)
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+from collections import OrderedDict
+
+from src.settings import get_settings
+
+REDIS_URL: str = get_settings().redis_url
+REDIS_KEY_PREFIX: str = get_settings().redis_key_prefix
+LOCAL_CACHE_MAX_SIZE: int = get_settings().local_cache_max_size
+
+logger = logging.getLogger(__name__)
+
+_redis = None
+
+
+def create_redis(redis_url: str = REDIS_URL):
+    """
+    `fakeredis://` gives an in-process stand-in for local runs and benchmarks
+    """
+    if redis_url.startswith("fakeredis://"):
+        try:
+            from fakeredis import FakeAsyncRedis
+        except ImportError:
+            raise RuntimeError("fakeredis is required for REDIS_URL=fakeredis://")
+        return FakeAsyncRedis()
+
+    from redis.asyncio import Redis
+
+    return Redis.from_url(redis_url)
+
+
+def get_redis():
+    """
+    Client shared by all Redis repositories of the process
+    """
+    global _redis
+    if _redis is None:
+        _redis = create_redis()
+    return _redis
+
+
+def redis_key(*parts) -> str:
+    return ":".join((REDIS_KEY_PREFIX, *map(str, parts)))
+
+
+class ReadThroughCache:
+    """
+    Per-worker LRU cache in front of the shared store
+
+    Every write publishes the changed key on `channel`, and each worker
+    listening on it evicts that key, so workers converge right after a write
+    without going to Redis on every read.
+
+    A value read from Redis is only cached if its key was not invalidated
+    while the read was in flight: readers take generation() before reading
+    and pass it to set(), which skips the value when an invalidation of the
+    key came after it. The invalidated keys are remembered up to `max_size`,
+    older ones count as invalidated for every read in flight.
+    """
+
+    def __init__(self, redis, channel: str, max_size: int = LOCAL_CACHE_MAX_SIZE):
+        self.redis = redis
+        self.channel = channel
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        # Bumped by every invalidation
+        self._generation = 0
+        # key -> generation of its last invalidation, oldest first
+        self._invalidated = OrderedDict()
+        # Latest generation dropped from _invalidated
+        self._forgotten = 0
+        self._listener: asyncio.Task | None = None
+        # Caching is only safe while we are subscribed to invalidations
+        self.active = False
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_reads = 0
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def generation(self) -> int:
+        return self._generation
+
+    def set(self, key, value, generation: int) -> None:
+        """
+        Caches `value`, read from Redis after generation() returned `generation`
+        """
+        if not self.active:
+            return
+        if self._invalidated.get(key, self._forgotten) > generation:
+            self.stale_reads += 1
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def evict(self, key) -> None:
+        self._generation += 1
+        self._invalidated[key] = self._generation
+        self._invalidated.move_to_end(key)
+        while len(self._invalidated) > self.max_size:
+            _, self._forgotten = self._invalidated.popitem(last=False)
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        # Invalidations may be missed around this, no read in flight is cached
+        self._generation += 1
+        self._invalidated.clear()
+        self._forgotten = self._generation
+        self._entries.clear()
+
+    async def publish(self, key) -> None:
+        self.evict(key)
+        await self.redis.publish(self.channel, str(key))
+
+    def start(self) -> None:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "stale_reads": self.stale_reads,
+        }
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self.clear()
+                self.active = True
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.evict(self._decode_key(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Lost invalidation channel %s", self.channel)
+                await asyncio.sleep(1)
+            finally:
+                self.active = False
+                self.clear()
+                await pubsub.aclose()
+
+    @staticmethod
+    def _decode_key(data):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        return int(data) if data.isdigit() else data
@@ -0,0 +1,67 @@
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+)
+
+metadata = MetaData()
+
+products_table = Table(
+    "products",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("name", String(100), nullable=False),
+    Column("quantity", Integer, nullable=False),
+    Column("price", Float, nullable=False),
+    Column("version", Integer, nullable=False, default=1),
+    Column("created_by", Integer, ForeignKey("users.id"), nullable=True),
+    Index("ix_products_name", "name", unique=True),
+    # Never reuse ids of deleted rows, same as the in-memory managers
+    sqlite_autoincrement=True,
+)
+
+users_table = Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("username", String(100), nullable=False),
+    # Case-normalised copies used for lookups and uniqueness
+    Column("username_key", String(100), nullable=False),
+    Column("email", String(320), nullable=False),
+    Column("email_key", String(320), nullable=False),
+    Column("password", String(100), nullable=False),
+    Column("is_admin", Boolean, nullable=False, default=False),
+    Column("permissions", JSON, nullable=False),
+    Index("ix_users_username_key", "username_key", unique=True),
+    Index("ix_users_email_key", "email_key", unique=True),
+    sqlite_autoincrement=True,
+)
+
+# Refresh token ids (jti) revoked until they expire, see TokenRevocationList
+revoked_tokens_table = Table(
+    "revoked_tokens",
+    metadata,
+    Column("jti", String(64), primary_key=True),
+    Column("expires_at", Integer, nullable=False),
+    Index("ix_revoked_tokens_expires_at", "expires_at"),
+)
+
+# Per-collection write counters, the version of a collection is the sum of its
+# COLLECTION_VERSION_SHARDS rows. A write bumps one shard chosen at random in
+# its own transaction, so concurrent writes rarely wait for the same row lock.
+COLLECTION_VERSION_SHARDS = 16
+
+collection_versions_table = Table(
+    "collection_versions",
+    metadata,
+    Column("name", String(50), primary_key=True),
+    Column("shard", Integer, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
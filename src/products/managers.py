@@ -1,65 +1,334 @@
-from collections import OrderedDict
+from contextlib import contextmanager
 
-from src.core.product.exceptions import ProductAlreadyExistsError, ProductNotFoundError
+from src.core.metrics import FAST_BUCKETS, metrics_registry
+from src.core.product.bulk import check_add_many, check_delete_many, check_update_many
+from src.core.product.exceptions import (
+    InsufficientStockError,
+    ProductAlreadyExistsError,
+    ProductBulkOperationError,
+    ProductNotFoundError,
+    ProductVersionConflictError,
+)
 from src.core.product.entities import ProductResponse
+from src.core.product.search import ProductSearchIndex, SearchCursor
+from src.core.product.stats import ProductStatsAggregator
+from src.products.stores import create_product_store
+
+manager_seconds = metrics_registry.histogram(
+    "manager_operation_duration_seconds",
+    "In-memory manager operation time",
+    ("manager", "operation"),
+    FAST_BUCKETS,
+)
 
 
 class ProductManager:
     """
     CRUD operations for Product model
-    """
 
-    def __init__(self):
-        self.products = OrderedDict()
-        self.last_product_id = 1
+    store: the products with the collection version of their last write, an
+        ObjectProductStore or a ColumnarProductStore (see PRODUCT_STORE)
+    product_ids_by_name: name -> id, hash index for uniqueness checks
+    last_product_id: monotonic id allocator, ids are never reused
+    version: collection version, bumped by every mutation
+    search_index: name index for search()
+    stats: inventory aggregates for get_stats(), updated on every write
+    journal: optional src.db.journal.Journal every mutation is logged to
+    """
 
-    def add(self, product):
-        if len(self.products) != 0:
-            self.last_product_id = list(self.products)[-1]
-            self.last_product_id += 1
+    def __init__(self, store=None):
+        self.store = store if store is not None else create_product_store()
+        self.product_ids_by_name = {}
+        self.last_product_id = 0
+        self.version = 0
+        self.search_index = ProductSearchIndex()
+        self.stats = ProductStatsAggregator()
+        self.journal = None
+        self._journal_batch = None
 
-            for p in self.products.values():
-                if p.name == product.name:
-                    raise ProductAlreadyExistsError()
+    @manager_seconds.time("product", "add")
+    def add(self, product, created_by=None):
+        if product.name in self.product_ids_by_name:
+            raise ProductAlreadyExistsError()
 
-        updated_pr = ProductResponse(
-            id=self.last_product_id,
+        product_id = self._next_product_id()
+        new_product = ProductResponse(
+            id=product_id,
             name=product.name,
             quantity=product.quantity,
             price=product.price,
+            created_by=created_by,
         )
 
-        self.products[self.last_product_id] = updated_pr
-        return updated_pr
+        self._save(new_product)
+        return new_product
 
+    @manager_seconds.time("product", "get_by_id")
     def get_by_id(self, product_id):
-        if not self._is_product_exist(product_id):
+        product = self.store.get(product_id)
+        if product is None:
             raise ProductNotFoundError()
-        return self.products.get(product_id)
+        return product
+
+    @manager_seconds.time("product", "get_many")
+    def get_many(self, product_ids):
+        return [self.store.get(product_id) for product_id in product_ids]
 
+    @manager_seconds.time("product", "get_all")
     def get_all(self):
-        return [product for product in self.products.values()]
+        return self.store.get_all()
+
+    @manager_seconds.time("product", "get_page")
+    def get_page(self, after_id: int, limit: int):
+        return self.store.get_page(after_id, limit)
+
+    @manager_seconds.time("product", "search")
+    def search(self, query: str, limit: int, after: SearchCursor | None = None):
+        matches = self.search_index.search(query, limit, after)
+        return [self.store.get(match.product_id) for match in matches]
+
+    @manager_seconds.time("product", "count")
+    def count(self):
+        return len(self.store)
 
+    @manager_seconds.time("product", "get_stats")
+    def get_stats(self):
+        return self.stats.stats()
+
+    @manager_seconds.time("product", "get_version")
+    def get_version(self, product_id):
+        version = self.store.get_version(product_id)
+        if version is None:
+            raise ProductNotFoundError()
+        return version
+
+    @manager_seconds.time("product", "update")
     def update(self, product, product_id):
-        if not self._is_product_exist(product_id):
+        old_product = self.store.get(product_id)
+        if old_product is None:
             raise ProductNotFoundError()
+
+        owner_id = self.product_ids_by_name.get(product.name)
+        if owner_id is not None and owner_id != product_id:
+            raise ProductAlreadyExistsError()
+
         new_product = ProductResponse(
             id=product_id,
             name=product.name,
             quantity=product.quantity,
             price=product.price,
+            created_by=old_product.created_by,
         )
-        self.products[product_id] = new_product
+
+        self._save(new_product)
         return new_product
 
+    @manager_seconds.time("product", "adjust_quantity")
+    def adjust_quantity(self, product_id, delta, expected_version=None):
+        """
+        Adds `delta` to the quantity in one step, returns (product, version)
+
+        Raises InsufficientStockError when the quantity would go below zero
+        and ProductVersionConflictError when `expected_version` is given and
+        the product has been written since.
+        """
+        old_product = self.store.get(product_id)
+        if old_product is None:
+            raise ProductNotFoundError()
+        if expected_version is not None:
+            if self.store.get_version(product_id) != expected_version:
+                raise ProductVersionConflictError()
+        quantity = old_product.quantity + delta
+        if quantity < 0:
+            raise InsufficientStockError()
+
+        new_product = old_product.model_copy(update={"quantity": quantity})
+        version = self._bump_version()
+        self._store(new_product, version)
+        self._log(["quantity", product_id, quantity, version])
+        return new_product, version
+
+    @manager_seconds.time("product", "delete")
     def delete(self, product_id):
         if not self._is_product_exist(product_id):
             raise ProductNotFoundError()
-        del self.products[product_id]
+        self._discard(product_id)
+        version = self._bump_version()
+        self._log(["delete", product_id, version])
         return None
 
+    @manager_seconds.time("product", "add_many")
+    def add_many(self, products, atomic=True, created_by=None):
+        if atomic:
+            self._raise_on_errors(
+                check_add_many(products, self.product_ids_by_name.get)
+            )
+        with self._logged_together():
+            return [self._apply(self.add, product, created_by) for product in products]
+
+    @manager_seconds.time("product", "update_many")
+    def update_many(self, products, atomic=True):
+        if atomic:
+            self._raise_on_errors(
+                check_update_many(
+                    products, self._get_product_name, self.product_ids_by_name.get
+                )
+            )
+        with self._logged_together():
+            return [
+                self._apply(self.update, product, product.id) for product in products
+            ]
+
+    @manager_seconds.time("product", "delete_many")
+    def delete_many(self, product_ids, atomic=True):
+        if atomic:
+            self._raise_on_errors(
+                check_delete_many(product_ids, self._is_product_exist)
+            )
+        with self._logged_together():
+            return [
+                self._apply(self._delete_returning_id, product_id)
+                for product_id in product_ids
+            ]
+
+    def capture(self):
+        """
+        Journal snapshot hook: copies that are a consistent view to encode
+        off the event loop
+        """
+        meta = {"last_product_id": self.last_product_id, "version": self.version}
+        return meta, (self.store.capture(), self.search_index.capture())
+
+    def encode_snapshot(self, state):
+        # Runs in a worker thread, only reads the captured state. Both stores
+        # write the same columns, a snapshot loads into either.
+        store_state, search_postings = state
+        return {
+            **self.store.encode(store_state),
+            **ProductSearchIndex.encode_postings(search_postings),
+        }
+
+    def restore(self, meta, columns):
+        self.store.load(columns)
+        ids = columns["id"]
+        self.product_ids_by_name = dict(zip(columns["name"], ids))
+        if "ngram" in columns:
+            self.search_index.restore(zip(ids, columns["name"]), columns)
+        else:
+            # Snapshot written before the search index existed
+            self.search_index.rebuild(zip(ids, columns["name"]))
+        self.stats.rebuild(columns["quantity"], columns["price"])
+        self.last_product_id = meta["last_product_id"]
+        self.version = meta["version"]
+
+    def replay(self, operations):
+        for operation in operations:
+            if operation[0] == "put":
+                _, product_id, name, quantity, price, created_by, version = operation
+                product = ProductResponse(
+                    id=product_id,
+                    name=name,
+                    quantity=quantity,
+                    price=price,
+                    created_by=created_by,
+                )
+                self._store(product, version)
+                self.last_product_id = max(self.last_product_id, product_id)
+            elif operation[0] == "quantity":
+                _, product_id, quantity, version = operation
+                product = self.store.get(product_id)
+                if product is not None:
+                    self._store(
+                        product.model_copy(update={"quantity": quantity}), version
+                    )
+            else:
+                _, product_id, version = operation
+                if self._is_product_exist(product_id):
+                    self._discard(product_id)
+            self.version = version
+
+    def _save(self, product):
+        version = self._bump_version()
+        self._store(product, version)
+        self._log(
+            [
+                "put",
+                product.id,
+                product.name,
+                product.quantity,
+                product.price,
+                product.created_by,
+                version,
+            ]
+        )
+
+    def _store(self, product, version):
+        old_product = self.store.put(product, version)
+        if old_product is None:
+            self.search_index.add(product.id, product.name)
+        else:
+            self.stats.remove(old_product.quantity, old_product.price)
+            if old_product.name != product.name:
+                del self.product_ids_by_name[old_product.name]
+                self.search_index.remove(product.id)
+                self.search_index.add(product.id, product.name)
+        self.stats.add(product.quantity, product.price)
+        self.product_ids_by_name[product.name] = product.id
+
+    def _discard(self, product_id):
+        old_product = self.store.pop(product_id)
+        del self.product_ids_by_name[old_product.name]
+        self.search_index.remove(product_id)
+        self.stats.remove(old_product.quantity, old_product.price)
+
+    def _log(self, operation):
+        if self._journal_batch is not None:
+            self._journal_batch.append(operation)
+        elif self.journal is not None:
+            self.journal.append([operation])
+
+    @contextmanager
+    def _logged_together(self):
+        # A bulk operation is one log record, so it is replayed entirely or not at all
+        self._journal_batch = []
+        try:
+            yield
+        finally:
+            operations, self._journal_batch = self._journal_batch, None
+            if operations and self.journal is not None:
+                self.journal.append(operations)
+
+    @staticmethod
+    def _apply(operation, *args):
+        # Per-item mode: a failed item is reported in place of its result
+        try:
+            return operation(*args)
+        except (ProductAlreadyExistsError, ProductNotFoundError) as e:
+            return e
+
+    @staticmethod
+    def _raise_on_errors(errors):
+        if errors:
+            raise ProductBulkOperationError(errors)
+
+    def _delete_returning_id(self, product_id):
+        self.delete(product_id)
+        return product_id
+
+    def _get_product_name(self, product_id):
+        product = self.store.get(product_id)
+        return product.name if product is not None else None
+
+    def _bump_version(self):
+        self.version += 1
+        return self.version
+
+    def _next_product_id(self):
+        self.last_product_id += 1
+        return self.last_product_id
+
     def _is_product_exist(self, product_id):
-        return product_id in self.products.keys()
+        return product_id in self.store
 
 
 product_manager = ProductManager()
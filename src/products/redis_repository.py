@@ -0,0 +1,488 @@
+import asyncio
+import random
+from contextlib import asynccontextmanager
+
+from redis.exceptions import WatchError
+
+from src.core.product.bulk import check_add_many, check_delete_many, check_update_many
+from src.core.product.entities import (
+    ProductBulkUpdate,
+    ProductCreate,
+    ProductResponse,
+    ProductStats,
+    ProductUpdate,
+)
+from src.core.product.exceptions import (
+    InsufficientStockError,
+    ProductAlreadyExistsError,
+    ProductBulkOperationError,
+    ProductNotFoundError,
+    ProductVersionConflictError,
+    ProductWriteContentionError,
+)
+from src.core.product.repositories import ProductRepository
+from src.core.product.search import NGRAM_SIZE, SearchCursor, rank_matches
+from src.core.product.stats import ProductStatsAggregator
+from src.db.redis import ReadThroughCache, redis_key
+from src.settings import get_settings
+
+REDIS_STOCK_RETRIES: int = get_settings().redis_stock_retries
+
+
+class RedisProductRepository(ProductRepository):
+    """
+    ProductRepository shared by all gunicorn workers through Redis
+
+    Writes of existing products are optimistic transactions: they WATCH the
+    product's version key, and product_names when they claim a name, so a
+    transaction that lost a race to another worker's write is rerun, up to
+    REDIS_STOCK_RETRIES times before ProductWriteContentionError. Atomic bulk
+    operations validate and apply the whole batch in one such transaction.
+
+    products: hash id -> product json
+    product_names: hash name -> id, uniqueness is claimed with HSETNX
+    product_ids: sorted set of ids for keyset pagination
+    products_version: collection version, INCR on every write
+    product_version:<id>: per-product write counter, its own key so that a
+        stock adjustment WATCHes the one product only
+    Reads go through a per-worker ReadThroughCache invalidated over pub/sub,
+    it holds (product, version) pairs read in one transaction.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.products_key = redis_key("products")
+        self.names_key = redis_key("product_names")
+        self.ids_key = redis_key("product_ids")
+        self.id_sequence_key = redis_key("product_id_seq")
+        self.version_key = redis_key("products_version")
+        self.cache = ReadThroughCache(redis, redis_key("product_invalidations"))
+        # product id -> [lock, holders and waiters] of the writes
+        self._write_locks = {}
+
+    async def add(
+        self, product: ProductCreate, created_by: int | None = None
+    ) -> ProductResponse:
+        if await self.redis.hexists(self.names_key, product.name):
+            raise ProductAlreadyExistsError()
+        product_id = await self.redis.incr(self.id_sequence_key)
+        if not await self.redis.hsetnx(self.names_key, product.name, product_id):
+            raise ProductAlreadyExistsError()
+
+        new_product = ProductResponse(
+            id=product_id,
+            name=product.name,
+            quantity=product.quantity,
+            price=product.price,
+            created_by=created_by,
+        )
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.products_key, product_id, new_product.model_dump_json())
+            pipe.zadd(self.ids_key, {product_id: product_id})
+            pipe.incr(self._version_key(product_id))
+            pipe.incr(self.version_key)
+            await pipe.execute()
+        return new_product
+
+    async def get_by_id(self, product_id: int) -> ProductResponse:
+        product, _ = await self.get_with_version(product_id)
+        return product
+
+    async def get_with_version(self, product_id: int) -> tuple[ProductResponse, int]:
+        entry = self.cache.get(product_id)
+        if entry is not None:
+            return entry
+
+        generation = self.cache.generation()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hget(self.products_key, product_id)
+            pipe.get(self._version_key(product_id))
+            raw, version = await pipe.execute()
+        if raw is None:
+            raise ProductNotFoundError()
+        entry = ProductResponse.model_validate_json(raw), int(version)
+        self.cache.set(product_id, entry, generation)
+        return entry
+
+    async def get_many(self, product_ids: list[int]) -> list[ProductResponse | None]:
+        products = {}
+        missing_ids = []
+        for product_id in set(product_ids):
+            entry = self.cache.get(product_id)
+            if entry is None:
+                missing_ids.append(product_id)
+            else:
+                products[product_id] = entry[0]
+        if missing_ids:
+            generation = self.cache.generation()
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hmget(self.products_key, missing_ids)
+                pipe.mget(list(map(self._version_key, missing_ids)))
+                raw_products, versions = await pipe.execute()
+            for product_id, raw, version in zip(missing_ids, raw_products, versions):
+                if raw is None:
+                    continue
+                product = ProductResponse.model_validate_json(raw)
+                self.cache.set(product_id, (product, int(version)), generation)
+                products[product_id] = product
+        return [products.get(product_id) for product_id in product_ids]
+
+    async def update(self, product: ProductUpdate, product_id: int) -> ProductResponse:
+        async def write(pipe) -> ProductResponse:
+            old_product = await self._load(product_id, pipe)
+            renamed = old_product.name != product.name
+            if renamed:
+                await pipe.watch(self.names_key)
+                owner_id = await pipe.hget(self.names_key, product.name)
+                if owner_id is not None and int(owner_id) != product_id:
+                    raise ProductAlreadyExistsError()
+
+            new_product = ProductResponse(
+                id=product_id,
+                name=product.name,
+                quantity=product.quantity,
+                price=product.price,
+                created_by=old_product.created_by,
+            )
+            pipe.multi()
+            pipe.hset(self.products_key, product_id, new_product.model_dump_json())
+            if renamed:
+                pipe.hset(self.names_key, product.name, product_id)
+                pipe.hdel(self.names_key, old_product.name)
+            pipe.incr(self._version_key(product_id))
+            pipe.incr(self.version_key)
+            return new_product
+
+        async with self._write_lock(product_id):
+            new_product, _ = await self._transaction(
+                [self._version_key(product_id)], write
+            )
+        await self.cache.publish(product_id)
+        return new_product
+
+    async def adjust_quantity(
+        self, product_id: int, delta: int, expected_version: int | None = None
+    ) -> tuple[ProductResponse, int]:
+        version_key = self._version_key(product_id)
+
+        async def write(pipe) -> ProductResponse:
+            old_product = await self._load(product_id, pipe)
+            if expected_version is not None:
+                version = await pipe.get(version_key)
+                if version is None:
+                    raise ProductNotFoundError()
+                if int(version) != expected_version:
+                    raise ProductVersionConflictError()
+            quantity = old_product.quantity + delta
+            if quantity < 0:
+                raise InsufficientStockError()
+
+            new_product = old_product.model_copy(update={"quantity": quantity})
+            pipe.multi()
+            pipe.hset(self.products_key, product_id, new_product.model_dump_json())
+            pipe.incr(version_key)
+            pipe.incr(self.version_key)
+            return new_product
+
+        async with self._write_lock(product_id):
+            new_product, (_, version, _) = await self._transaction([version_key], write)
+        await self.cache.publish(product_id)
+        return new_product, version
+
+    async def delete(self, product_id: int) -> None:
+        async def write(pipe) -> None:
+            old_product = await self._load(product_id, pipe)
+            pipe.multi()
+            pipe.hdel(self.products_key, product_id)
+            pipe.hdel(self.names_key, old_product.name)
+            pipe.zrem(self.ids_key, product_id)
+            pipe.delete(self._version_key(product_id))
+            pipe.incr(self.version_key)
+
+        async with self._write_lock(product_id):
+            await self._transaction([self._version_key(product_id)], write)
+        await self.cache.publish(product_id)
+
+    async def add_many(
+        self,
+        products: list[ProductCreate],
+        atomic: bool,
+        created_by: int | None = None,
+    ) -> list[ProductResponse | Exception]:
+        if atomic:
+            return await self._add_all(products, created_by)
+        return [
+            await self._apply(self.add, product, created_by) for product in products
+        ]
+
+    async def update_many(
+        self, products: list[ProductBulkUpdate], atomic: bool
+    ) -> list[ProductResponse | Exception]:
+        if atomic:
+            return await self._update_all(products)
+        return [
+            await self._apply(self.update, product, product.id) for product in products
+        ]
+
+    async def delete_many(
+        self, product_ids: list[int], atomic: bool
+    ) -> list[int | Exception]:
+        if atomic:
+            return await self._delete_all(product_ids)
+        return [
+            await self._apply(self._delete_returning_id, product_id)
+            for product_id in product_ids
+        ]
+
+    async def get_all(self) -> list[ProductResponse]:
+        raw_products = await self.redis.hvals(self.products_key)
+        products = [ProductResponse.model_validate_json(raw) for raw in raw_products]
+        products.sort(key=lambda product: product.id)
+        return products
+
+    async def get_page(self, after_id: int, limit: int) -> list[ProductResponse]:
+        page_ids = await self.redis.zrangebyscore(
+            self.ids_key, f"({after_id}", "+inf", start=0, num=limit
+        )
+        if not page_ids:
+            return []
+        raw_products = await self.redis.hmget(self.products_key, page_ids)
+        return [
+            ProductResponse.model_validate_json(raw)
+            for raw in raw_products
+            if raw is not None
+        ]
+
+    async def search(
+        self, query: str, limit: int, after: SearchCursor | None = None
+    ) -> list[ProductResponse]:
+        # Redis filters the name hash server side, the ranking is done here
+        candidates = [
+            (name.decode("utf-8"), int(product_id))
+            async for name, product_id in self.redis.hscan_iter(
+                self.names_key, match=_case_insensitive_pattern(query), count=1000
+            )
+        ]
+        matches = rank_matches(query, candidates, after, limit)
+        products = await self.get_many([match.product_id for match in matches])
+        return [product for product in products if product is not None]
+
+    async def count(self) -> int:
+        return await self.redis.zcard(self.ids_key)
+
+    async def get_stats(self) -> ProductStats:
+        # Computed from the stored products, the read-modify-write of shared
+        # counters would need every write to WATCH the products hash
+        stats = ProductStatsAggregator()
+        for raw in await self.redis.hvals(self.products_key):
+            product = ProductResponse.model_validate_json(raw)
+            stats.add(product.quantity, product.price)
+        return stats.stats()
+
+    async def get_collection_version(self) -> int:
+        version = await self.redis.get(self.version_key)
+        return int(version) if version is not None else 0
+
+    async def get_product_version(self, product_id: int) -> int:
+        version = await self.redis.get(self._version_key(product_id))
+        if version is None:
+            raise ProductNotFoundError()
+        return int(version)
+
+    async def _add_all(
+        self, products: list[ProductCreate], created_by: int | None
+    ) -> list[ProductResponse]:
+        async def write(pipe) -> list[ProductResponse]:
+            name_owners = await self._fetch_name_owners(
+                [product.name for product in products], pipe
+            )
+            self._raise_on_errors(check_add_many(products, name_owners.get))
+            # Ids taken by a transaction that is rerun are skipped
+            last_id = await pipe.incrby(self.id_sequence_key, len(products))
+            new_products = [
+                ProductResponse(
+                    id=product_id,
+                    name=product.name,
+                    quantity=product.quantity,
+                    price=product.price,
+                    created_by=created_by,
+                )
+                for product_id, product in enumerate(
+                    products, last_id - len(products) + 1
+                )
+            ]
+            pipe.multi()
+            for new_product in new_products:
+                pipe.hset(self.names_key, new_product.name, new_product.id)
+                pipe.hset(
+                    self.products_key, new_product.id, new_product.model_dump_json()
+                )
+                pipe.zadd(self.ids_key, {new_product.id: new_product.id})
+                pipe.incr(self._version_key(new_product.id))
+            pipe.incr(self.version_key)
+            return new_products
+
+        new_products, _ = await self._transaction([self.names_key], write)
+        return new_products
+
+    async def _update_all(
+        self, products: list[ProductBulkUpdate]
+    ) -> list[ProductResponse]:
+        product_ids = list({product.id for product in products})
+
+        async def write(pipe) -> list[ProductResponse]:
+            stored = await self._fetch_products(product_ids, pipe)
+            names = {product_id: product.name for product_id, product in stored.items()}
+            name_owners = await self._fetch_name_owners(
+                [product.name for product in products], pipe
+            )
+            self._raise_on_errors(
+                check_update_many(products, names.get, name_owners.get)
+            )
+            pipe.multi()
+            new_products = []
+            for product in products:
+                old_product = stored[product.id]
+                new_product = ProductResponse(
+                    id=product.id,
+                    name=product.name,
+                    quantity=product.quantity,
+                    price=product.price,
+                    created_by=old_product.created_by,
+                )
+                pipe.hset(self.products_key, product.id, new_product.model_dump_json())
+                if old_product.name != new_product.name:
+                    pipe.hdel(self.names_key, old_product.name)
+                    pipe.hset(self.names_key, new_product.name, product.id)
+                pipe.incr(self._version_key(product.id))
+                stored[product.id] = new_product
+                new_products.append(new_product)
+            pipe.incr(self.version_key)
+            return new_products
+
+        new_products, _ = await self._transaction(
+            [*map(self._version_key, product_ids), self.names_key], write
+        )
+        for product_id in product_ids:
+            await self.cache.publish(product_id)
+        return new_products
+
+    async def _delete_all(self, product_ids: list[int]) -> list[int]:
+        unique_ids = list(set(product_ids))
+
+        async def write(pipe) -> None:
+            stored = await self._fetch_products(unique_ids, pipe)
+            self._raise_on_errors(check_delete_many(product_ids, stored.__contains__))
+            pipe.multi()
+            for product_id, old_product in stored.items():
+                pipe.hdel(self.products_key, product_id)
+                pipe.hdel(self.names_key, old_product.name)
+                pipe.zrem(self.ids_key, product_id)
+                pipe.delete(self._version_key(product_id))
+            pipe.incr(self.version_key)
+
+        await self._transaction(list(map(self._version_key, unique_ids)), write)
+        for product_id in unique_ids:
+            await self.cache.publish(product_id)
+        return product_ids
+
+    async def _transaction(self, watched_keys: list[str], write):
+        """
+        Runs `write(pipe)` as a transaction on `watched_keys`, returns its
+        result and the replies of the transaction
+
+        `write` reads through `pipe` (it may WATCH more keys first), then
+        queues the writes after pipe.multi(). It is rerun when a watched key
+        changed before the transaction ran, up to REDIS_STOCK_RETRIES times.
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for attempt in range(REDIS_STOCK_RETRIES + 1):
+                try:
+                    await pipe.watch(*watched_keys)
+                    result = await write(pipe)
+                    return result, await pipe.execute()
+                except WatchError:
+                    # Jittered, so that competing workers stop colliding
+                    await asyncio.sleep(random.random() * attempt / 1000)
+        raise ProductWriteContentionError()
+
+    @asynccontextmanager
+    async def _write_lock(self, product_id: int):
+        # Writes of one product queue up within the worker, so only other
+        # workers' writes of the same product cause retries
+        entry = self._write_locks.setdefault(product_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._write_locks[product_id]
+
+    def _version_key(self, product_id: int) -> str:
+        return redis_key("product_version", product_id)
+
+    async def _delete_returning_id(self, product_id: int) -> int:
+        await self.delete(product_id)
+        return product_id
+
+    async def _fetch_name_owners(self, names: list[str], client) -> dict[str, int]:
+        unique_names = list(set(names))
+        if not unique_names:
+            return {}
+        owners = await client.hmget(self.names_key, unique_names)
+        return {
+            name: int(owner)
+            for name, owner in zip(unique_names, owners)
+            if owner is not None
+        }
+
+    async def _fetch_products(
+        self, product_ids: list[int], client
+    ) -> dict[int, ProductResponse]:
+        if not product_ids:
+            return {}
+        raw_products = await client.hmget(self.products_key, product_ids)
+        return {
+            product_id: ProductResponse.model_validate_json(raw)
+            for product_id, raw in zip(product_ids, raw_products)
+            if raw is not None
+        }
+
+    @staticmethod
+    async def _apply(operation, *args):
+        try:
+            return await operation(*args)
+        except (ProductAlreadyExistsError, ProductNotFoundError) as e:
+            return e
+
+    @staticmethod
+    def _raise_on_errors(errors: dict[int, Exception]) -> None:
+        if errors:
+            raise ProductBulkOperationError(errors)
+
+    async def _load(self, product_id: int, client=None) -> ProductResponse:
+        # Writes always read the shared copy, never the local cache
+        raw = await (client or self.redis).hget(self.products_key, product_id)
+        if raw is None:
+            raise ProductNotFoundError()
+        return ProductResponse.model_validate_json(raw)
+
+
+def _case_insensitive_pattern(query: str) -> str:
+    """
+    Redis glob matching names that contain `query` in any letter case, or
+    only start with it when it is too short for substring matches
+    """
+    parts = []
+    for char in query:
+        lower, upper = char.lower(), char.upper()
+        if lower != upper and len(lower) == len(upper) == 1:
+            parts.append(f"[{lower}{upper}]")
+        elif char in "*?[]\\^":
+            parts.append(f"\\{char}")
+        else:
+            parts.append(char)
+    pattern = "".join(parts) + "*"
+    return f"*{pattern}" if len(query) >= NGRAM_SIZE else pattern
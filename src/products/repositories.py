@@ -0,0 +1,136 @@
+from src.core.product.entities import (
+    ProductBulkUpdate,
+    ProductCreate,
+    ProductResponse,
+    ProductStats,
+    ProductUpdate,
+)
+from src.core.product.repositories import ProductRepository
+from src.core.product.search import SearchCursor
+from src.db.journal import Journal, create_journal
+from src.products.managers import ProductManager, product_manager
+from src.settings import get_settings
+
+
+class InMemoryProductRepository(ProductRepository):
+    """
+    ProductRepository backed by the process-local ProductManager, persisted
+    by `journal` when one is given
+    """
+
+    def __init__(self, manager: ProductManager, journal: Journal | None = None):
+        self.manager = manager
+        self.journal = journal
+        self.stable_objects = manager.store.stable_objects
+        manager.journal = journal
+
+    async def add(
+        self, product: ProductCreate, created_by: int | None = None
+    ) -> ProductResponse:
+        new_product = self.manager.add(product, created_by)
+        await self._commit()
+        return new_product
+
+    async def get_by_id(self, product_id: int) -> ProductResponse:
+        return self.manager.get_by_id(product_id)
+
+    async def get_with_version(self, product_id: int) -> tuple[ProductResponse, int]:
+        return self.manager.get_by_id(product_id), self.manager.get_version(product_id)
+
+    async def get_many(self, product_ids: list[int]) -> list[ProductResponse | None]:
+        return self.manager.get_many(product_ids)
+
+    async def update(self, product: ProductUpdate, product_id: int) -> ProductResponse:
+        new_product = self.manager.update(product, product_id)
+        await self._commit()
+        return new_product
+
+    async def adjust_quantity(
+        self, product_id: int, delta: int, expected_version: int | None = None
+    ) -> tuple[ProductResponse, int]:
+        result = self.manager.adjust_quantity(product_id, delta, expected_version)
+        await self._commit()
+        return result
+
+    async def delete(self, product_id: int) -> None:
+        self.manager.delete(product_id)
+        await self._commit()
+
+    async def add_many(
+        self,
+        products: list[ProductCreate],
+        atomic: bool,
+        created_by: int | None = None,
+    ) -> list[ProductResponse | Exception]:
+        results = self.manager.add_many(products, atomic, created_by)
+        await self._commit()
+        return results
+
+    async def update_many(
+        self, products: list[ProductBulkUpdate], atomic: bool
+    ) -> list[ProductResponse | Exception]:
+        results = self.manager.update_many(products, atomic)
+        await self._commit()
+        return results
+
+    async def delete_many(
+        self, product_ids: list[int], atomic: bool
+    ) -> list[int | Exception]:
+        results = self.manager.delete_many(product_ids, atomic)
+        await self._commit()
+        return results
+
+    async def get_all(self) -> list[ProductResponse]:
+        return self.manager.get_all()
+
+    async def get_page(self, after_id: int, limit: int) -> list[ProductResponse]:
+        return self.manager.get_page(after_id, limit)
+
+    async def search(
+        self, query: str, limit: int, after: SearchCursor | None = None
+    ) -> list[ProductResponse]:
+        return self.manager.search(query, limit, after)
+
+    async def count(self) -> int:
+        return self.manager.count()
+
+    async def get_stats(self) -> ProductStats:
+        return self.manager.get_stats()
+
+    async def get_collection_version(self) -> int:
+        return self.manager.version
+
+    async def get_product_version(self, product_id: int) -> int:
+        return self.manager.get_version(product_id)
+
+    async def _commit(self) -> None:
+        # Only waits for the disk with JOURNAL_SYNC
+        if self.journal is not None:
+            await self.journal.commit()
+
+
+def create_product_repository(
+    backend: str = get_settings().storage_backend,
+) -> ProductRepository:
+    """
+    The shared backends are imported only when selected, so a worker doesn't
+    load SQLAlchemy or redis-py it never uses
+    """
+    if backend == "memory":
+        return InMemoryProductRepository(
+            product_manager, create_journal("products", product_manager)
+        )
+    if backend == "sqlalchemy":
+        from src.db.engine import get_engine
+        from src.products.sqlalchemy_repository import SQLAlchemyProductRepository
+
+        return SQLAlchemyProductRepository(get_engine())
+    if backend == "redis":
+        from src.db.redis import get_redis
+        from src.products.redis_repository import RedisProductRepository
+
+        return RedisProductRepository(get_redis())
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+product_repository = create_product_repository()
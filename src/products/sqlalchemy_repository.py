@@ -0,0 +1,477 @@
+import random
+
+from sqlalchemy import (
+    and_,
+    bindparam,
+    case,
+    delete,
+    func,
+    insert,
+    not_,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from src.core.product.bulk import check_add_many, check_delete_many, check_update_many
+from src.core.product.entities import (
+    ProductBulkUpdate,
+    ProductCreate,
+    ProductResponse,
+    ProductStats,
+    ProductUpdate,
+)
+from src.core.product.exceptions import (
+    InsufficientStockError,
+    ProductAlreadyExistsError,
+    ProductBulkOperationError,
+    ProductNotFoundError,
+    ProductVersionConflictError,
+)
+from src.core.product.repositories import ProductRepository
+from src.core.product.search import NGRAM_SIZE, PREFIX_TIER, SearchCursor
+from src.db.tables import (
+    COLLECTION_VERSION_SHARDS,
+    collection_versions_table,
+    products_table,
+)
+
+_products = products_table.c
+_columns = (
+    _products.id,
+    _products.name,
+    _products.quantity,
+    _products.price,
+    _products.created_by,
+)
+
+# Statements are built once and executed with bound parameters, so they are
+# compiled once (and prepared once per connection on asyncpg)
+_insert_product = insert(products_table).returning(_products.id)
+_select_product = select(*_columns).where(_products.id == bindparam("product_id"))
+_select_product_with_version = select(*_columns, _products.version).where(
+    _products.id == bindparam("product_id")
+)
+_select_all_products = select(*_columns).order_by(_products.id)
+_select_product_page = (
+    select(*_columns)
+    .where(_products.id > bindparam("after_id"))
+    .order_by(_products.id)
+    .limit(bindparam("limit"))
+)
+_count_products = select(func.count()).select_from(products_table)
+_select_stats = select(
+    func.count(),
+    func.coalesce(func.sum(_products.quantity), 0),
+    func.coalesce(func.sum(_products.price * _products.quantity), 0.0),
+    func.coalesce(func.sum(case((_products.quantity == 0, 1), else_=0)), 0),
+    func.min(_products.price),
+    func.max(_products.price),
+)
+# Search scans the table, the indexed search is the memory backend's
+_name_key = func.lower(_products.name)
+_select_prefix_matches = (
+    select(*_columns)
+    .where(
+        _name_key.like(bindparam("prefix"), escape="\\"),
+        or_(
+            _name_key > bindparam("after_key"),
+            and_(
+                _name_key == bindparam("after_key"),
+                _products.id > bindparam("after_id"),
+            ),
+        ),
+    )
+    .order_by(_name_key, _products.id)
+    .limit(bindparam("limit"))
+)
+_select_substring_matches = (
+    select(*_columns)
+    .where(
+        _name_key.like(bindparam("pattern"), escape="\\"),
+        not_(_name_key.like(bindparam("prefix"), escape="\\")),
+        _products.id > bindparam("after_id"),
+    )
+    .order_by(_products.id)
+    .limit(bindparam("limit"))
+)
+_update_product = (
+    update(products_table)
+    .where(_products.id == bindparam("product_id"))
+    .values(
+        name=bindparam("name"),
+        quantity=bindparam("quantity"),
+        price=bindparam("price"),
+        version=_products.version + 1,
+    )
+    .returning(_products.created_by)
+)
+# A single conditional UPDATE, the database serialises concurrent adjustments
+_adjust_quantity = (
+    update(products_table)
+    .where(
+        _products.id == bindparam("product_id"),
+        _products.quantity + bindparam("delta") >= 0,
+    )
+    .values(
+        quantity=_products.quantity + bindparam("delta"), version=_products.version + 1
+    )
+    .returning(*_columns, _products.version)
+)
+_adjust_quantity_if_version = _adjust_quantity.where(
+    _products.version == bindparam("expected_version")
+)
+_select_stock = select(_products.quantity, _products.version).where(
+    _products.id == bindparam("product_id")
+)
+_delete_product = delete(products_table).where(_products.id == bindparam("product_id"))
+_select_product_version = select(_products.version).where(
+    _products.id == bindparam("product_id")
+)
+_versions = collection_versions_table.c
+_select_collection_version = select(
+    func.coalesce(func.sum(_versions.version), 0)
+).where(_versions.name == "products")
+_bump_version_shard = (
+    update(collection_versions_table)
+    .where(_versions.name == "products", _versions.shard == bindparam("version_shard"))
+    .values(version=_versions.version + 1)
+)
+# Keeps IN (...) lists under SQLite's bound parameter limit
+_IN_CLAUSE_CHUNK = 500
+
+
+class SQLAlchemyProductRepository(ProductRepository):
+    """
+    ProductRepository backed by an async SQLAlchemy engine
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    async def add(
+        self, product: ProductCreate, created_by: int | None = None
+    ) -> ProductResponse:
+        async with self.engine.begin() as connection:
+            new_product = await self._add(connection, product, created_by)
+            await self._bump_collection_version(connection)
+        return new_product
+
+    async def get_by_id(self, product_id: int) -> ProductResponse:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(
+                _select_product, {"product_id": product_id}
+            )
+            row = result.first()
+        if row is None:
+            raise ProductNotFoundError()
+        return self._to_product(row)
+
+    async def get_with_version(self, product_id: int) -> tuple[ProductResponse, int]:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(
+                _select_product_with_version, {"product_id": product_id}
+            )
+            row = result.first()
+        if row is None:
+            raise ProductNotFoundError()
+        return self._to_product(row), row.version
+
+    async def get_many(self, product_ids: list[int]) -> list[ProductResponse | None]:
+        products = {}
+        unique_ids = list(set(product_ids))
+        async with self.engine.connect() as connection:
+            for start in range(0, len(unique_ids), _IN_CLAUSE_CHUNK):
+                chunk = unique_ids[start : start + _IN_CLAUSE_CHUNK]
+                result = await connection.execute(
+                    select(*_columns).where(_products.id.in_(chunk))
+                )
+                products.update({row.id: self._to_product(row) for row in result})
+        return [products.get(product_id) for product_id in product_ids]
+
+    async def update(self, product: ProductUpdate, product_id: int) -> ProductResponse:
+        async with self.engine.begin() as connection:
+            new_product = await self._update(connection, product, product_id)
+            await self._bump_collection_version(connection)
+        return new_product
+
+    async def adjust_quantity(
+        self, product_id: int, delta: int, expected_version: int | None = None
+    ) -> tuple[ProductResponse, int]:
+        values = {"product_id": product_id, "delta": delta}
+        statement = _adjust_quantity
+        if expected_version is not None:
+            values["expected_version"] = expected_version
+            statement = _adjust_quantity_if_version
+        async with self.engine.begin() as connection:
+            row = (await connection.execute(statement, values)).first()
+            if row is None:
+                # Only tells apart why nothing was updated
+                stock = (await connection.execute(_select_stock, values)).first()
+                if stock is None:
+                    raise ProductNotFoundError()
+                if expected_version is not None and stock.version != expected_version:
+                    raise ProductVersionConflictError()
+                raise InsufficientStockError()
+            await self._bump_collection_version(connection)
+        return self._to_product(row), row.version
+
+    async def delete(self, product_id: int) -> None:
+        async with self.engine.begin() as connection:
+            await self._delete(connection, product_id)
+            await self._bump_collection_version(connection)
+
+    async def add_many(
+        self,
+        products: list[ProductCreate],
+        atomic: bool,
+        created_by: int | None = None,
+    ) -> list[ProductResponse | Exception]:
+        async with self.engine.begin() as connection:
+            if atomic:
+                name_owners = await self._fetch_name_owners(
+                    connection, [product.name for product in products]
+                )
+                self._raise_on_errors(check_add_many(products, name_owners.get))
+            return await self._apply_many(
+                connection,
+                lambda conn, product: self._add(conn, product, created_by),
+                products,
+                atomic,
+            )
+
+    async def update_many(
+        self, products: list[ProductBulkUpdate], atomic: bool
+    ) -> list[ProductResponse | Exception]:
+        async with self.engine.begin() as connection:
+            if atomic:
+                names = await self._fetch_names(
+                    connection, [product.id for product in products]
+                )
+                name_owners = await self._fetch_name_owners(
+                    connection, [product.name for product in products]
+                )
+                self._raise_on_errors(
+                    check_update_many(products, names.get, name_owners.get)
+                )
+            return await self._apply_many(
+                connection,
+                lambda conn, product: self._update(conn, product, product.id),
+                products,
+                atomic,
+            )
+
+    async def delete_many(
+        self, product_ids: list[int], atomic: bool
+    ) -> list[int | Exception]:
+        async with self.engine.begin() as connection:
+            if atomic:
+                names = await self._fetch_names(connection, product_ids)
+                self._raise_on_errors(
+                    check_delete_many(product_ids, names.__contains__)
+                )
+            return await self._apply_many(connection, self._delete, product_ids, atomic)
+
+    async def get_all(self) -> list[ProductResponse]:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(_select_all_products)
+            return [self._to_product(row) for row in result]
+
+    async def get_page(self, after_id: int, limit: int) -> list[ProductResponse]:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(
+                _select_product_page, {"after_id": after_id, "limit": limit}
+            )
+            return [self._to_product(row) for row in result]
+
+    async def search(
+        self, query: str, limit: int, after: SearchCursor | None = None
+    ) -> list[ProductResponse]:
+        escaped = (
+            query.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        prefix = f"{escaped}%"
+        products = []
+        async with self.engine.connect() as connection:
+            if after is None or after.tier == PREFIX_TIER:
+                result = await connection.execute(
+                    _select_prefix_matches,
+                    {
+                        "prefix": prefix,
+                        "after_key": after.key if after else "",
+                        "after_id": after.product_id if after else 0,
+                        "limit": limit,
+                    },
+                )
+                products = [self._to_product(row) for row in result]
+            if len(products) < limit and len(query) >= NGRAM_SIZE:
+                after_id = 0
+                if after is not None and after.tier != PREFIX_TIER:
+                    after_id = after.product_id
+                result = await connection.execute(
+                    _select_substring_matches,
+                    {
+                        "pattern": f"%{escaped}%",
+                        "prefix": prefix,
+                        "after_id": after_id,
+                        "limit": limit - len(products),
+                    },
+                )
+                products.extend(self._to_product(row) for row in result)
+        return products
+
+    async def count(self) -> int:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(_count_products)
+            return result.scalar_one()
+
+    async def get_stats(self) -> ProductStats:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(_select_stats)
+            products, quantity, value, out_of_stock, min_price, max_price = result.one()
+        return ProductStats(
+            total_products=products,
+            total_quantity=quantity,
+            total_value=value,
+            out_of_stock=out_of_stock,
+            min_price=min_price,
+            max_price=max_price,
+        )
+
+    async def get_collection_version(self) -> int:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(_select_collection_version)
+            return result.scalar_one()
+
+    async def get_product_version(self, product_id: int) -> int:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(
+                _select_product_version, {"product_id": product_id}
+            )
+            version = result.scalar_one_or_none()
+        if version is None:
+            raise ProductNotFoundError()
+        return version
+
+    @staticmethod
+    async def _add(
+        connection: AsyncConnection, product, created_by: int | None = None
+    ) -> ProductResponse:
+        values = {
+            "name": product.name,
+            "quantity": product.quantity,
+            "price": product.price,
+            "created_by": created_by,
+        }
+        try:
+            result = await connection.execute(_insert_product, values)
+        except IntegrityError:
+            raise ProductAlreadyExistsError()
+        product_id = result.scalar_one()
+        return ProductResponse(id=product_id, **values)
+
+    @staticmethod
+    async def _update(
+        connection: AsyncConnection, product, product_id: int
+    ) -> ProductResponse:
+        values = {
+            "name": product.name,
+            "quantity": product.quantity,
+            "price": product.price,
+        }
+        try:
+            result = await connection.execute(
+                _update_product, {"product_id": product_id, **values}
+            )
+        except IntegrityError:
+            raise ProductAlreadyExistsError()
+        row = result.first()
+        if row is None:
+            raise ProductNotFoundError()
+        return ProductResponse(id=product_id, created_by=row.created_by, **values)
+
+    @staticmethod
+    async def _delete(connection: AsyncConnection, product_id: int) -> int:
+        result = await connection.execute(_delete_product, {"product_id": product_id})
+        if result.rowcount == 0:
+            raise ProductNotFoundError()
+        return product_id
+
+    @classmethod
+    async def _apply_many(cls, connection: AsyncConnection, operation, items, atomic):
+        """
+        atomic: items were validated, any late failure (a concurrent writer)
+        rolls back the whole transaction. Otherwise every item runs in its own
+        savepoint so a failed item doesn't undo the others.
+        """
+        results = []
+        for index, item in enumerate(items):
+            if atomic:
+                try:
+                    results.append(await operation(connection, item))
+                except (ProductAlreadyExistsError, ProductNotFoundError) as e:
+                    raise ProductBulkOperationError({index: e})
+                continue
+            try:
+                async with connection.begin_nested():
+                    results.append(await operation(connection, item))
+            except (ProductAlreadyExistsError, ProductNotFoundError) as e:
+                results.append(e)
+        if not all(isinstance(result, Exception) for result in results):
+            await cls._bump_collection_version(connection)
+        return results
+
+    @staticmethod
+    async def _bump_collection_version(connection: AsyncConnection) -> None:
+        """
+        Once per write transaction, after its product rows: the shard's row
+        lock is then never held while waiting for another lock
+        """
+        shard = random.randrange(COLLECTION_VERSION_SHARDS)
+        await connection.execute(_bump_version_shard, {"version_shard": shard})
+
+    @staticmethod
+    async def _fetch_name_owners(
+        connection: AsyncConnection, names: list[str]
+    ) -> dict[str, int]:
+        owners = {}
+        unique_names = list(set(names))
+        for start in range(0, len(unique_names), _IN_CLAUSE_CHUNK):
+            chunk = unique_names[start : start + _IN_CLAUSE_CHUNK]
+            result = await connection.execute(
+                select(_products.name, _products.id).where(_products.name.in_(chunk))
+            )
+            owners.update({row.name: row.id for row in result})
+        return owners
+
+    @staticmethod
+    async def _fetch_names(
+        connection: AsyncConnection, product_ids: list[int]
+    ) -> dict[int, str]:
+        names = {}
+        unique_ids = list(set(product_ids))
+        for start in range(0, len(unique_ids), _IN_CLAUSE_CHUNK):
+            chunk = unique_ids[start : start + _IN_CLAUSE_CHUNK]
+            result = await connection.execute(
+                select(_products.id, _products.name).where(_products.id.in_(chunk))
+            )
+            names.update({row.id: row.name for row in result})
+        return names
+
+    @staticmethod
+    def _raise_on_errors(errors: dict[int, Exception]) -> None:
+        if errors:
+            raise ProductBulkOperationError(errors)
+
+    @staticmethod
+    def _to_product(row) -> ProductResponse:
+        # Rows come from our own table and were validated on write
+        return ProductResponse.model_construct(
+            id=row.id,
+            name=row.name,
+            quantity=row.quantity,
+            price=row.price,
+            created_by=row.created_by,
+        )
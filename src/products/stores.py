@@ -0,0 +1,279 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from src.core.pagination import KeysetIndex
+from src.core.product.entities import ProductResponse
+from src.settings import get_settings
+
+PRODUCT_STORE: str = get_settings().product_store
+
+
+class ObjectProductStore:
+    """
+    Products kept as the ProductResponse objects the manager returns
+
+    Reads hand out the stored objects, so the serialised JSON cache hits.
+
+    products: id -> ProductResponse (insertion ordered)
+    ordered_ids: sorted ids for keyset pagination
+    versions: id -> collection version of the product's last write
+    """
+
+    stable_objects = True
+
+    def __init__(self):
+        self.products = OrderedDict()
+        self.ordered_ids = KeysetIndex()
+        self.versions = {}
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def __contains__(self, product_id: int) -> bool:
+        return product_id in self.products
+
+    def get(self, product_id: int) -> ProductResponse | None:
+        return self.products.get(product_id)
+
+    def get_version(self, product_id: int) -> int | None:
+        return self.versions.get(product_id)
+
+    def get_all(self) -> list[ProductResponse]:
+        return list(self.products.values())
+
+    def get_page(self, after_id: int, limit: int) -> list[ProductResponse]:
+        page_ids = self.ordered_ids.page(self.products, after_id, limit)
+        return [self.products[product_id] for product_id in page_ids]
+
+    def put(self, product: ProductResponse, version: int) -> ProductResponse | None:
+        """
+        Stores `product`, returns the product it replaced
+        """
+        old_product = self.products.get(product.id)
+        if old_product is None:
+            self.ordered_ids.append(product.id)
+        self.products[product.id] = product
+        self.versions[product.id] = version
+        return old_product
+
+    def pop(self, product_id: int) -> ProductResponse:
+        old_product = self.products.pop(product_id)
+        self.ordered_ids.remove(self.products)
+        del self.versions[product_id]
+        return old_product
+
+    def capture(self):
+        # Products are replaced on update, never mutated
+        return list(self.products.values()), self.versions.copy()
+
+    @staticmethod
+    def encode(state) -> dict:
+        products, versions = state
+        return {
+            "id": array("q", [product.id for product in products]),
+            "name": [product.name for product in products],
+            "quantity": array("q", [product.quantity for product in products]),
+            "price": array("d", [product.price for product in products]),
+            # ids start at 1, 0 stands for no creator
+            "created_by": array("q", [product.created_by or 0 for product in products]),
+            "version": array("q", [versions[product.id] for product in products]),
+        }
+
+    def load(self, columns) -> None:
+        """
+        Fills an empty store from encode() columns
+        """
+        ids = columns["id"]
+        for product_id, name, quantity, price, created_by in zip(
+            ids,
+            columns["name"],
+            columns["quantity"],
+            columns["price"],
+            columns["created_by"],
+        ):
+            self.products[product_id] = ProductResponse(
+                id=product_id,
+                name=name,
+                quantity=quantity,
+                price=price,
+                created_by=created_by or None,
+            )
+        self.ordered_ids.extend(ids)
+        self.versions = dict(zip(ids, columns["version"]))
+
+
+class ColumnarProductStore:
+    """
+    Products kept as typed columns, one row per product in id order
+
+    Takes a few dozen bytes per product instead of the several hundred of a
+    pydantic object in a dict. ProductResponse objects are built by every
+    read, so the serialised JSON cache never hits.
+
+    ids, quantities, created_by (0 for none), versions: array("q")
+    prices: array("d")
+    names: list of str, None marks a deleted row. Names are unique, the
+        manager's name index shares these same string objects.
+    A product's row is found by bisecting `ids` (ids are allocated in
+    increasing order, so new products are appended). Deleted rows are
+    compacted away once they outnumber the live ones.
+    """
+
+    stable_objects = False
+
+    def __init__(self):
+        self.ids = array("q")
+        self.names = []
+        self.quantities = array("q")
+        self.prices = array("d")
+        self.created_by = array("q")
+        self.versions = array("q")
+        self.live = 0
+
+    def __len__(self) -> int:
+        return self.live
+
+    def __contains__(self, product_id: int) -> bool:
+        return self._row(product_id) is not None
+
+    def get(self, product_id: int) -> ProductResponse | None:
+        row = self._row(product_id)
+        return self._product(row) if row is not None else None
+
+    def get_version(self, product_id: int) -> int | None:
+        row = self._row(product_id)
+        return self.versions[row] if row is not None else None
+
+    def get_all(self) -> list[ProductResponse]:
+        return [
+            self._product(row)
+            for row, name in enumerate(self.names)
+            if name is not None
+        ]
+
+    def get_page(self, after_id: int, limit: int) -> list[ProductResponse]:
+        page = []
+        row = bisect_right(self.ids, after_id)
+        while row < len(self.ids) and len(page) < limit:
+            if self.names[row] is not None:
+                page.append(self._product(row))
+            row += 1
+        return page
+
+    def put(self, product: ProductResponse, version: int) -> ProductResponse | None:
+        """
+        Stores `product`, returns the product it replaced
+        """
+        row = bisect_left(self.ids, product.id)
+        if row == len(self.ids):
+            self.ids.append(product.id)
+            self.names.append(product.name)
+            self.quantities.append(product.quantity)
+            self.prices.append(product.price)
+            self.created_by.append(product.created_by or 0)
+            self.versions.append(version)
+            self.live += 1
+            return None
+        if self.ids[row] != product.id:
+            # Not reached with monotonic ids, kept correct for any id order
+            for column, value in (
+                (self.ids, product.id),
+                (self.names, None),
+                (self.quantities, 0),
+                (self.prices, 0.0),
+                (self.created_by, 0),
+                (self.versions, 0),
+            ):
+                column.insert(row, value)
+
+        old_product = self._product(row) if self.names[row] is not None else None
+        if old_product is None:
+            self.live += 1
+        self.names[row] = product.name
+        self.quantities[row] = product.quantity
+        self.prices[row] = product.price
+        self.created_by[row] = product.created_by or 0
+        self.versions[row] = version
+        return old_product
+
+    def pop(self, product_id: int) -> ProductResponse:
+        row = self._row(product_id)
+        if row is None:
+            raise KeyError(product_id)
+        old_product = self._product(row)
+        self.names[row] = None
+        self.live -= 1
+        if len(self.ids) - self.live > self.live:
+            self._compact()
+        return old_product
+
+    def capture(self):
+        # Array and list copies are memcpy-speed, even for millions of rows
+        return (
+            self.ids[:],
+            self.names[:],
+            self.quantities[:],
+            self.prices[:],
+            self.created_by[:],
+            self.versions[:],
+            self.live,
+        )
+
+    @staticmethod
+    def encode(state) -> dict:
+        ids, names, quantities, prices, created_by, versions, live = state
+        if live < len(ids):
+            rows = [row for row, name in enumerate(names) if name is not None]
+            ids, quantities, prices, created_by, versions = (
+                array(column.typecode, map(column.__getitem__, rows))
+                for column in (ids, quantities, prices, created_by, versions)
+            )
+            names = [names[row] for row in rows]
+        return {
+            "id": ids,
+            "name": names,
+            "quantity": quantities,
+            "price": prices,
+            "created_by": created_by,
+            "version": versions,
+        }
+
+    def load(self, columns) -> None:
+        """
+        Fills an empty store from encode() columns
+        """
+        self.ids = columns["id"]
+        self.names = columns["name"]
+        self.quantities = columns["quantity"]
+        self.prices = columns["price"]
+        self.created_by = columns["created_by"]
+        self.versions = columns["version"]
+        self.live = len(self.ids)
+
+    def _row(self, product_id: int) -> int | None:
+        row = bisect_left(self.ids, product_id)
+        if row < len(self.ids) and self.ids[row] == product_id:
+            if self.names[row] is not None:
+                return row
+        return None
+
+    def _product(self, row: int) -> ProductResponse:
+        return ProductResponse(
+            id=self.ids[row],
+            name=self.names[row],
+            quantity=self.quantities[row],
+            price=self.prices[row],
+            created_by=self.created_by[row] or None,
+        )
+
+    def _compact(self) -> None:
+        self.load(self.encode(self.capture()))
+
+
+def create_product_store(kind: str = PRODUCT_STORE):
+    if kind == "objects":
+        return ObjectProductStore()
+    if kind == "columnar":
+        return ColumnarProductStore()
+    raise ValueError(f"Unknown product store: {kind}")
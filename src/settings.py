@@ -0,0 +1,165 @@
+import os
+import tempfile
+import typing
+from dataclasses import MISSING, dataclass, field, fields
+
+_TRUE = ("1", "true", "yes")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Process configuration, read once from the environment (and .env)
+
+    Every field is read from the upper-cased variable of the same name.
+    Modules take their constants from get_settings() when first imported, so
+    settings passed to create_app() only apply when the app is created before
+    any other module of src is imported.
+    """
+
+    secret_key: str
+    algorithm: str
+    access_token_expire_minutes: int
+    refresh_token_expire_minutes: int
+    # Stateless mode authorizes requests from the permission mask signed into
+    # the access token without reading the user store, so permission changes
+    # only apply once the token expires: its lifetime is capped to keep that short
+    stateless_permissions: bool = False
+    stateless_access_token_expire_minutes: int = 5
+
+    password_hasher_executor: str = "thread"
+    password_hasher_workers: int = 2
+    password_hasher_max_pending: int = 64
+    token_cache_max_size: int = 10000
+    token_cache_ttl_seconds: int = 60
+    # Revoked refresh token ids are checked against a Bloom filter first, sized
+    # for this many entries at this false positive rate. It is rebuilt from
+    # the store on this period, which drops expired ids and picks up the ones
+    # other workers revoked
+    revocation_filter_capacity: int = 100000
+    revocation_filter_error_rate: float = 0.001
+    revocation_rebuild_seconds: float = 30
+
+    login_max_concurrent: int = 2
+    login_user_burst: int = 5
+    login_user_per_minute: float = 5
+    login_ip_burst: int = 20
+    login_ip_per_minute: float = 60
+    login_buckets_max_size: int = 100000
+    login_overload_retry_seconds: float = 1
+
+    storage_backend: str = "memory"
+    product_store: str = "objects"
+    database_url: str = "sqlite+aiosqlite:///./playground.db"
+    database_pool_size: int = 10
+    database_max_overflow: int = 20
+    database_pool_recycle: int = 1800
+    database_statement_cache_size: int = 500
+
+    redis_url: str = "redis://localhost:6379/0"
+    redis_key_prefix: str = "playground"
+    # Optimistic product writes retried after a conflicting write, then 503
+    redis_stock_retries: int = 16
+    local_cache_max_size: int = 100000
+
+    # Empty: the in-memory stores are not persisted. A journal has a single
+    # writer, with it set run one worker (WEB_CONCURRENCY=1)
+    journal_dir: str = ""
+    # Writes wait for the fsync of their log record before returning
+    journal_sync: bool = False
+    journal_flush_ms: int = 10
+    journal_snapshot_records: int = 100000
+
+    product_events_max_pending: int = 256
+    product_events_log_size: int = 4096
+    product_bulk_max_items: int = 10000
+    # Concurrent reads of one product share a single fetch. Above 0, the
+    # result is also reused for this long after it arrived: writes made
+    # through this worker are seen at once, other workers' up to this late
+    product_read_window_ms: int = 0
+
+    json_cache_max_size: int = 100000
+    compression_min_bytes: int = 1024
+    gzip_level: int = 6
+    zstd_level: int = 3
+    encoded_cache_max_bytes: int = 64 * 1024 * 1024
+
+    graphql_max_depth: int = 6
+    graphql_max_complexity: int = 10000
+    graphql_max_aliases: int = 30
+
+    # Shared by all gunicorn workers of one master (they have the same parent pid)
+    metrics_dir: str = field(
+        default_factory=lambda: os.path.join(
+            tempfile.gettempdir(), f"playground-metrics-{os.getppid()}"
+        )
+    )
+    metrics_flush_seconds: float = 5
+
+    # Import GraphQL (strawberry) on its first request instead of at startup
+    lazy_routes: bool = True
+
+    @classmethod
+    def from_env(cls, environ: typing.Mapping[str, str] = os.environ) -> "Settings":
+        """
+        Empty variables count as unset
+        """
+        types_by_name = typing.get_type_hints(cls)
+        values = {}
+        missing = []
+        for settings_field in fields(cls):
+            raw = environ.get(settings_field.name.upper())
+            if not raw:
+                if _is_required(settings_field):
+                    missing.append(settings_field.name.upper())
+                continue
+            values[settings_field.name] = _parse(
+                raw, types_by_name[settings_field.name]
+            )
+        if missing:
+            raise RuntimeError(f"Missing required settings: {', '.join(missing)}")
+        return cls(**values)
+
+
+_settings = None
+
+
+def get_settings() -> Settings:
+    """
+    The configured settings, loaded from the environment on first use
+    """
+    global _settings
+    if _settings is None:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _settings = Settings.from_env()
+    return _settings
+
+
+def configure(settings: Settings | None = None) -> Settings:
+    """
+    Installs `settings` for get_settings(), None loads them from the environment
+
+    Raises RuntimeError when other settings were already handed out: the
+    modules that read them keep the old values.
+    """
+    global _settings
+    if settings is None:
+        return get_settings()
+    if _settings is not None and _settings != settings:
+        raise RuntimeError("Settings were already loaded, configure them first")
+    _settings = settings
+    return settings
+
+
+def _is_required(settings_field) -> bool:
+    return (
+        settings_field.default is MISSING and settings_field.default_factory is MISSING
+    )
+
+
+def _parse(raw: str, annotation):
+    if annotation is bool:
+        return raw.lower() in _TRUE
+    return annotation(raw)
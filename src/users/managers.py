@@ -1,42 +1,71 @@
+from array import array
 from collections import OrderedDict
 
-import bcrypt
+from pydantic_core import from_json, to_json
 
+from src.core.metrics import FAST_BUCKETS, metrics_registry
+from src.core.pagination import KeysetIndex
 from src.core.user.exceptions import (
+    PasswordHasherBusyError,
     UserAlreadyExistsError,
     UserCreationError,
     UserNotFoundError,
 )
-from src.core.user.entities import UserResponse
+from src.core.user.entities import CreateUser, UserResponse
+from src.core.user.hashing import password_hasher
+
+manager_seconds = metrics_registry.histogram(
+    "manager_operation_duration_seconds",
+    "In-memory manager operation time",
+    ("manager", "operation"),
+    FAST_BUCKETS,
+)
 
 
 class UserManager:
     """
     CRUD operations for User model
+
+    users: id -> user (insertion ordered)
+    user_ids_by_username / user_ids_by_email: case-normalised key -> id
+    ordered_ids: sorted ids for keyset pagination
+    last_user_id: monotonic id allocator, ids are never reused
+    revoked_tokens: revoked token id -> unix time it expires at
+    journal: optional src.db.journal.Journal every mutation is logged to
     """
 
     def __init__(self):
         self.users = OrderedDict()
-        self.last_user_id = 1
+        self.user_ids_by_username = {}
+        self.user_ids_by_email = {}
+        self.ordered_ids = KeysetIndex()
+        self.last_user_id = 0
+        self.revoked_tokens = {}
+        self.journal = None
+
+    @manager_seconds.time("user", "add")
+    async def add(self, user):
+        username_key = self._normalize(user.username)
+        email_key = self._normalize(user.email)
+        self._check_unique(username_key, email_key)
 
-    def add(self, user):
-        if len(self.users) != 0:
-            self.last_user_id = list(self.users)[-1]
-            self.last_user_id += 1
+        try:
+            hashed_password = await password_hasher.hash(user.password)
+        except PasswordHasherBusyError:
+            raise
+        except Exception:
+            raise UserCreationError()
 
-            for u in self.users.values():
-                if u.username == user.username:
-                    raise UserAlreadyExistsError()
+        # Re-check: another request may have taken the name while we were hashing
+        self._check_unique(username_key, email_key)
 
         try:
-            hashed_password = bcrypt.hashpw(
-                user.password.encode("utf-8"), bcrypt.gensalt()
-            ).decode("utf-8")
             user.password = hashed_password
 
-            self.users[self.last_user_id] = user
+            user_id = self._next_user_id()
+            self._store(user_id, user)
             output_user = UserResponse(
-                id=self.last_user_id,
+                id=user_id,
                 username=user.username,
                 email=user.email,
                 is_admin=user.is_admin,
@@ -45,24 +74,169 @@ class UserManager:
         except Exception:
             raise UserCreationError()
 
+        if self.journal is not None:
+            self.journal.append(
+                [
+                    [
+                        "put",
+                        user_id,
+                        user.username,
+                        user.email,
+                        user.password,
+                        user.is_admin,
+                        user.permissions,
+                    ]
+                ]
+            )
         return output_user
 
+    @manager_seconds.time("user", "get_by_id")
     def get_by_id(self, user_id: int):
         if not self._is_user(user_id):
             raise UserNotFoundError()
         return self.users.get(user_id)
 
+    @manager_seconds.time("user", "get_by_username")
     def get_by_username(self, username: str):
-        for user in self.users.items():
-            if user[1].username == username:
-                return user
-        return None
-
+        user_id = self.user_ids_by_username.get(self._normalize(username))
+        if user_id is None:
+            return None
+        return user_id, self.users[user_id]
+
+    @manager_seconds.time("user", "get_by_email")
+    def get_by_email(self, email: str):
+        user_id = self.user_ids_by_email.get(self._normalize(email))
+        if user_id is None:
+            return None
+        return user_id, self.users[user_id]
+
+    @manager_seconds.time("user", "get_many")
+    def get_many(self, user_ids):
+        users = self.users
+        return [
+            (user_id, users[user_id]) if user_id in users else None
+            for user_id in user_ids
+        ]
+
+    @manager_seconds.time("user", "get_all")
     def get_all(self):
         return list(self.users.items())
 
+    @manager_seconds.time("user", "get_page")
+    def get_page(self, after_id: int, limit: int):
+        page_ids = self.ordered_ids.page(self.users, after_id, limit)
+        return [(user_id, self.users[user_id]) for user_id in page_ids]
+
+    @manager_seconds.time("user", "count")
+    def count(self):
+        return len(self.users)
+
+    def revoke_token(self, jti: str, expires_at: int) -> bool:
+        if jti in self.revoked_tokens:
+            return False
+        self.revoked_tokens[jti] = expires_at
+        if self.journal is not None:
+            self.journal.append([["revoke", jti, expires_at]])
+        return True
+
+    def is_token_revoked(self, jti: str) -> bool:
+        return jti in self.revoked_tokens
+
+    def get_revoked_tokens(self, now: int) -> list[str]:
+        # Expired ids are only dropped here and from snapshots, replaying an
+        # older revoke record brings one back until the next call
+        self.revoked_tokens = {
+            jti: expires_at
+            for jti, expires_at in self.revoked_tokens.items()
+            if expires_at > now
+        }
+        return list(self.revoked_tokens)
+
+    def capture(self):
+        """
+        Journal snapshot hook: stored users are never mutated, a shallow copy
+        is a consistent view to encode off the event loop
+        """
+        meta = {
+            "last_user_id": self.last_user_id,
+            "revoked_tokens": dict(self.revoked_tokens),
+        }
+        return meta, list(self.users.items())
+
+    @staticmethod
+    def encode_snapshot(users):
+        return {
+            "id": array("q", [user_id for user_id, _ in users]),
+            "username": [user.username for _, user in users],
+            "email": [user.email for _, user in users],
+            "password": [user.password for _, user in users],
+            "is_admin": array("b", [user.is_admin for _, user in users]),
+            "permissions": [to_json(user.permissions).decode() for _, user in users],
+        }
+
+    def restore(self, meta, columns):
+        for user_id, username, email, password, is_admin, permissions in zip(
+            columns["id"],
+            columns["username"],
+            columns["email"],
+            columns["password"],
+            columns["is_admin"],
+            columns["permissions"],
+        ):
+            self._store(
+                user_id,
+                self._stored_user(
+                    username, email, password, is_admin, from_json(permissions)
+                ),
+            )
+        self.last_user_id = meta["last_user_id"]
+        # Snapshots taken before token revocation have none
+        self.revoked_tokens = meta.get("revoked_tokens", {})
+
+    def replay(self, operations):
+        for operation, *fields in operations:
+            if operation == "revoke":
+                jti, expires_at = fields
+                self.revoked_tokens[jti] = expires_at
+                continue
+            user_id, *fields = fields
+            if user_id not in self.users:
+                self._store(user_id, self._stored_user(*fields))
+            self.last_user_id = max(self.last_user_id, user_id)
+
+    def _store(self, user_id: int, user):
+        self.users[user_id] = user
+        self.user_ids_by_username[self._normalize(user.username)] = user_id
+        self.user_ids_by_email[self._normalize(user.email)] = user_id
+        self.ordered_ids.append(user_id)
+
+    @staticmethod
+    def _stored_user(username, email, password, is_admin, permissions):
+        # The password is already hashed, skip the plain-text password rules
+        return CreateUser.model_construct(
+            username=username,
+            email=email,
+            password=password,
+            is_admin=bool(is_admin),
+            permissions=permissions,
+        )
+
+    def _check_unique(self, username_key: str, email_key: str):
+        if username_key in self.user_ids_by_username:
+            raise UserAlreadyExistsError()
+        if email_key in self.user_ids_by_email:
+            raise UserAlreadyExistsError()
+
+    def _next_user_id(self):
+        self.last_user_id += 1
+        return self.last_user_id
+
     def _is_user(self, user_id: int):
-        return user_id in self.users.keys()
+        return user_id in self.users
+
+    @staticmethod
+    def _normalize(value: str) -> str:
+        return value.casefold()
 
 
 user_manager = UserManager()
@@ -0,0 +1,156 @@
+from src.core.user.entities import (
+    CreateUser,
+    UserResponse,
+    UserResponseWithHashedPWD,
+)
+from src.core.user.exceptions import (
+    PasswordHasherBusyError,
+    UserAlreadyExistsError,
+    UserCreationError,
+    UserNotFoundError,
+)
+from src.core.user.hashing import password_hasher
+from src.core.user.repositories import UserRepository
+from src.db.redis import ReadThroughCache, redis_key
+
+
+class RedisUserRepository(UserRepository):
+    """
+    UserRepository shared by all gunicorn workers through Redis
+
+    users: hash id -> user json (with hashed password)
+    user_usernames / user_emails: hash case-normalised key -> id, claimed with HSETNX
+    user_ids: sorted set of ids for keyset pagination
+    revoked_tokens: sorted set of revoked token ids scored by their expiry
+    Username lookups go through a per-worker ReadThroughCache.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.users_key = redis_key("users")
+        self.usernames_key = redis_key("user_usernames")
+        self.emails_key = redis_key("user_emails")
+        self.ids_key = redis_key("user_ids")
+        self.id_sequence_key = redis_key("user_id_seq")
+        self.revoked_tokens_key = redis_key("revoked_tokens")
+        self.cache = ReadThroughCache(redis, redis_key("user_invalidations"))
+
+    async def add(self, user: CreateUser) -> UserResponse:
+        username_key = user.username.casefold()
+        email_key = user.email.casefold()
+        if await self.redis.hexists(self.usernames_key, username_key):
+            raise UserAlreadyExistsError()
+        if await self.redis.hexists(self.emails_key, email_key):
+            raise UserAlreadyExistsError()
+
+        try:
+            hashed_password = await password_hasher.hash(user.password)
+        except PasswordHasherBusyError:
+            raise
+        except Exception:
+            raise UserCreationError()
+
+        user_id = await self.redis.incr(self.id_sequence_key)
+        if not await self.redis.hsetnx(self.usernames_key, username_key, user_id):
+            raise UserAlreadyExistsError()
+        if not await self.redis.hsetnx(self.emails_key, email_key, user_id):
+            await self.redis.hdel(self.usernames_key, username_key)
+            raise UserAlreadyExistsError()
+
+        stored_user = UserResponseWithHashedPWD(
+            id=user_id,
+            username=user.username,
+            email=user.email,
+            password=hashed_password,
+            is_admin=user.is_admin,
+            permissions=user.permissions,
+        )
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.users_key, user_id, stored_user.model_dump_json())
+            pipe.zadd(self.ids_key, {user_id: user_id})
+            await pipe.execute()
+
+        return UserResponse(
+            id=user_id,
+            username=user.username,
+            email=user.email,
+            is_admin=user.is_admin,
+            permissions=user.permissions,
+        )
+
+    async def get_by_id(self, user_id: int):
+        raw = await self.redis.hget(self.users_key, user_id)
+        if raw is None:
+            raise UserNotFoundError()
+        return UserResponseWithHashedPWD.model_validate_json(raw)
+
+    async def get_by_username(self, username: str) -> tuple | None:
+        username_key = username.casefold()
+        user_tuple = self.cache.get(username_key)
+        if user_tuple is not None:
+            return user_tuple
+
+        generation = self.cache.generation()
+        user_id = await self.redis.hget(self.usernames_key, username_key)
+        if user_id is None:
+            return None
+        try:
+            user = await self.get_by_id(int(user_id))
+        except UserNotFoundError:
+            return None
+        user_tuple = (user.id, user)
+        self.cache.set(username_key, user_tuple, generation)
+        return user_tuple
+
+    async def get_many(self, user_ids: list[int]) -> list[tuple | None]:
+        unique_ids = list(set(user_ids))
+        if not unique_ids:
+            return []
+        raw_users = await self.redis.hmget(self.users_key, unique_ids)
+        users = {}
+        for raw in raw_users:
+            if raw is not None:
+                user = UserResponseWithHashedPWD.model_validate_json(raw)
+                users[user.id] = (user.id, user)
+        return [users.get(user_id) for user_id in user_ids]
+
+    async def get_all(self) -> list[tuple]:
+        raw_users = await self.redis.hvals(self.users_key)
+        users = [
+            UserResponseWithHashedPWD.model_validate_json(raw) for raw in raw_users
+        ]
+        users.sort(key=lambda user: user.id)
+        return [(user.id, user) for user in users]
+
+    async def get_page(self, after_id: int, limit: int) -> list[tuple]:
+        page_ids = await self.redis.zrangebyscore(
+            self.ids_key, f"({after_id}", "+inf", start=0, num=limit
+        )
+        if not page_ids:
+            return []
+        raw_users = await self.redis.hmget(self.users_key, page_ids)
+        users = [
+            UserResponseWithHashedPWD.model_validate_json(raw)
+            for raw in raw_users
+            if raw is not None
+        ]
+        return [(user.id, user) for user in users]
+
+    async def count(self) -> int:
+        return await self.redis.zcard(self.ids_key)
+
+    async def revoke_token(self, jti: str, expires_at: int) -> bool:
+        added = await self.redis.zadd(
+            self.revoked_tokens_key, {jti: expires_at}, nx=True
+        )
+        return added == 1
+
+    async def is_token_revoked(self, jti: str) -> bool:
+        return await self.redis.zscore(self.revoked_tokens_key, jti) is not None
+
+    async def get_revoked_tokens(self, now: int) -> list[str]:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(self.revoked_tokens_key, "-inf", now)
+            pipe.zrange(self.revoked_tokens_key, 0, -1)
+            _, jtis = await pipe.execute()
+        return [jti.decode() if isinstance(jti, bytes) else jti for jti in jtis]
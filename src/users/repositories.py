@@ -0,0 +1,81 @@
+from src.core.user.entities import CreateUser, UserResponse
+from src.core.user.repositories import UserRepository
+from src.db.journal import Journal, create_journal
+from src.settings import get_settings
+from src.users.managers import UserManager, user_manager
+
+
+class InMemoryUserRepository(UserRepository):
+    """
+    UserRepository backed by the process-local UserManager, persisted by
+    `journal` when one is given
+    """
+
+    def __init__(self, manager: UserManager, journal: Journal | None = None):
+        self.manager = manager
+        self.journal = journal
+        manager.journal = journal
+
+    async def add(self, user: CreateUser) -> UserResponse:
+        new_user = await self.manager.add(user)
+        if self.journal is not None:
+            # Only waits for the disk with JOURNAL_SYNC
+            await self.journal.commit()
+        return new_user
+
+    async def get_by_id(self, user_id: int):
+        return self.manager.get_by_id(user_id)
+
+    async def get_by_username(self, username: str) -> tuple | None:
+        return self.manager.get_by_username(username)
+
+    async def get_many(self, user_ids: list[int]) -> list[tuple | None]:
+        return self.manager.get_many(user_ids)
+
+    async def get_all(self) -> list[tuple]:
+        return self.manager.get_all()
+
+    async def get_page(self, after_id: int, limit: int) -> list[tuple]:
+        return self.manager.get_page(after_id, limit)
+
+    async def count(self) -> int:
+        return self.manager.count()
+
+    async def revoke_token(self, jti: str, expires_at: int) -> bool:
+        revoked = self.manager.revoke_token(jti, expires_at)
+        if revoked and self.journal is not None:
+            await self.journal.commit()
+        return revoked
+
+    async def is_token_revoked(self, jti: str) -> bool:
+        return self.manager.is_token_revoked(jti)
+
+    async def get_revoked_tokens(self, now: int) -> list[str]:
+        return self.manager.get_revoked_tokens(now)
+
+
+def create_user_repository(
+    backend: str = get_settings().storage_backend,
+) -> UserRepository:
+    """
+    The shared backends are imported only when selected, see
+    create_product_repository
+    """
+    if backend == "memory":
+        return InMemoryUserRepository(
+            user_manager, create_journal("users", user_manager)
+        )
+    if backend == "sqlalchemy":
+        from src.db.engine import get_engine
+        from src.users.sqlalchemy_repository import SQLAlchemyUserRepository
+
+        return SQLAlchemyUserRepository(get_engine())
+    if backend == "redis":
+        from src.db.redis import get_redis
+        from src.users.redis_repository import RedisUserRepository
+
+        return RedisUserRepository(get_redis())
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+user_repository = create_user_repository()
@@ -0,0 +1,172 @@
+from sqlalchemy import bindparam, delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.user.entities import (
+    CreateUser,
+    UserResponse,
+    UserResponseWithHashedPWD,
+)
+from src.core.user.exceptions import (
+    PasswordHasherBusyError,
+    UserAlreadyExistsError,
+    UserCreationError,
+    UserNotFoundError,
+)
+from src.core.user.hashing import password_hasher
+from src.core.user.repositories import UserRepository
+from src.db.tables import revoked_tokens_table, users_table
+
+_users = users_table.c
+_columns = (
+    _users.id,
+    _users.username,
+    _users.email,
+    _users.password,
+    _users.is_admin,
+    _users.permissions,
+)
+
+_insert_user = insert(users_table).returning(_users.id)
+_select_user = select(*_columns).where(_users.id == bindparam("user_id"))
+_select_user_by_username = select(*_columns).where(
+    _users.username_key == bindparam("username_key")
+)
+_select_all_users = select(*_columns).order_by(_users.id)
+_select_user_page = (
+    select(*_columns)
+    .where(_users.id > bindparam("after_id"))
+    .order_by(_users.id)
+    .limit(bindparam("limit"))
+)
+_count_users = select(func.count()).select_from(users_table)
+_revoked = revoked_tokens_table.c
+_insert_revoked_token = insert(revoked_tokens_table)
+_select_revoked_token = select(_revoked.jti).where(_revoked.jti == bindparam("jti"))
+_delete_expired_revoked_tokens = delete(revoked_tokens_table).where(
+    _revoked.expires_at <= bindparam("now")
+)
+_select_revoked_tokens = select(_revoked.jti)
+# Keeps IN (...) lists under SQLite's bound parameter limit
+_IN_CLAUSE_CHUNK = 500
+
+
+class SQLAlchemyUserRepository(UserRepository):
+    """
+    UserRepository backed by an async SQLAlchemy engine
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    async def add(self, user: CreateUser) -> UserResponse:
+        try:
+            hashed_password = await password_hasher.hash(user.password)
+        except PasswordHasherBusyError:
+            raise
+        except Exception:
+            raise UserCreationError()
+
+        values = {
+            "username": user.username,
+            "username_key": user.username.casefold(),
+            "email": user.email,
+            "email_key": user.email.casefold(),
+            "password": hashed_password,
+            "is_admin": user.is_admin,
+            "permissions": list(user.permissions),
+        }
+        try:
+            async with self.engine.begin() as connection:
+                result = await connection.execute(_insert_user, values)
+                user_id = result.scalar_one()
+        except IntegrityError:
+            raise UserAlreadyExistsError()
+
+        return UserResponse(
+            id=user_id,
+            username=user.username,
+            email=user.email,
+            is_admin=user.is_admin,
+            permissions=user.permissions,
+        )
+
+    async def get_by_id(self, user_id: int):
+        async with self.engine.connect() as connection:
+            result = await connection.execute(_select_user, {"user_id": user_id})
+            row = result.first()
+        if row is None:
+            raise UserNotFoundError()
+        return self._to_user(row)
+
+    async def get_by_username(self, username: str) -> tuple | None:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(
+                _select_user_by_username, {"username_key": username.casefold()}
+            )
+            row = result.first()
+        if row is None:
+            return None
+        return row.id, self._to_user(row)
+
+    async def get_many(self, user_ids: list[int]) -> list[tuple | None]:
+        users = {}
+        unique_ids = list(set(user_ids))
+        async with self.engine.connect() as connection:
+            for start in range(0, len(unique_ids), _IN_CLAUSE_CHUNK):
+                chunk = unique_ids[start : start + _IN_CLAUSE_CHUNK]
+                result = await connection.execute(
+                    select(*_columns).where(_users.id.in_(chunk))
+                )
+                users.update({row.id: (row.id, self._to_user(row)) for row in result})
+        return [users.get(user_id) for user_id in user_ids]
+
+    async def get_all(self) -> list[tuple]:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(_select_all_users)
+            return [(row.id, self._to_user(row)) for row in result]
+
+    async def get_page(self, after_id: int, limit: int) -> list[tuple]:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(
+                _select_user_page, {"after_id": after_id, "limit": limit}
+            )
+            return [(row.id, self._to_user(row)) for row in result]
+
+    async def count(self) -> int:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(_count_users)
+            return result.scalar_one()
+
+    async def revoke_token(self, jti: str, expires_at: int) -> bool:
+        try:
+            async with self.engine.begin() as connection:
+                await connection.execute(
+                    _insert_revoked_token, {"jti": jti, "expires_at": expires_at}
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    async def is_token_revoked(self, jti: str) -> bool:
+        async with self.engine.connect() as connection:
+            result = await connection.execute(_select_revoked_token, {"jti": jti})
+            return result.first() is not None
+
+    async def get_revoked_tokens(self, now: int) -> list[str]:
+        async with self.engine.begin() as connection:
+            await connection.execute(_delete_expired_revoked_tokens, {"now": now})
+            result = await connection.execute(_select_revoked_tokens)
+            return list(result.scalars())
+
+    @staticmethod
+    def _to_user(row) -> UserResponseWithHashedPWD:
+        # Rows come from our own table and were validated on write
+        return UserResponseWithHashedPWD.model_construct(
+            id=row.id,
+            username=row.username,
+            email=row.email,
+            password=row.password,
+            is_admin=row.is_admin,
+            permissions=row.permissions,
+        )